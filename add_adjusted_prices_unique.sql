@@ -0,0 +1,18 @@
+-- Add a unique (stock_id, date) constraint to adjusted_prices
+-- Required by the bulk upsert in fetch-adjusted-prices (INSERT ... ON CONFLICT)
+-- Run this SQL in your PostgreSQL database (pgAdmin, psql, etc.)
+
+-- Remove duplicate rows first, keeping the earliest inserted one
+DELETE FROM adjusted_prices a
+USING adjusted_prices b
+WHERE a.stock_id = b.stock_id
+  AND a.date = b.date
+  AND a.id > b.id;
+
+ALTER TABLE adjusted_prices
+ADD CONSTRAINT uq_adjusted_prices_stock_date UNIQUE (stock_id, date);
+
+-- Verify the constraint was added
+SELECT conname, pg_get_constraintdef(oid)
+FROM pg_constraint
+WHERE conrelid = 'adjusted_prices'::regclass;
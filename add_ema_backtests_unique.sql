@@ -0,0 +1,23 @@
+-- Add a unique key over each EMA backtest combination to ema_backtests
+-- Required by the result upsert in /ema-backtests/run (INSERT ... ON CONFLICT)
+-- Run this SQL in your PostgreSQL database (pgAdmin, psql, etc.)
+
+-- Remove duplicate rows first, keeping the most recent result
+DELETE FROM ema_backtests a
+USING ema_backtests b
+WHERE a.symbol = b.symbol
+  AND a.short_period = b.short_period
+  AND a.long_period = b.long_period
+  AND a.start_date = b.start_date
+  AND a.end_date = b.end_date
+  AND a.initial_cash = b.initial_cash
+  AND a.id < b.id;
+
+ALTER TABLE ema_backtests
+ADD CONSTRAINT uq_ema_backtests_combination
+UNIQUE (symbol, short_period, long_period, start_date, end_date, initial_cash);
+
+-- Verify the constraint was added
+SELECT conname, pg_get_constraintdef(oid)
+FROM pg_constraint
+WHERE conrelid = 'ema_backtests'::regclass;
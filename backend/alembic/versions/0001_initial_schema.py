@@ -0,0 +1,124 @@
+"""Initial schema
+
+Creates the tables the application defines, skipping any that already exist
+(created by db/init/init.sql or by earlier Base.metadata.create_all runs), so
+this revision applies cleanly to both new and existing databases.
+
+Revision ID: 0001_initial_schema
+Revises:
+Create Date: 2026-10-16 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001_initial_schema"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ["backtest_jobs", "ema_backtests", "backtests", "adjusted_prices", "prices", "stocks"]
+
+
+def upgrade() -> None:
+    # Offline (--sql) runs cannot inspect the database and emit every table
+    existing = set() if context.is_offline_mode() else set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "stocks" not in existing:
+        op.create_table(
+            "stocks",
+            sa.Column("id", sa.Integer(), primary_key=True, index=True),
+            sa.Column("symbol", sa.String(10), nullable=False, unique=True),
+            sa.Column("name", sa.String(255)),
+        )
+
+    if "prices" not in existing:
+        op.create_table(
+            "prices",
+            sa.Column("id", sa.Integer(), primary_key=True, index=True),
+            sa.Column("stock_id", sa.Integer(), sa.ForeignKey("stocks.id"), nullable=False),
+            sa.Column("date", sa.Date(), nullable=False),
+            sa.Column("open_price", sa.DECIMAL(10, 4)),
+            sa.Column("high", sa.DECIMAL(10, 4)),
+            sa.Column("low", sa.DECIMAL(10, 4)),
+            sa.Column("close", sa.DECIMAL(10, 4)),
+            sa.Column("volume", sa.BIGINT()),
+            sa.UniqueConstraint("stock_id", "date", name="prices_stock_id_date_key"),
+        )
+
+    if "adjusted_prices" not in existing:
+        op.create_table(
+            "adjusted_prices",
+            sa.Column("id", sa.Integer(), primary_key=True, index=True),
+            sa.Column("stock_id", sa.Integer(), sa.ForeignKey("stocks.id"), nullable=False),
+            sa.Column("date", sa.Date(), nullable=False),
+            sa.Column("close", sa.DECIMAL(10, 4)),
+            sa.Column("high", sa.DECIMAL(10, 4)),
+            sa.Column("low", sa.DECIMAL(10, 4)),
+            sa.Column("open", sa.DECIMAL(10, 4)),
+            sa.Column("volume", sa.BIGINT()),
+            sa.Column("adj_close", sa.DECIMAL(10, 4)),
+            sa.Column("adj_high", sa.DECIMAL(10, 4)),
+            sa.Column("adj_low", sa.DECIMAL(10, 4)),
+            sa.Column("adj_open", sa.DECIMAL(10, 4)),
+            sa.Column("adj_volume", sa.BIGINT()),
+            sa.Column("div_cash", sa.DECIMAL(10, 4)),
+            sa.Column("split_factor", sa.DECIMAL(10, 4)),
+        )
+
+    if "backtests" not in existing:
+        op.create_table(
+            "backtests",
+            sa.Column("id", sa.Integer(), primary_key=True, index=True),
+            sa.Column("name", sa.String(255), nullable=False),
+            sa.Column("strategy", sa.String(100)),
+            sa.Column("start_date", sa.Date()),
+            sa.Column("end_date", sa.Date()),
+            sa.Column("initial_capital", sa.DECIMAL(15, 2)),
+            sa.Column("final_capital", sa.DECIMAL(15, 2)),
+            sa.Column("created_at", sa.TIMESTAMP()),
+        )
+
+    if "ema_backtests" not in existing:
+        op.create_table(
+            "ema_backtests",
+            sa.Column("id", sa.Integer(), primary_key=True, index=True),
+            sa.Column("symbol", sa.String(10), nullable=False),
+            sa.Column("short_period", sa.Integer(), nullable=False),
+            sa.Column("long_period", sa.Integer(), nullable=False),
+            sa.Column("start_date", sa.Date(), nullable=False),
+            sa.Column("end_date", sa.Date(), nullable=False),
+            sa.Column("initial_cash", sa.DECIMAL(15, 2), nullable=False),
+            sa.Column("final_cash", sa.DECIMAL(15, 2), nullable=False),
+            sa.Column("total_return", sa.DECIMAL(15, 4), nullable=False),
+            sa.Column("total_return_percent", sa.DECIMAL(15, 4), nullable=False),
+            sa.Column("num_trades", sa.Integer()),
+            sa.Column("cagr", sa.DECIMAL(10, 6)),
+            sa.Column("created_at", sa.TIMESTAMP()),
+        )
+
+    if "backtest_jobs" not in existing:
+        op.create_table(
+            "backtest_jobs",
+            sa.Column("id", sa.Integer(), primary_key=True, index=True),
+            sa.Column("kind", sa.String(50), nullable=False),
+            sa.Column("status", sa.String(20), nullable=False, index=True),
+            sa.Column("params", sa.JSON(), nullable=False),
+            sa.Column("total", sa.Integer(), nullable=False),
+            sa.Column("completed", sa.Integer(), nullable=False),
+            sa.Column("results", sa.JSON()),
+            sa.Column("error", sa.Text()),
+            sa.Column("created_at", sa.TIMESTAMP()),
+            sa.Column("started_at", sa.TIMESTAMP()),
+            sa.Column("updated_at", sa.TIMESTAMP()),
+            sa.Column("finished_at", sa.TIMESTAMP()),
+        )
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        op.drop_table(table)
@@ -0,0 +1,73 @@
+"""Indexes and unique keys for the backtest read paths
+
+- uq_adjusted_prices_stock_date: UNIQUE (stock_id, date). Its index serves the
+  per-symbol date range scans behind load_prices, so no separate index is added.
+- uq_ema_backtests_combination: one row per (symbol, short_period, long_period,
+  start_date, end_date, initial_cash), the key of the result upsert.
+- ix_ema_backtests_symbol_range: (symbol, start_date, end_date, initial_cash)
+  for the best/summary filters.
+
+Duplicate rows are removed before each unique key is added (the oldest
+adjusted price and the newest backtest result are kept). Objects that already
+exist, e.g. from add_adjusted_prices_unique.sql, are left alone.
+
+Revision ID: 0002_backtest_read_indexes
+Revises: 0001_initial_schema
+Create Date: 2026-10-16 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002_backtest_read_indexes"
+down_revision: Union[str, None] = "0001_initial_schema"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+EMA_KEY = ["symbol", "short_period", "long_period", "start_date", "end_date", "initial_cash"]
+EMA_RANGE = ["symbol", "start_date", "end_date", "initial_cash"]
+
+
+def _unique_constraints(table: str) -> set:
+    if context.is_offline_mode():
+        return set()
+    return {uc["name"] for uc in sa.inspect(op.get_bind()).get_unique_constraints(table)}
+
+
+def _indexes(table: str) -> set:
+    if context.is_offline_mode():
+        return set()
+    return {ix["name"] for ix in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade() -> None:
+    if "uq_adjusted_prices_stock_date" not in _unique_constraints("adjusted_prices"):
+        op.execute(
+            "DELETE FROM adjusted_prices WHERE id NOT IN "
+            "(SELECT MIN(id) FROM adjusted_prices GROUP BY stock_id, date)"
+        )
+        with op.batch_alter_table("adjusted_prices") as batch_op:
+            batch_op.create_unique_constraint("uq_adjusted_prices_stock_date", ["stock_id", "date"])
+
+    if "uq_ema_backtests_combination" not in _unique_constraints("ema_backtests"):
+        op.execute(
+            "DELETE FROM ema_backtests WHERE id NOT IN "
+            f"(SELECT MAX(id) FROM ema_backtests GROUP BY {', '.join(EMA_KEY)})"
+        )
+        with op.batch_alter_table("ema_backtests") as batch_op:
+            batch_op.create_unique_constraint("uq_ema_backtests_combination", EMA_KEY)
+
+    if "ix_ema_backtests_symbol_range" not in _indexes("ema_backtests"):
+        op.create_index("ix_ema_backtests_symbol_range", "ema_backtests", EMA_RANGE)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_ema_backtests_symbol_range", table_name="ema_backtests")
+    with op.batch_alter_table("ema_backtests") as batch_op:
+        batch_op.drop_constraint("uq_ema_backtests_combination", type_="unique")
+    with op.batch_alter_table("adjusted_prices") as batch_op:
+        batch_op.drop_constraint("uq_adjusted_prices_stock_date", type_="unique")
@@ -0,0 +1,43 @@
+"""Indicators table
+
+indicators holds precomputed indicator series, one row per (stock_id, kind,
+period, date), maintained by the adjusted price ingest. The unique key's index
+serves the per-series date range reads, so no separate index is added.
+
+Revision ID: 0003_indicators
+Revises: 0002_backtest_read_indexes
+Create Date: 2026-10-16 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003_indicators"
+down_revision: Union[str, None] = "0002_backtest_read_indexes"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The table may already exist from Base.metadata.create_all at app startup
+    if not context.is_offline_mode() and "indicators" in sa.inspect(op.get_bind()).get_table_names():
+        return
+
+    op.create_table(
+        "indicators",
+        sa.Column("id", sa.Integer(), primary_key=True, index=True),
+        sa.Column("stock_id", sa.Integer(), sa.ForeignKey("stocks.id"), nullable=False),
+        sa.Column("date", sa.Date(), nullable=False),
+        sa.Column("kind", sa.String(20), nullable=False),
+        sa.Column("period", sa.Integer(), nullable=False),
+        sa.Column("value", sa.Float(), nullable=False),
+        sa.UniqueConstraint("stock_id", "kind", "period", "date", name="uq_indicators_stock_kind_period_date"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("indicators")
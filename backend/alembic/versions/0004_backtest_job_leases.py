@@ -0,0 +1,43 @@
+"""Backtest job leases
+
+backtest_jobs gains the id of the worker running a job and the time its lease
+runs out. Workers renew the lease while a job runs; any runner's periodic
+rescan requeues running jobs whose lease has expired.
+
+Revision ID: 0004_backtest_job_leases
+Revises: 0003_indicators
+Create Date: 2026-10-16 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004_backtest_job_leases"
+down_revision: Union[str, None] = "0003_indicators"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The columns may already exist from Base.metadata.create_all at app startup
+    existing = set()
+    if not context.is_offline_mode():
+        existing = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("backtest_jobs")}
+
+    with op.batch_alter_table("backtest_jobs") as batch_op:
+        if "worker_id" not in existing:
+            batch_op.add_column(sa.Column("worker_id", sa.String(100)))
+        if "lease_expires_at" not in existing:
+            batch_op.add_column(sa.Column("lease_expires_at", sa.TIMESTAMP()))
+            batch_op.create_index("ix_backtest_jobs_lease_expires_at", ["lease_expires_at"])
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("backtest_jobs") as batch_op:
+        batch_op.drop_index("ix_backtest_jobs_lease_expires_at")
+        batch_op.drop_column("lease_expires_at")
+        batch_op.drop_column("worker_id")
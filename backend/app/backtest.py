@@ -1,33 +1,70 @@
+from sqlalchemy import Float, cast, select
 from sqlalchemy.orm import Session
 from .models import Stock, AdjustedPrice, Backtest
-from .strategies import Strategy
+from .strategies import Strategy, StreamingStrategy
+from .price_cache import price_cache
+from .price_series import PriceBar, PriceSeries
+from .price_store import get_price_store
+from .metrics import metrics
 from datetime import date
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Union
+import itertools
+import time
 
 class BacktestEngine:
-    def __init__(self, strategy: Strategy, symbol: str, start_date: date, end_date: date, initial_cash: float = 10000):
+    def __init__(self, strategy: Strategy, symbol: str, start_date: date, end_date: date, initial_cash: float = 10000,
+                 prices: Optional[Union[PriceSeries, List[AdjustedPrice]]] = None, use_cache: bool = False,
+                 read_db: Optional[Session] = None):
+        """
+        Args:
+            prices: Optional preloaded price series (or rows) for symbol and date range, ordered by date
+            use_cache: Load prices through the shared in-process price cache
+            read_db: Session for the price load, e.g. on a read replica; run()'s
+                session is then only used to refill the cache after an ingest
+        """
         self.strategy = strategy
         self.symbol = symbol
         self.start_date = start_date
         self.end_date = end_date
         self.initial_cash = initial_cash
+        self.prices = prices
+        self.use_cache = use_cache
+        self.read_db = read_db
 
     def run(self, db: Session) -> Dict[str, Any]:
         prices = self._get_prices(db)
         if not prices:
             return {"error": "No price data found for the given symbol and date range"}
+        simulate_start = time.perf_counter()
+        series = prices if isinstance(prices, PriceSeries) else None
+        if series is not None:
+            prices = series.bars()
 
         cash = self.initial_cash
         position = 0
         trades = []
 
+        streaming = isinstance(self.strategy, StreamingStrategy)
+        if streaming:
+            self.strategy.reset()
+
         # Iterate through prices, but leave last day for potential execution
         for i, price in enumerate(prices[:-1]):  # Stop one day before the end
-            current_prices = prices[:i+1]
             next_day_price = prices[i+1]  # Next day for execution
 
+            if streaming:
+                # Feed one bar at a time; the strategy keeps its own indicator state
+                self.strategy.on_bar(price)
+                buy = self.strategy.buy_signal
+                sell = self.strategy.sell_signal
+            else:
+                # Prefix views of a PriceSeries are free; lists are sliced as before
+                current_prices = series[:i+1] if series is not None else prices[:i+1]
+                buy = lambda position, cash: self.strategy.should_buy(current_prices, position, cash)
+                sell = lambda position, cash: self.strategy.should_sell(current_prices, position, cash)
+
             # Check buy signal based on current day's data, execute at next day's open
-            if self.strategy.should_buy(current_prices, position, cash):
+            if buy(position, cash):
                 if cash > 0:
                     shares = int(cash // float(next_day_price.adj_open))
                     if shares > 0:
@@ -44,7 +81,7 @@ class BacktestEngine:
                         })
 
             # Check sell signal based on current day's data, execute at next day's open
-            if self.strategy.should_sell(current_prices, position, cash):
+            if sell(position, cash):
                 if position > 0:
                     cash += position * float(next_day_price.adj_open)
                     trades.append({
@@ -74,6 +111,8 @@ class BacktestEngine:
 
         total_value = cash
         total_return = (total_value - self.initial_cash) / self.initial_cash if self.initial_cash > 0 else 0
+        metrics.observe("simulate", time.perf_counter() - simulate_start)
+        metrics.inc("backtest_bars_processed_total", len(prices))
 
         return {
             'symbol': self.symbol,
@@ -87,13 +126,90 @@ class BacktestEngine:
             'num_trades': len(trades)
         }
 
-    def _get_prices(self, db: Session) -> List[AdjustedPrice]:
-        stock = db.query(Stock).filter(Stock.symbol == self.symbol.upper()).first()
-        if not stock:
-            return []
-        prices = db.query(AdjustedPrice).filter(
-            AdjustedPrice.stock_id == stock.id,
-            AdjustedPrice.date >= self.start_date,
-            AdjustedPrice.date <= self.end_date
-        ).order_by(AdjustedPrice.date).all()
+    def _get_prices(self, db: Session) -> Union[PriceSeries, List[AdjustedPrice]]:
+        if self.prices is not None:
+            return self.prices
+        return fetch_prices(self.read_db or db, self.symbol, self.start_date, self.end_date, self.use_cache,
+                            primary_db=db)
+
+def fetch_prices(db: Session, symbol: str, start_date: date, end_date: date,
+                 use_cache: bool = False, primary_db: Optional[Session] = None) -> PriceSeries:
+    """
+    Get the price series for a backtest.
+
+    Reads the memory-mapped columnar store when PRICE_STORE_DIR is set and
+    holds the symbol; otherwise loads from the database, optionally through
+    the shared price cache. When db is a read replica session, pass the primary
+    session as primary_db: cache misses shortly after an ingest invalidated the
+    symbol load from it, so replica lag cannot put a stale series in the cache.
+    """
+    with metrics.timer("load"):
+        store = get_price_store()
+        if store is not None:
+            series = store.read(symbol, start_date, end_date)
+            if series is not None:
+                return series
+        if use_cache:
+            primary_loader = None
+            if primary_db is not None and primary_db is not db:
+                primary_loader = lambda: load_prices(primary_db, symbol, start_date, end_date)
+            return price_cache.get(symbol, start_date, end_date,
+                                   lambda: load_prices(db, symbol, start_date, end_date), primary_loader)
+        return load_prices(db, symbol, start_date, end_date)
+
+# Only the columns the engine and strategies read, cast to float on the database side
+_SERIES_COLUMNS = (
+    AdjustedPrice.date,
+    cast(AdjustedPrice.adj_open, Float).label("adj_open"),
+    cast(AdjustedPrice.adj_close, Float).label("adj_close")
+)
+
+def load_prices(db: Session, symbol: str, start_date: date, end_date: date) -> PriceSeries:
+    """
+    Load adjusted prices for a symbol and date range, ordered by date.
+
+    Uses one narrow SELECT of date, adj_open and adj_close; no ORM objects are
+    created, and the returned series is independent of the session.
+    """
+    rows = db.execute(
+        select(*_SERIES_COLUMNS)
+        .join(Stock, Stock.id == AdjustedPrice.stock_id)
+        .where(
+            Stock.symbol == symbol.upper(),
+            AdjustedPrice.date >= start_date,
+            AdjustedPrice.date <= end_date
+        )
+        .order_by(AdjustedPrice.date)
+    ).all()
+    if not rows:
+        return PriceSeries.empty()
+    return PriceSeries.from_columns(*zip(*rows))
+
+def load_prices_for_symbols(db: Session, symbols: List[str], start_date: date,
+                            end_date: date) -> Dict[str, PriceSeries]:
+    """
+    Load adjusted prices for several symbols in a single query.
+
+    Returns a PriceSeries per upper-cased symbol, ordered by date; symbols
+    without stored prices are left out.
+    """
+    symbols = list(dict.fromkeys(symbol.upper() for symbol in symbols))
+    if not symbols:
+        return {}
+    with metrics.timer("load"):
+        rows = db.execute(
+            select(Stock.symbol, *_SERIES_COLUMNS)
+            .join(Stock, Stock.id == AdjustedPrice.stock_id)
+            .where(
+                Stock.symbol.in_(symbols),
+                AdjustedPrice.date >= start_date,
+                AdjustedPrice.date <= end_date
+            )
+            .order_by(AdjustedPrice.stock_id, AdjustedPrice.date)
+        ).all()
+
+        prices: Dict[str, PriceSeries] = {}
+        for symbol, symbol_rows in itertools.groupby(rows, key=lambda row: row[0]):
+            _, dates, adj_open, adj_close = zip(*symbol_rows)
+            prices[symbol] = PriceSeries.from_columns(dates, adj_open, adj_close)
         return prices
@@ -1,10 +1,52 @@
+from sqlalchemy import func, inspect, select
 from sqlalchemy.orm import Session
-from .models import EMABacktest
-from .backtest import BacktestEngine
+from .backtest import BacktestEngine, fetch_prices
+from .ingest import dialect_insert
+from .models import EMABacktest, AdjustedPrice
+from .price_series import PriceSeries, price_values
 from .strategies.ema_crossover import EMACrossoverStrategy
+from .vectorized_backtest import VectorizedEMAEngine
+from .parallel_backtest import iter_combinations_parallel, run_combinations_parallel
+from .indicators import IndicatorCache, calculate_ema
+from .indicator_store import EMA, load_indicator
+from .metrics import metrics
 from datetime import date
-from typing import List, Tuple, Optional
+from typing import Callable, Dict, Iterator, List, Tuple, Optional, Union
 import itertools
+import math
+
+# uq_ema_backtests_combination: one stored result per combination
+RESULT_KEY_NAME = "uq_ema_backtests_combination"
+RESULT_KEY_COLUMNS = ["symbol", "short_period", "long_period", "start_date", "end_date", "initial_cash"]
+RESULT_UPDATE_COLUMNS = ["final_cash", "total_return", "total_return_percent", "num_trades", "cagr"]
+
+# Percentiles of total_return_percent reported by get_combination_summary
+SUMMARY_PERCENTILES = {"p10": 0.1, "p25": 0.25, "median": 0.5, "p75": 0.75, "p90": 0.9}
+
+# Whether each database (by URL) has RESULT_KEY_NAME, checked once per process
+_result_key_present: Dict[str, bool] = {}
+
+def has_result_key(db: Session) -> bool:
+    """
+    Whether ema_backtests has the unique key the result upsert conflicts on.
+
+    Databases created before migration 0002 (or add_ema_backtests_unique.sql)
+    lack it; results are then inserted without the upsert and a warning is
+    printed once. The answer is cached, so apply the migration and restart.
+    """
+    bind = db.get_bind()
+    url = str(bind.url)
+    present = _result_key_present.get(url)
+    if present is None:
+        inspector = inspect(bind)
+        names = {uc["name"] for uc in inspector.get_unique_constraints(EMABacktest.__tablename__)}
+        names |= {ix["name"] for ix in inspector.get_indexes(EMABacktest.__tablename__) if ix.get("unique")}
+        present = _result_key_present[url] = RESULT_KEY_NAME in names
+        if not present:
+            print(f"Warning: ema_backtests has no {RESULT_KEY_NAME} unique key, so re-run combinations are "
+                  f"stored as duplicate rows. Run `alembic upgrade head` (or add_ema_backtests_unique.sql) "
+                  f"and restart the API.")
+    return present
 
 class EMABacktester:
     """
@@ -16,8 +58,13 @@ class EMABacktester:
     3. Long periods range from 10 to 60
     4. Records comprehensive backtest results in the database
     """
+
+    MODES = ["loop", "vectorized", "process"]
     
-    def __init__(self, symbol: str, start_date: date, end_date: date, initial_cash: float = 10000):
+    def __init__(self, symbol: str, start_date: date, end_date: date, initial_cash: float = 10000,
+                 use_price_cache: bool = False, use_stored_indicators: bool = False,
+                 read_db: Optional[Session] = None,
+                 prices: Optional[Union[PriceSeries, List[AdjustedPrice]]] = None):
         """
         Initialize the EMA Backtester.
         
@@ -26,11 +73,26 @@ class EMABacktester:
             start_date: Start date for backtesting
             end_date: End date for backtesting
             initial_cash: Initial cash amount for backtesting
+            use_price_cache: Load prices through the shared in-process price cache
+            use_stored_indicators: Read EMAs from the indicators table ("loop" mode only).
+                                   Stored EMAs are seeded at the first stored bar, so they
+                                   carry history from before start_date
+            read_db: Session for price and stored indicator reads, e.g. on a read
+                     replica; defaults to the session passed to each method
+            prices: Price series to backtest instead of loading it from the
+                    database, e.g. one already loaded for several symbols
         """
         self.symbol = symbol.upper()
         self.start_date = start_date
         self.end_date = end_date
         self.initial_cash = initial_cash
+        self.use_price_cache = use_price_cache
+        self.use_stored_indicators = use_stored_indicators
+        self.read_db = read_db
+        self.indicator_cache = IndicatorCache()
+        self._prices = prices
+        self._price_values: Dict[str, List[float]] = {}
+        self._stored_emas: Dict[int, List[Optional[float]]] = {}
         self._validate_parameters()
 
     def _validate_parameters(self):
@@ -113,9 +175,29 @@ class EMABacktester:
         Run backtest for a single EMA combination.
         Stores num_trades and CAGR in the database.
         """
+        result = self._run_combination(db, short_period, long_period)
+        if result is None:
+            return None
+
+        try:
+            self._save_results(db, [result])
+        except Exception as e:
+            print(f"Exception during backtest for EMA {short_period}/{long_period}: {str(e)}")
+            return None
+
+        return result
+
+    def _run_combination(self, db: Session, short_period: int, long_period: int) -> Optional[dict]:
+        """Run backtest for a single EMA combination without storing it."""
         try:
-            strategy = EMACrossoverStrategy(short_period=short_period, long_period=long_period)
-            engine = BacktestEngine(strategy, self.symbol, self.start_date, self.end_date, self.initial_cash)
+            strategy = EMACrossoverStrategy(
+                short_period=short_period,
+                long_period=long_period,
+                ema_short=self._ema_series(db, short_period),
+                ema_long=self._ema_series(db, long_period)
+            )
+            engine = BacktestEngine(strategy, self.symbol, self.start_date, self.end_date, self.initial_cash,
+                                    prices=self._get_prices(db))
             result = engine.run(db)
 
             if "error" in result:
@@ -127,30 +209,6 @@ class EMABacktester:
             if num_trades is None and "trades" in result:
                 num_trades = len(result["trades"])
 
-            # Calculate CAGR
-            years = (self.end_date - self.start_date).days / 365.25
-            cagr = None
-            if years > 0 and float(self.initial_cash) > 0 and float(result["final_cash"]) > 0:
-                cagr = (float(result["final_cash"]) / float(self.initial_cash)) ** (1 / years) - 1
-
-            # Create database record
-            ema_backtest = EMABacktest(
-                symbol=self.symbol,
-                short_period=short_period,
-                long_period=long_period,
-                start_date=self.start_date,
-                end_date=self.end_date,
-                initial_cash=self.initial_cash,
-                final_cash=result["final_cash"],
-                total_return=result["total_return"],
-                total_return_percent=result["total_return_percent"],
-                num_trades=num_trades,
-                cagr=cagr
-            )
-            db.add(ema_backtest)
-            db.commit()
-            db.refresh(ema_backtest)
-
             # Add combination info to result
             result.update({
                 "symbol": self.symbol,
@@ -163,50 +221,350 @@ class EMABacktester:
                 "total_return": float(result["total_return"]),
                 "total_return_percent": float(result["total_return_percent"]),
                 "num_trades": num_trades,
-                "cagr": cagr,
-                "backtest_id": ema_backtest.id
+                "cagr": self._calculate_cagr(result["final_cash"])
             })
 
             return result
 
         except Exception as e:
-            db.rollback()
             print(f"Exception during backtest for EMA {short_period}/{long_period}: {str(e)}")
             return None
 
+    def _get_prices(self, db: Session) -> Union[PriceSeries, List[AdjustedPrice]]:
+        """Load the price series once per sweep and share it with every engine."""
+        if self._prices is None:
+            self._prices = fetch_prices(self.read_db or db, self.symbol, self.start_date, self.end_date,
+                                        self.use_price_cache, primary_db=db)
+        return self._prices
+
+    def _ema_series(self, db: Session, period: int, price_field: str = "adj_close") -> List[Optional[float]]:
+        """Get the EMA series for a period from the indicator cache, computing it once per sweep."""
+        if self.use_stored_indicators and price_field == "adj_close":
+            return self._stored_ema(db, period)
+        values = self._price_values.get(price_field)
+        if values is None:
+            values = price_values(self._get_prices(db), price_field)
+            self._price_values[price_field] = values
+        with metrics.timer("indicator"):
+            return self.indicator_cache.ema(self.symbol, self.start_date, self.end_date, period,
+                                            values, price_field=price_field)
+
+    def _stored_ema(self, db: Session, period: int) -> List[Optional[float]]:
+        """
+        The stored EMA aligned to the backtest bars, read once per sweep.
+
+        If a bar from the EMA's seed bar on has no stored value, the series is
+        computed over the backtest range instead.
+        """
+        series = self._stored_emas.get(period)
+        if series is None:
+            prices = self._get_prices(db)
+            with metrics.timer("indicator"):
+                stored = dict(load_indicator(self.read_db or db, self.symbol, EMA, period,
+                                             self.start_date, self.end_date))
+                series = [stored.get(bar.date) for bar in prices]
+                if any(value is None for value in series[period - 1:]):
+                    print(f"Warning: Stored EMA {period} for {self.symbol} is incomplete; computing it instead")
+                    series = calculate_ema(price_values(prices, "adj_close"), period)
+            self._stored_emas[period] = series
+        return series
+
+    def _calculate_cagr(self, final_cash) -> Optional[float]:
+        """Calculate the compound annual growth rate over the backtest period."""
+        years = (self.end_date - self.start_date).days / 365.25
+        if years > 0 and float(self.initial_cash) > 0 and float(final_cash) > 0:
+            return (float(final_cash) / float(self.initial_cash)) ** (1 / years) - 1
+        return None
+
+    def _save_results(self, db: Session, results: List[dict]) -> None:
+        """
+        Store results with one bulk INSERT ... RETURNING in a single transaction.
+
+        Sets "backtest_id" on each result; rolls back and re-raises on failure.
+        """
+        try:
+            self.insert_results(db, results)
+            with metrics.timer("persist"):
+                db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+    def insert_results(self, db: Session, results: List[dict]) -> None:
+        """Bulk upsert the results and set "backtest_id" on each, without committing."""
+        if not results:
+            return
+
+        rows = [
+            {
+                "symbol": self.symbol,
+                "short_period": result["short_period"],
+                "long_period": result["long_period"],
+                "start_date": self.start_date,
+                "end_date": self.end_date,
+                "initial_cash": self.initial_cash,
+                "final_cash": result["final_cash"],
+                "total_return": result["total_return"],
+                "total_return_percent": result["total_return_percent"],
+                "num_trades": result["num_trades"],
+                "cagr": result["cagr"]
+            }
+            for result in results
+        ]
+        # Re-running a combination replaces its stored result instead of adding a duplicate
+        stmt = dialect_insert(db, EMABacktest)
+        if has_result_key(db):
+            stmt = stmt.on_conflict_do_update(
+                index_elements=RESULT_KEY_COLUMNS,
+                set_={column: stmt.excluded[column] for column in RESULT_UPDATE_COLUMNS}
+            )
+        # Ids are matched back by combination: asking for RETURNING in parameter order makes
+        # SQLAlchemy send an upsert one row at a time. render_nulls keeps rows with a null
+        # cagr in the same multi-row INSERT instead of splitting the batch around them.
+        stmt = (stmt.returning(EMABacktest.id, EMABacktest.short_period, EMABacktest.long_period)
+                .execution_options(render_nulls=True))
+        with metrics.timer("persist"):
+            backtest_ids = {(short, long): backtest_id for backtest_id, short, long in db.execute(stmt, rows)}
+        metrics.inc("backtest_rows_written_total", len(rows), table=EMABacktest.__tablename__)
+
+        for result in results:
+            result["backtest_id"] = backtest_ids[(result["short_period"], result["long_period"])]
+
+    def run_vectorized(self, db: Session, combinations: List[Tuple[int, int]]) -> List[dict]:
+        """
+        Run all combinations at once with the vectorized NumPy engine, without storing them.
+
+        Prices are loaded once; results match run_single_combination for
+        final_cash, total_return, num_trades and cagr, without the trades list.
+        """
+        prices = self._get_prices(db)
+        if not prices:
+            print(f"Error for EMA sweep on {self.symbol}: No price data found for the given symbol and date range")
+            return []
+
+        engine = VectorizedEMAEngine.from_prices(prices, self.initial_cash)
+        results = engine.run(combinations)
+        for result in results:
+            result.update({
+                "symbol": self.symbol,
+                "start_date": str(self.start_date),
+                "end_date": str(self.end_date),
+                "initial_cash": float(self.initial_cash),
+                "cagr": self._calculate_cagr(result["final_cash"])
+            })
+        return results
+
+    def run_parallel(self, db: Session, combinations: List[Tuple[int, int]],
+                     workers: Optional[int] = None,
+                     progress: Optional[Callable[[int, int, List[dict]], None]] = None) -> List[dict]:
+        """
+        Run combinations across a ProcessPoolExecutor, without storing them.
+
+        Each worker receives the price series once and keeps its own indicator
+        cache; results come back in combination order.
+        """
+        prices = self._get_prices(db)
+        if not prices:
+            print(f"Error for EMA sweep on {self.symbol}: No price data found for the given symbol and date range")
+            return []
+
+        results = run_combinations_parallel(self.symbol, self.start_date, self.end_date, self.initial_cash,
+                                            prices, combinations, workers, progress)
+        return [result for result in results if result]
+
     def run_combinations(self, db: Session, 
                         short_periods: Optional[List[int]] = None, 
-                        long_periods: Optional[List[int]] = None) -> List[dict]:
+                        long_periods: Optional[List[int]] = None,
+                        mode: str = "loop",
+                        workers: Optional[int] = None,
+                        progress: Optional[Callable[[int, int, List[dict]], None]] = None,
+                        reuse_existing: bool = False) -> List[dict]:
         """
         Run backtests for multiple EMA combinations.
+        Every result is upserted with one bulk insert and committed in one
+        transaction once the sweep finishes, so a failure stores nothing.
         
         Args:
             db: Database session
             short_periods: List of short EMA periods (multiples of 5, max 60)
             long_periods: List of long EMA periods (multiples of 5, max 120)
+            mode: "loop" runs one BacktestEngine per combination, "vectorized"
+                  runs every combination at once with NumPy (no trades list),
+                  "process" spreads the loop across a process pool
+            workers: Process pool size for "process" mode (default EMA_BACKTEST_WORKERS or CPU count)
+            progress: Optional callback(completed, total, new_results) called as combinations finish;
+                      new results are not stored yet, so they carry no backtest_id
+            reuse_existing: Return stored results for combinations already in ema_backtests
+                            and only run the missing ones
             
         Returns:
-            List of backtest results
+            List of backtest results, in combination order
         """
-        combinations = self.generate_ema_combinations(short_periods, long_periods)
-        
-        print(f"Running {len(combinations)} EMA combinations for {self.symbol} "
-              f"from {self.start_date} to {self.end_date}")
-        
-        results = []
-        successful_runs = 0
-        
-        for i, (short, long) in enumerate(combinations, 1):
-            print(f"Processing combination {i}/{len(combinations)}: EMA {short}/{long}")
-            
-            result = self.run_single_combination(db, short, long)
-            if result:
-                results.append(result)
-                successful_runs += 1
-        
-        print(f"Completed {successful_runs}/{len(combinations)} backtests successfully")
+        combinations, reused, combinations_to_run = self._plan_sweep(db, short_periods, long_periods, mode,
+                                                                     reuse_existing)
+        if reused and progress:
+            progress(len(reused), len(combinations), reused)
+
+        results: List[dict] = []
+        try:
+            if combinations_to_run:
+                for completed, batch in self.iter_batches(db, combinations_to_run, mode, workers, 50):
+                    results.extend(batch)
+                    if progress:
+                        progress(len(reused) + completed, len(combinations), batch)
+                self.insert_results(db, results)
+            with metrics.timer("persist"):
+                db.commit()
+        except BaseException:
+            db.rollback()
+            raise
+
+        print(f"Completed {len(results)}/{len(combinations_to_run)} backtests successfully")
+        if reuse_existing:
+            results = sorted(reused + results, key=lambda result: (result["short_period"], result["long_period"]))
         return results
 
+    def iter_combinations(self, db: Session,
+                          short_periods: Optional[List[int]] = None,
+                          long_periods: Optional[List[int]] = None,
+                          mode: str = "loop",
+                          workers: Optional[int] = None,
+                          progress: Optional[Callable[[int, int, List[dict]], None]] = None,
+                          include_trades: bool = True,
+                          batch_size: int = 50,
+                          reuse_existing: bool = False) -> Iterator[dict]:
+        """
+        Run backtests for multiple EMA combinations, yielding each result once it is stored.
+
+        Results are upserted in batches of up to batch_size as they finish and
+        each batch is committed before it is yielded, so every backtest_id a
+        consumer sees is durable and only one batch is held in memory at a time.
+        Stopping the iteration early keeps the batches already yielded; a
+        failure rolls back only the batch in progress. This suits streaming
+        responses; run_combinations stores a sweep in one transaction instead.
+        Takes the same arguments as run_combinations; include_trades=False
+        drops each result's trades list.
+
+        With reuse_existing=True, combinations already stored for this symbol,
+        date range and initial cash are read back with one query and yielded
+        first (marked "reused", without trades); only the rest are run.
+        """
+        if batch_size <= 0:
+            raise ValueError("Batch size must be positive")
+        combinations, reused, combinations_to_run = self._plan_sweep(db, short_periods, long_periods, mode,
+                                                                     reuse_existing)
+
+        stored = 0
+        try:
+            if reused:
+                if progress:
+                    progress(len(reused), len(combinations), reused)
+                yield from reused
+
+            if combinations_to_run:
+                for completed, batch in self.iter_batches(db, combinations_to_run, mode, workers, batch_size):
+                    if not include_trades:
+                        for result in batch:
+                            result.pop("trades", None)
+                    self.insert_results(db, batch)
+                    with metrics.timer("persist"):
+                        db.commit()
+                    if progress:
+                        progress(len(reused) + completed, len(combinations), batch)
+                    stored += len(batch)
+                    yield from batch
+        except BaseException:
+            # Also covers GeneratorExit when a consumer stops early; committed batches stay stored
+            db.rollback()
+            raise
+
+        print(f"Completed {stored}/{len(combinations_to_run)} backtests successfully")
+
+    def _plan_sweep(self, db: Session, short_periods: Optional[List[int]], long_periods: Optional[List[int]],
+                    mode: str, reuse_existing: bool) -> Tuple[List[Tuple[int, int]], List[dict], List[Tuple[int, int]]]:
+        """Validate a sweep and return (all combinations, reused results, combinations to run)."""
+        if mode not in self.MODES:
+            raise ValueError(f"Mode must be one of {self.MODES}")
+        if self.use_stored_indicators and mode != "loop":
+            raise ValueError("Stored indicators are only supported in loop mode")
+
+        combinations = self.generate_ema_combinations(short_periods, long_periods)
+
+        reused: List[dict] = []
+        if reuse_existing:
+            existing = self._load_existing(db, combinations)
+            reused = [existing[combination] for combination in combinations if combination in existing]
+            combinations_to_run = [combination for combination in combinations if combination not in existing]
+        else:
+            combinations_to_run = combinations
+
+        print(f"Running {len(combinations_to_run)} EMA combinations for {self.symbol} "
+              f"from {self.start_date} to {self.end_date} ({mode} mode, {len(reused)} reused)")
+        return combinations, reused, combinations_to_run
+
+    def _load_existing(self, db: Session, combinations: List[Tuple[int, int]]) -> Dict[Tuple[int, int], dict]:
+        """Fetch stored results for this symbol, date range and initial cash in one query."""
+        wanted = set(combinations)
+        rows = db.execute(
+            select(EMABacktest).where(*self._result_filter())
+        ).scalars().all()
+
+        existing = {}
+        for row in rows:
+            if (row.short_period, row.long_period) not in wanted:
+                continue
+            existing[(row.short_period, row.long_period)] = {
+                "symbol": row.symbol,
+                "short_period": row.short_period,
+                "long_period": row.long_period,
+                "start_date": str(row.start_date),
+                "end_date": str(row.end_date),
+                "initial_cash": float(row.initial_cash),
+                "final_cash": float(row.final_cash),
+                "total_return": float(row.total_return),
+                "total_return_percent": float(row.total_return_percent),
+                "num_trades": row.num_trades,
+                "cagr": float(row.cagr) if row.cagr is not None else None,
+                "backtest_id": row.id,
+                "reused": True
+            }
+        return existing
+
+    def iter_batches(self, db: Session, combinations: List[Tuple[int, int]], mode: str,
+                     workers: Optional[int], batch_size: int) -> Iterator[Tuple[int, List[dict]]]:
+        """
+        Yield (combinations completed, successful results) as each batch of combinations
+        finishes, without storing them; pass each batch to insert_results to store it.
+        """
+        if mode == "vectorized":
+            results = self.run_vectorized(db, combinations)
+            for i in range(0, len(results), batch_size):
+                yield min(len(combinations), i + batch_size), results[i:i + batch_size]
+            if not results:
+                yield len(combinations), []
+        elif mode == "process":
+            prices = self._get_prices(db)
+            if not prices:
+                print(f"Error for EMA sweep on {self.symbol}: No price data found for the given symbol and date range")
+                yield len(combinations), []
+                return
+            completed = 0
+            for chunk_results in iter_combinations_parallel(self.symbol, self.start_date, self.end_date,
+                                                            self.initial_cash, prices, combinations, workers):
+                completed += len(chunk_results)
+                yield completed, [result for result in chunk_results if result]
+        else:
+            batch: List[dict] = []
+            for i, (short, long) in enumerate(combinations, 1):
+                print(f"Processing combination {i}/{len(combinations)}: EMA {short}/{long}")
+
+                result = self._run_combination(db, short, long)
+                if result:
+                    batch.append(result)
+                if len(batch) >= batch_size or i == len(combinations):
+                    yield i, batch
+                    batch = []
+
     def get_best_combination(self, db: Session, metric: str = "total_return_percent") -> Optional[EMABacktest]:
         """
         Get the best performing EMA combination for this symbol and date range.
@@ -222,12 +580,7 @@ class EMABacktester:
         if metric not in valid_metrics:
             raise ValueError(f"Metric must be one of {valid_metrics}")
 
-        query = db.query(EMABacktest).filter(
-            EMABacktest.symbol == self.symbol,
-            EMABacktest.start_date == self.start_date,
-            EMABacktest.end_date == self.end_date,
-            EMABacktest.initial_cash == self.initial_cash
-        )
+        query = db.query(EMABacktest).filter(*self._result_filter())
 
         if metric == "total_return_percent":
             best = query.order_by(EMABacktest.total_return_percent.desc()).first()
@@ -238,35 +591,156 @@ class EMABacktester:
 
         return best
 
-    def get_combination_summary(self, db: Session) -> dict:
+    def get_combination_summary(self, db: Session, heatmap_bucket: int = 5) -> dict:
         """
         Get summary statistics for all combinations tested.
+
+        Everything is aggregated in the database. The overall stats take one
+        query, with stddev_samp and percentile_cont on PostgreSQL. Other databases
+        get the standard deviation from a two-pass sum of squared deviations in
+        the same query, plus one small ORDER BY ... LIMIT lookup per percentile.
+        The per-short-period, per-long-period and bucketed short x long heatmap
+        breakdowns take one GROUP BY query each.
         
         Args:
             db: Database session
+            heatmap_bucket: Width, in periods, of each heatmap cell
             
         Returns:
             Dictionary with summary statistics
         """
-        query = db.query(EMABacktest).filter(
-            EMABacktest.symbol == self.symbol,
-            EMABacktest.start_date == self.start_date,
-            EMABacktest.end_date == self.end_date,
-            EMABacktest.initial_cash == self.initial_cash
-        )
+        if heatmap_bucket <= 0:
+            raise ValueError("Heatmap bucket must be positive")
 
-        results = query.all()
-        if not results:
+        conditions = self._result_filter()
+        postgres = db.get_bind().dialect.name == "postgresql"
+        overall = db.execute(self._overall_summary_query(conditions, postgres)).one()
+        if not overall.count:
             return {"message": "No backtest results found"}
 
-        returns = [float(r.total_return_percent) for r in results]
-        
+        if postgres:
+            percentiles = {name: _float(overall._mapping[name]) for name in SUMMARY_PERCENTILES}
+            stddev = _float(overall.stddev)
+        else:
+            percentiles = {name: self._percentile(db, conditions, overall.count, fraction)
+                           for name, fraction in SUMMARY_PERCENTILES.items()}
+            stddev = (math.sqrt(max(float(overall.squared_deviations), 0.0) / (overall.count - 1))
+                      if overall.count > 1 else None)
+
         return {
             "symbol": self.symbol,
-            "total_combinations": len(results),
-            "best_return_percent": max(returns),
-            "worst_return_percent": min(returns),
-            "average_return_percent": sum(returns) / len(returns),
-            "profitable_combinations": len([r for r in returns if r > 0]),
+            "total_combinations": overall.count,
+            "best_return_percent": float(overall.best),
+            "worst_return_percent": float(overall.worst),
+            "average_return_percent": float(overall.average),
+            "median_return_percent": percentiles["median"],
+            "stddev_return_percent": stddev,
+            "percentiles": percentiles,
+            "profitable_combinations": overall.profitable,
+            "by_short_period": self._grouped_summary(db, conditions, EMABacktest.short_period),
+            "by_long_period": self._grouped_summary(db, conditions, EMABacktest.long_period),
+            "heatmap": self._heatmap(db, conditions, heatmap_bucket),
             "date_range": f"{self.start_date} to {self.end_date}"
         }
+
+    def _overall_summary_query(self, conditions: list, postgres: bool):
+        """Count, best, worst, average, profitable count and spread of the results in one SELECT."""
+        ret = EMABacktest.total_return_percent
+        columns = [
+            func.count().label("count"),
+            func.max(ret).label("best"),
+            func.min(ret).label("worst"),
+            func.avg(ret).label("average"),
+            func.count().filter(ret > 0).label("profitable")
+        ]
+        if postgres:
+            columns.append(func.stddev_samp(ret).label("stddev"))
+            columns += [
+                func.percentile_cont(fraction).within_group(ret).label(name)
+                for name, fraction in SUMMARY_PERCENTILES.items()
+            ]
+        else:
+            # Deviations from the mean rather than sum(x^2) - n*mean^2, which cancels badly for clustered values
+            mean = select(func.avg(ret)).where(*conditions).scalar_subquery()
+            columns.append(func.sum((ret - mean) * (ret - mean)).label("squared_deviations"))
+        return select(*columns).where(*conditions)
+
+    def _result_filter(self) -> list:
+        """WHERE conditions selecting the stored results for this symbol, date range and initial cash."""
+        return [
+            EMABacktest.symbol == self.symbol,
+            EMABacktest.start_date == self.start_date,
+            EMABacktest.end_date == self.end_date,
+            EMABacktest.initial_cash == self.initial_cash
+        ]
+
+    def _percentile(self, db: Session, conditions: list, count: int, fraction: float) -> float:
+        """
+        Continuous percentile (as percentile_cont) for databases without it.
+
+        Reads at most the two neighbouring values with ORDER BY ... LIMIT/OFFSET.
+        """
+        position = fraction * (count - 1)
+        lower = int(position)
+        values = db.execute(
+            select(EMABacktest.total_return_percent).where(*conditions)
+            .order_by(EMABacktest.total_return_percent).offset(lower).limit(2)
+        ).scalars().all()
+        if len(values) == 1:
+            return float(values[0])
+        return float(values[0]) + (float(values[1]) - float(values[0])) * (position - lower)
+
+    def _grouped_summary(self, db: Session, conditions: list, period_column) -> List[dict]:
+        """Count, best, worst, average and profitable results per value of period_column."""
+        ret = EMABacktest.total_return_percent
+        rows = db.execute(
+            select(
+                period_column.label("period"),
+                func.count().label("count"),
+                func.max(ret).label("best"),
+                func.min(ret).label("worst"),
+                func.avg(ret).label("average"),
+                func.count().filter(ret > 0).label("profitable")
+            ).where(*conditions).group_by(period_column).order_by(period_column)
+        ).all()
+        return [
+            {
+                "period": row.period,
+                "combinations": row.count,
+                "best_return_percent": float(row.best),
+                "worst_return_percent": float(row.worst),
+                "average_return_percent": float(row.average),
+                "profitable_combinations": row.profitable
+            }
+            for row in rows
+        ]
+
+    def _heatmap(self, db: Session, conditions: list, bucket: int) -> List[dict]:
+        """Average return per (short, long) cell, with periods grouped into buckets of width bucket."""
+        ret = EMABacktest.total_return_percent
+        short_bucket = (EMABacktest.short_period // bucket) * bucket
+        long_bucket = (EMABacktest.long_period // bucket) * bucket
+        rows = db.execute(
+            select(
+                short_bucket.label("short_from"),
+                long_bucket.label("long_from"),
+                func.count().label("count"),
+                func.avg(ret).label("average"),
+                func.max(ret).label("best")
+            ).where(*conditions).group_by(short_bucket, long_bucket).order_by(short_bucket, long_bucket)
+        ).all()
+        return [
+            {
+                "short_period_range": [row.short_from, row.short_from + bucket - 1],
+                "long_period_range": [row.long_from, row.long_from + bucket - 1],
+                "combinations": row.count,
+                "average_return_percent": float(row.average),
+                "best_return_percent": float(row.best)
+            }
+            for row in rows
+        ]
+
+
+def _float(value) -> Optional[float]:
+    return float(value) if value is not None else None
+
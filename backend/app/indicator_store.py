@@ -0,0 +1,119 @@
+from sqlalchemy import and_, func, select
+from sqlalchemy.orm import Session
+from .ingest import dialect_insert
+from .indicators import calculate_ema
+from .models import AdjustedPrice, Indicator, Stock
+from .metrics import metrics
+from datetime import date
+from typing import Dict, List, Optional, Sequence, Tuple
+import os
+import time
+
+EMA = "ema"
+
+# Union of the default EMA sweep ranges (short 3-20, long 10-60)
+DEFAULT_EMA_PERIODS = list(range(3, 61))
+
+def ema_periods() -> List[int]:
+    """
+    EMA periods kept in the indicators table.
+
+    INDICATOR_EMA_PERIODS overrides the default with a comma-separated list;
+    setting it to an empty string turns indicator maintenance off.
+    """
+    value = os.getenv("INDICATOR_EMA_PERIODS")
+    if value is None:
+        return DEFAULT_EMA_PERIODS
+    return sorted({int(period) for period in value.split(",") if period.strip()})
+
+def update_ema_indicators(db: Session, stock_id: int, changed_from: date,
+                          periods: Optional[Sequence[int]] = None) -> int:
+    """
+    Bring a stock's stored EMAs up to date after bars dated changed_from or later were written.
+
+    Each EMA is extended from its last stored value before changed_from, so
+    appending bars only computes the new ones; a period without a stored value
+    is computed from the first bar. Every value after the one it resumed from is
+    upserted.
+    Returns the number of values written. The caller commits.
+    """
+    periods = list(ema_periods() if periods is None else periods)
+    if not periods:
+        return 0
+
+    # Last stored (date, value) per period before the first changed bar
+    last_dates = (
+        select(Indicator.period, func.max(Indicator.date).label("date"))
+        .where(Indicator.stock_id == stock_id, Indicator.kind == EMA,
+               Indicator.period.in_(periods), Indicator.date < changed_from)
+        .group_by(Indicator.period)
+        .subquery()
+    )
+    states: Dict[int, Tuple[date, float]] = {
+        row.period: (row.date, row.value)
+        for row in db.execute(
+            select(Indicator.period, Indicator.date, Indicator.value).join(
+                last_dates,
+                and_(Indicator.period == last_dates.c.period, Indicator.date == last_dates.c.date)
+            ).where(Indicator.stock_id == stock_id, Indicator.kind == EMA)
+        )
+    }
+
+    # Only bars after the oldest state are needed unless some period starts from scratch
+    query = select(AdjustedPrice.date, AdjustedPrice.adj_close).where(
+        AdjustedPrice.stock_id == stock_id, AdjustedPrice.adj_close.isnot(None)
+    )
+    if len(states) == len(periods):
+        query = query.where(AdjustedPrice.date > min(state_date for state_date, _ in states.values()))
+    bars = db.execute(query.order_by(AdjustedPrice.date)).all()
+    dates = [bar.date for bar in bars]
+    closes = [float(bar.adj_close) for bar in bars]
+
+    rows = []
+    indicator_start = time.perf_counter()
+    for period in periods:
+        if period in states:
+            state_date, previous = states[period]
+            multiplier = 2 / (period + 1)
+            ema: List[Optional[float]] = []
+            for bar_date, close in zip(dates, closes):
+                if bar_date > state_date:
+                    # Same arithmetic as calculate_ema
+                    previous = (close * multiplier) + (previous * (1 - multiplier))
+                    ema.append(previous)
+                else:
+                    ema.append(None)
+        else:
+            ema = calculate_ema(closes, period)
+        rows.extend(
+            {"stock_id": stock_id, "date": bar_date, "kind": EMA, "period": period, "value": value}
+            for bar_date, value in zip(dates, ema)
+            if value is not None
+        )
+
+    metrics.observe("indicator", time.perf_counter() - indicator_start)
+
+    if rows:
+        stmt = dialect_insert(db, Indicator)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Indicator.stock_id, Indicator.kind, Indicator.period, Indicator.date],
+            set_={"value": stmt.excluded.value}
+        )
+        with metrics.timer("persist"):
+            db.execute(stmt, rows)
+        metrics.inc("backtest_rows_written_total", len(rows), table=Indicator.__tablename__)
+    return len(rows)
+
+def load_indicator(db: Session, symbol: str, kind: str, period: int,
+                   start_date: Optional[date] = None, end_date: Optional[date] = None) -> List[Tuple[date, float]]:
+    """Stored (date, value) pairs for one indicator series, oldest first."""
+    query = (
+        select(Indicator.date, Indicator.value)
+        .join(Stock, Stock.id == Indicator.stock_id)
+        .where(Stock.symbol == symbol.upper(), Indicator.kind == kind, Indicator.period == period)
+    )
+    if start_date is not None:
+        query = query.where(Indicator.date >= start_date)
+    if end_date is not None:
+        query = query.where(Indicator.date <= end_date)
+    return [(row.date, row.value) for row in db.execute(query.order_by(Indicator.date))]
@@ -0,0 +1,57 @@
+from datetime import date
+from typing import Dict, List, Optional, Sequence, Tuple
+
+def calculate_ema(values: Sequence[float], period: int) -> List[Optional[float]]:
+    """
+    Calculate an EMA aligned to the input bars.
+
+    The first EMA value is the SMA of the first `period` values and sits on bar
+    period - 1; earlier bars are None. Same arithmetic as EMACrossoverStrategy.
+    """
+    ema: List[Optional[float]] = [None] * len(values)
+    if len(values) < period:
+        return ema
+
+    multiplier = 2 / (period + 1)
+
+    # First EMA is SMA
+    previous = sum(values[:period]) / period
+    ema[period - 1] = previous
+
+    for i in range(period, len(values)):
+        previous = (values[i] * multiplier) + (previous * (1 - multiplier))
+        ema[i] = previous
+
+    return ema
+
+class IndicatorCache:
+    """
+    Per-request cache of indicator series.
+
+    Series are keyed by (symbol, start_date, end_date, price_field, period) so each
+    distinct EMA is computed once and shared by every combination that uses it.
+    """
+
+    def __init__(self):
+        self._series: Dict[Tuple[str, date, date, str, int], List[Optional[float]]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def ema(self, symbol: str, start_date: date, end_date: date, period: int,
+            values: Sequence[float], price_field: str = "adj_close") -> List[Optional[float]]:
+        """Return the EMA series for the key, computing it from `values` on first use."""
+        key = (symbol, start_date, end_date, price_field, period)
+        series = self._series.get(key)
+        if series is None:
+            self.misses += 1
+            series = calculate_ema(values, period)
+            self._series[key] = series
+        else:
+            self.hits += 1
+        return series
+
+    def clear(self) -> None:
+        self._series.clear()
+
+    def __len__(self) -> int:
+        return len(self._series)
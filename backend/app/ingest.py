@@ -0,0 +1,193 @@
+from sqlalchemy import func, literal_column, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from .models import AdjustedPrice, Price, Stock
+from .metrics import metrics
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+# adjusted_prices columns refreshed when an existing (stock_id, date) row is upserted
+ADJUSTED_PRICE_UPDATE_COLUMNS = [
+    "close", "high", "low", "open", "volume",
+    "adj_close", "adj_high", "adj_low", "adj_open", "adj_volume",
+    "div_cash", "split_factor"
+]
+
+# prices columns refreshed when an existing (stock_id, date) row is upserted
+PRICE_UPDATE_COLUMNS = ["open_price", "high", "low", "close", "volume"]
+
+def get_or_create_stock(db: Session, symbol: str) -> Stock:
+    """Return the stock for a symbol, creating and committing it if missing."""
+    stock = db.query(Stock).filter(Stock.symbol == symbol.upper()).first()
+    if not stock:
+        stock = Stock(symbol=symbol.upper())
+        db.add(stock)
+        db.commit()
+        db.refresh(stock)
+    return stock
+
+def alpha_vantage_rows(stock_id: int, prices_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Map Alpha Vantage daily price records to prices rows."""
+    return [
+        {
+            "stock_id": stock_id,
+            "date": datetime.strptime(p["date"], "%Y-%m-%d").date(),
+            "open_price": p["open"],
+            "high": p["high"],
+            "low": p["low"],
+            "close": p["close"],
+            "volume": p["volume"]
+        }
+        for p in prices_data
+    ]
+
+def tiingo_adjusted_rows(stock_id: int, prices_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Map Tiingo daily price records to adjusted_prices rows."""
+    rows = []
+    for price_data in prices_data:
+        # Parse the date string to a date object
+        date_str = price_data["date"][:10]  # Extract YYYY-MM-DD part
+        rows.append({
+            "stock_id": stock_id,
+            "date": datetime.strptime(date_str, "%Y-%m-%d").date(),
+            "close": price_data["close"],
+            "high": price_data["high"],
+            "low": price_data["low"],
+            "open": price_data["open"],
+            "volume": price_data["volume"],
+            "adj_close": price_data["adjClose"],
+            "adj_high": price_data["adjHigh"],
+            "adj_low": price_data["adjLow"],
+            "adj_open": price_data["adjOpen"],
+            "adj_volume": price_data["adjVolume"],
+            "div_cash": price_data["divCash"],
+            "split_factor": price_data["splitFactor"]
+        })
+    return rows
+
+def get_stored_date_range(db: Session, stock_id: int) -> Tuple[Optional[date], Optional[date]]:
+    """Return the (first, last) stored adjusted price dates for a stock, or (None, None)."""
+    first_date, last_date = db.execute(
+        select(func.min(AdjustedPrice.date), func.max(AdjustedPrice.date))
+        .where(AdjustedPrice.stock_id == stock_id)
+    ).one()
+    return first_date, last_date
+
+def has_corporate_action(rows: List[Dict[str, Any]]) -> bool:
+    """True if any row carries a split or a cash dividend, which re-adjusts earlier history."""
+    return any(
+        (row["split_factor"] is not None and float(row["split_factor"]) != 1)
+        or (row["div_cash"] is not None and float(row["div_cash"]) > 0)
+        for row in rows
+    )
+
+def first_changed_close(db: Session, stock_id: int, rows: List[Dict[str, Any]],
+                        update_existing: bool = False) -> Optional[date]:
+    """
+    Return the earliest date whose adjusted close an upsert of rows would change, or None.
+
+    Dates not yet stored always count; stored dates count only when
+    update_existing is True and the adjusted close differs at the stored
+    precision. Call it before the upsert, so that stored EMAs are only
+    recomputed from the first bar that is really new or different.
+    """
+    closes = {row["date"]: _stored_close(row["adj_close"]) for row in rows if row["stock_id"] == stock_id}
+    if not closes:
+        return None
+    stored = dict(db.execute(
+        select(AdjustedPrice.date, AdjustedPrice.adj_close).where(
+            AdjustedPrice.stock_id == stock_id,
+            AdjustedPrice.date.between(min(closes), max(closes))
+        )
+    ).all())
+    changed = [
+        day for day, close in closes.items()
+        if day not in stored or (update_existing and close != _stored_close(stored[day]))
+    ]
+    return min(changed, default=None)
+
+def _stored_close(value) -> Optional[float]:
+    # adj_close is DECIMAL(10, 4); compare incoming floats at that precision
+    return None if value is None else round(float(value), 4)
+
+def upsert_adjusted_prices(db: Session, rows: List[Dict[str, Any]], update_existing: bool = False) -> Tuple[int, int]:
+    """
+    Write adjusted price rows with one INSERT ... ON CONFLICT (stock_id, date).
+
+    Existing rows are skipped, or refreshed when update_existing is True.
+    Returns (inserted, updated). The caller commits.
+    """
+    update_columns = ADJUSTED_PRICE_UPDATE_COLUMNS if update_existing else None
+    return _upsert(db, AdjustedPrice, rows, update_columns)
+
+def upsert_prices(db: Session, rows: List[Dict[str, Any]]) -> Tuple[int, int]:
+    """
+    Write daily price rows with one INSERT ... ON CONFLICT (stock_id, date) DO UPDATE.
+
+    Returns (inserted, updated) as reported by the database. The caller commits.
+    """
+    return _upsert(db, Price, rows, PRICE_UPDATE_COLUMNS)
+
+def dialect_insert(db: Session, model):
+    """Return the dialect-specific insert() that supports ON CONFLICT."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(model)
+    if dialect == "sqlite":
+        return sqlite.insert(model)
+    raise ValueError(f"Bulk upsert is not supported for the '{dialect}' dialect")
+
+def _upsert(db: Session, model, rows: List[Dict[str, Any]],
+            update_columns: Optional[List[str]]) -> Tuple[int, int]:
+    """
+    Upsert rows keyed on (stock_id, date) and return (inserted, updated).
+
+    Rows repeating a key keep the last occurrence, since one statement cannot
+    touch the same row twice.
+    """
+    rows = list({(row["stock_id"], row["date"]): row for row in rows}.values())
+    if not rows:
+        return 0, 0
+    with metrics.timer("persist"):
+        inserted, updated = _upsert_rows(db, model, rows, update_columns)
+    metrics.inc("backtest_rows_written_total", inserted + updated, table=model.__tablename__)
+    return inserted, updated
+
+def _upsert_rows(db: Session, model, rows: List[Dict[str, Any]],
+                 update_columns: Optional[List[str]]) -> Tuple[int, int]:
+    """Run the upsert for rows with distinct keys and return (inserted, updated)."""
+    stmt = dialect_insert(db, model)
+    conflict_columns = [model.stock_id, model.date]
+
+    if not update_columns:
+        stmt = stmt.on_conflict_do_nothing(index_elements=conflict_columns)
+        inserted = len(db.execute(stmt.returning(model.id), rows).all())
+        return inserted, 0
+
+    stmt = stmt.on_conflict_do_update(
+        index_elements=conflict_columns,
+        set_={column: stmt.excluded[column] for column in update_columns}
+    )
+
+    if db.get_bind().dialect.name == "postgresql":
+        # xmax is 0 only for freshly inserted tuples
+        flags = db.execute(stmt.returning(literal_column("xmax = 0")), rows).scalars().all()
+        inserted = sum(1 for flag in flags if flag)
+        return inserted, len(flags) - inserted
+
+    existing = _count_existing(db, model, rows)
+    db.execute(stmt, rows)
+    return len(rows) - existing, existing
+
+def _count_existing(db: Session, model, rows: List[Dict[str, Any]]) -> int:
+    """Count rows whose (stock_id, date) key is already stored."""
+    existing = 0
+    for stock_id in {row["stock_id"] for row in rows}:
+        dates = [row["date"] for row in rows if row["stock_id"] == stock_id]
+        existing += db.execute(
+            select(func.count()).select_from(model).where(
+                model.stock_id == stock_id,
+                model.date.in_(dates)
+            )
+        ).scalar_one()
+    return existing
@@ -0,0 +1,313 @@
+from sqlalchemy import JSON, and_, cast, func, literal, or_, update
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Session, sessionmaker
+from .database import SessionLocal, read_session
+from .models import BacktestJob
+from .ema_backtester import EMABacktester
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Set
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+
+EMA_SWEEP_JOB = "ema_sweep"
+
+# Fields kept in a job's results; trade lists stay out of the job row
+RESULT_FIELDS = [
+    "short_period", "long_period", "final_cash", "total_return", "total_return_percent",
+    "num_trades", "cagr", "backtest_id"
+]
+
+class JobRunner:
+    """
+    Local worker pool that runs backtest jobs stored in the backtest_jobs table.
+
+    Job state lives in the database, so progress survives an API restart. A
+    running job is leased to one runner (worker_id) until lease_expires_at; the
+    runner renews its leases while the job runs, and a periodic rescan started
+    by start() requeues jobs whose lease expired because their worker went away.
+    """
+
+    def __init__(self, session_factory: sessionmaker = SessionLocal, max_workers: Optional[int] = None,
+                 progress_interval: float = 1.0, lease_seconds: Optional[float] = None):
+        self.session_factory = session_factory
+        self.max_workers = max_workers or int(os.getenv("BACKTEST_JOB_WORKERS", "2"))
+        self.progress_interval = progress_interval
+        self.lease_seconds = lease_seconds or float(os.getenv("BACKTEST_JOB_LEASE_SECONDS", "60"))
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        # Jobs submitted to this runner's pool that have not finished yet
+        self._pending: Set[int] = set()
+        # Jobs this runner has claimed and holds a lease on
+        self._active: Set[int] = set()
+        self._monitor: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._draining = False
+
+    def submit(self, job_id: int) -> None:
+        """Queue a stored job for execution."""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="backtest-job")
+            self._pending.add(job_id)
+            self._executor.submit(self.run, job_id)
+
+    def start(self) -> List[int]:
+        """
+        Resume pending jobs, then keep renewing this runner's leases and
+        rescanning for expired ones every third of the lease period.
+        """
+        job_ids = self.resume_pending()
+        with self._lock:
+            if self._monitor is None:
+                self._stop.clear()
+                self._monitor = threading.Thread(target=self._monitor_leases, name="backtest-job-leases",
+                                                 daemon=True)
+                self._monitor.start()
+        return job_ids
+
+    def shutdown(self, wait: bool = True) -> None:
+        # Leases keep being renewed while running jobs finish, but nothing new is picked up
+        self._draining = True
+        try:
+            with self._lock:
+                executor, self._executor = self._executor, None
+            if executor is not None:
+                executor.shutdown(wait=wait)
+            with self._lock:
+                monitor, self._monitor = self._monitor, None
+            if monitor is not None:
+                self._stop.set()
+                monitor.join()
+        finally:
+            self._draining = False
+
+    def _monitor_leases(self) -> None:
+        while not self._stop.wait(self.lease_seconds / 3):
+            try:
+                self.renew_leases()
+                if not self._draining:
+                    self.resume_pending()
+            except Exception as e:
+                print(f"Warning: Backtest job lease check failed: {e}")
+
+    def renew_leases(self) -> None:
+        """Extend the lease on every job this runner is running."""
+        with self._lock:
+            active = list(self._active)
+        if not active:
+            return
+        db = self.session_factory()
+        try:
+            db.execute(
+                update(BacktestJob)
+                .where(BacktestJob.id.in_(active), BacktestJob.worker_id == self.worker_id,
+                       BacktestJob.status == "running")
+                .values(lease_expires_at=self._lease_deadline())
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def resume_pending(self) -> List[int]:
+        """
+        Requeue running jobs whose lease has expired and submit every queued job
+        not already waiting in this runner's pool.
+
+        Jobs from before leases were recorded count as expired once they have
+        not reported progress for one lease period.
+        """
+        now = datetime.utcnow()
+        db = self.session_factory()
+        try:
+            db.execute(
+                update(BacktestJob)
+                .where(
+                    BacktestJob.status == "running",
+                    or_(
+                        BacktestJob.lease_expires_at < now,
+                        and_(BacktestJob.lease_expires_at.is_(None),
+                             BacktestJob.updated_at < now - timedelta(seconds=self.lease_seconds))
+                    )
+                )
+                .values(status="queued", completed=0, results=[], worker_id=None, lease_expires_at=None,
+                        updated_at=now)
+            )
+            db.commit()
+            job_ids = [job_id for (job_id,) in db.query(BacktestJob.id).filter(BacktestJob.status == "queued")]
+        finally:
+            db.close()
+
+        with self._lock:
+            job_ids = [job_id for job_id in job_ids if job_id not in self._pending]
+        for job_id in job_ids:
+            self.submit(job_id)
+        return job_ids
+
+    def run(self, job_id: int) -> None:
+        """Claim and run one job, recording progress and the outcome."""
+        db = self.session_factory()
+        try:
+            # Claim atomically so two workers never run the same job
+            now = datetime.utcnow()
+            claimed = db.execute(
+                update(BacktestJob)
+                .where(BacktestJob.id == job_id, BacktestJob.status == "queued")
+                .values(status="running", started_at=now, updated_at=now, completed=0, results=[],
+                        worker_id=self.worker_id, lease_expires_at=self._lease_deadline())
+            ).rowcount
+            db.commit()
+            if not claimed:
+                return
+            with self._lock:
+                self._active.add(job_id)
+
+            job = db.get(BacktestJob, job_id)
+            outcome: Dict[str, Any]
+            try:
+                if job.kind != EMA_SWEEP_JOB:
+                    raise ValueError(f"Unknown job kind '{job.kind}'")
+                results = self._run_ema_sweep(db, job)
+                outcome = {"status": "completed", "completed": job.total, "results": results}
+            except Exception as e:
+                db.rollback()
+                outcome = {"status": "failed", "error": str(e)}
+                print(f"Backtest job {job_id} failed: {str(e)}")
+
+            # A job whose lease was lost has been requeued elsewhere; leave its row to the new owner
+            now = datetime.utcnow()
+            db.execute(
+                update(BacktestJob)
+                .where(BacktestJob.id == job_id, BacktestJob.worker_id == self.worker_id)
+                .values(updated_at=now, finished_at=now, lease_expires_at=None, **outcome)
+            )
+            db.commit()
+        finally:
+            with self._lock:
+                self._active.discard(job_id)
+                self._pending.discard(job_id)
+            db.close()
+
+    def _lease_deadline(self) -> datetime:
+        return datetime.utcnow() + timedelta(seconds=self.lease_seconds)
+
+    def _run_ema_sweep(self, db: Session, job: BacktestJob) -> List[Dict[str, Any]]:
+        params = job.params
+        backtester = EMABacktester(
+            params["symbol"],
+            date.fromisoformat(params["start_date"]),
+            date.fromisoformat(params["end_date"]),
+            params["initial_cash"],
+            use_price_cache=params.get("use_price_cache", False),
+            use_stored_indicators=params.get("use_stored_indicators", False)
+        )
+        job.total = len(backtester.generate_ema_combinations(params.get("short_periods"), params.get("long_periods")))
+        db.commit()
+
+        last_flush = [time.monotonic()]
+        unflushed: List[Dict[str, Any]] = []
+
+        def progress(completed: int, total: int, new_results: List[dict]) -> None:
+            unflushed.extend(_compact(result) for result in new_results)
+            now = time.monotonic()
+            # The final state and the results are written by run() once the sweep is stored
+            if completed >= total or now - last_flush[0] < self.progress_interval:
+                return
+            last_flush[0] = now
+            self._record_progress(job.id, completed, list(unflushed))
+            unflushed.clear()
+
+        # Prices are read from the replica when one is configured
+        with read_session(db) as read_db:
+            backtester.read_db = read_db
+            results = backtester.run_combinations(
+                db,
+                params.get("short_periods"),
+                params.get("long_periods"),
+                mode=params.get("mode", "loop"),
+                workers=params.get("workers"),
+                progress=progress,
+                reuse_existing=params.get("reuse_existing", False)
+            )
+        return [_compact(result) for result in results]
+
+    def _record_progress(self, job_id: int, completed: int, new_results: List[Dict[str, Any]]) -> None:
+        """
+        Write a running job's completed count through a separate session, which
+        also renews its lease, and append the results finished since the last
+        write. Partial results have no backtest_id yet; run() replaces them with
+        the stored results when the job ends.
+        """
+        progress_db = self.session_factory()
+        try:
+            progress_db.execute(
+                update(BacktestJob)
+                .where(BacktestJob.id == job_id, BacktestJob.worker_id == self.worker_id)
+                .values(completed=completed, updated_at=datetime.utcnow(), lease_expires_at=self._lease_deadline(),
+                        results=_appended_results(progress_db, job_id, new_results))
+            )
+            progress_db.commit()
+        finally:
+            progress_db.close()
+
+def _compact(result: Dict[str, Any]) -> Dict[str, Any]:
+    return {field: result.get(field) for field in RESULT_FIELDS}
+
+def _appended_results(db: Session, job_id: int, new_results: List[Dict[str, Any]]):
+    """The job's stored results with new_results appended, as a value for UPDATE ... SET."""
+    if db.get_bind().dialect.name == "postgresql":
+        # Concatenated by the server, so only the new results are sent
+        stored = cast(BacktestJob.results, JSONB)
+        stored = func.coalesce(func.nullif(stored, cast(literal("null"), JSONB)), cast(literal("[]"), JSONB))
+        return cast(stored.op("||")(cast(literal(json.dumps(new_results)), JSONB)), JSON)
+    stored = db.query(BacktestJob.results).filter(BacktestJob.id == job_id).scalar()
+    return (stored or []) + new_results
+
+def submit_ema_sweep_job(db: Session, params: Dict[str, Any], runner: Optional[JobRunner] = None) -> BacktestJob:
+    """Store an EMA sweep job and hand it to the worker pool."""
+    job = BacktestJob(kind=EMA_SWEEP_JOB, status="queued", params=params, total=0, completed=0,
+                      results=[], updated_at=datetime.utcnow())
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    (runner or job_runner).submit(job.id)
+    return job
+
+def job_status(job: BacktestJob, include_results: bool = True) -> Dict[str, Any]:
+    """Describe a job's progress, including percent complete and a simple ETA."""
+    percent = (job.completed / job.total * 100) if job.total else (100.0 if job.status == "completed" else 0.0)
+
+    eta_seconds = None
+    if job.status == "running" and job.started_at and job.completed and job.total:
+        elapsed = ((job.updated_at or datetime.utcnow()) - job.started_at).total_seconds()
+        eta_seconds = elapsed / job.completed * (job.total - job.completed)
+    elif job.status == "completed":
+        eta_seconds = 0.0
+
+    status = {
+        "job_id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "params": job.params,
+        "total": job.total,
+        "completed": job.completed,
+        "percent_complete": round(percent, 2),
+        "eta_seconds": round(eta_seconds, 1) if eta_seconds is not None else None,
+        "created_at": str(job.created_at) if job.created_at else None,
+        "started_at": str(job.started_at) if job.started_at else None,
+        "finished_at": str(job.finished_at) if job.finished_at else None,
+        "error": job.error,
+        "worker_id": job.worker_id,
+        "lease_expires_at": str(job.lease_expires_at) if job.lease_expires_at else None
+    }
+    if include_results:
+        status["results"] = job.results or []
+    return status
+
+# Shared by the API process
+job_runner = JobRunner()
@@ -1,17 +1,35 @@
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from .database import SessionLocal, engine, get_db
-from .models import Base, Stock, Price, Backtest, AdjustedPrice
+from .database import SessionLocal, async_read_session_factory, engine, get_async_read_db, get_db, get_read_db, read_session
+from .models import Base, Stock, Price, Backtest, AdjustedPrice, BacktestJob
 from pydantic import BaseModel
-from typing import List, Optional
-from datetime import date, datetime
+from typing import Awaitable, Callable, Iterator, List, Optional
+from datetime import date, timedelta
+from fastapi.concurrency import run_in_threadpool
+import asyncio
+import httpx
+import json
 import requests
 import os
 from .backtest import BacktestEngine
 from .strategies import STRATEGIES
-from .ema_backtester import EMABacktester
+from .ema_backtester import EMABacktester, has_result_key
+from .portfolio_backtest import PortfolioBacktester
+from .price_cache import price_cache
+from .metrics import metrics, profile_request
+from .price_store import refresh_price_store
+from .price_export import EXPORT_FORMATS, iter_export
+from .indicator_store import EMA, load_indicator, update_ema_indicators
+from .jobs import job_runner, job_status, submit_ema_sweep_job
+from .ingest import (
+    alpha_vantage_rows, first_changed_close, get_or_create_stock, get_stored_date_range,
+    has_corporate_action, tiingo_adjusted_rows, upsert_adjusted_prices, upsert_prices
+)
 
-# Create tables
+# Create any missing tables; indexes and constraints on existing tables are applied by Alembic (backend/alembic)
 try:
     Base.metadata.create_all(bind=engine)
 except Exception as e:
@@ -20,6 +38,30 @@ except Exception as e:
 
 app = FastAPI(title="My FastAPI App", version="1.0.0")
 
+@app.on_event("startup")
+def resume_backtest_jobs():
+    # Pick up jobs that were queued or interrupted by a restart, and keep rescanning for expired leases
+    try:
+        job_runner.start()
+    except Exception as e:
+        print(f"Warning: Could not resume backtest jobs: {e}")
+
+@app.on_event("startup")
+def check_result_key():
+    # Report a database that predates the EMA result unique key now, not on the first sweep
+    try:
+        db = SessionLocal()
+        try:
+            has_result_key(db)
+        finally:
+            db.close()
+    except Exception as e:
+        print(f"Warning: Could not inspect ema_backtests: {e}")
+
+@app.on_event("shutdown")
+def stop_backtest_jobs():
+    job_runner.shutdown(wait=False)
+
 # Pydantic models for API
 class StockCreate(BaseModel):
     symbol: str
@@ -71,6 +113,24 @@ class AdjustedPriceCreate(BaseModel):
 class AdjustedPriceResponse(AdjustedPriceCreate):
     id: int
 
+class BatchFetchAdjustedPricesRequest(BaseModel):
+    symbols: List[str]
+    start_date: Optional[str] = None
+    update_existing: bool = False
+    max_concurrency: int = 10
+
+class PortfolioSweepRequest(BaseModel):
+    symbols: List[str]
+    start_date: date
+    end_date: date
+    initial_cash: float = 10000
+    short_periods: Optional[List[int]] = None
+    long_periods: Optional[List[int]] = None
+    mode: str = "vectorized"
+    workers: Optional[int] = None
+    metric: str = "total_return_percent"
+    top: Optional[int] = None
+
 class TiingoAdjustedPriceResponse(BaseModel):
     date: str
     close: float
@@ -104,9 +164,9 @@ def create_stock(stock: StockCreate, db: Session = Depends(get_db)):
     return db_stock
 
 @app.get("/stocks/", response_model=List[StockResponse])
-def read_stocks(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    stocks = db.query(Stock).offset(skip).limit(limit).all()
-    return stocks
+async def read_stocks(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_async_read_db)):
+    result = await db.execute(select(Stock).offset(skip).limit(limit))
+    return result.scalars().all()
 
 @app.get("/stocks/{stock_id}", response_model=StockResponse)
 def read_stock(stock_id: int, db: Session = Depends(get_db)):
@@ -125,13 +185,59 @@ def create_price(price: PriceCreate, db: Session = Depends(get_db)):
     return db_price
 
 @app.get("/prices/", response_model=List[PriceResponse])
-def read_prices(stock_id: Optional[int] = None, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    query = db.query(Price)
+async def read_prices(response: Response, stock_id: Optional[int] = None, cursor: Optional[str] = None,
+                      skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_async_read_db)):
+    """
+    Prices ordered by (stock_id, date). Pass the X-Next-Cursor header of a page
+    as `cursor` to fetch the next one; the keyset seek costs the same on every page.
+    """
+    _check_page(cursor, skip, limit)
+    query = select(Price).order_by(Price.stock_id, Price.date)
     if stock_id:
-        query = query.filter(Price.stock_id == stock_id)
-    prices = query.offset(skip).limit(limit).all()
+        query = query.where(Price.stock_id == stock_id)
+    if cursor:
+        try:
+            cursor_stock, cursor_date = cursor.split(":", 1)
+            after = (int(cursor_stock), date.fromisoformat(cursor_date))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Cursor must be 'stock_id:YYYY-MM-DD'")
+        query = query.where(tuple_(Price.stock_id, Price.date) > tuple_(*after))
+    prices = (await db.execute(query.offset(skip).limit(limit))).scalars().all()
+    if len(prices) == limit:
+        response.headers["X-Next-Cursor"] = f"{prices[-1].stock_id}:{prices[-1].date.isoformat()}"
     return prices
 
+def _check_page(cursor, skip: int, limit: int) -> None:
+    if limit <= 0:
+        raise HTTPException(status_code=400, detail="Limit must be positive")
+    if cursor and skip:
+        # The cursor already marks where the page starts; an offset on top would skip rows
+        raise HTTPException(status_code=400, detail="skip cannot be combined with cursor")
+
+@app.get("/prices/export")
+async def export_prices(stock_id: Optional[int] = None, start_date: Optional[date] = None,
+                        end_date: Optional[date] = None, format: str = "csv"):
+    """
+    Stream every matching price, ordered by (stock_id, date), as CSV, NDJSON or Arrow IPC.
+    """
+    _check_export_format(format)
+    columns = [column for column in Price.__table__.columns if column.name != "id"]
+    query = select(*columns).order_by(Price.stock_id, Price.date)
+    if stock_id:
+        query = query.where(Price.stock_id == stock_id)
+    if start_date:
+        query = query.where(Price.date >= start_date)
+    if end_date:
+        query = query.where(Price.date <= end_date)
+    return StreamingResponse(
+        iter_export(async_read_session_factory(), query, format),
+        media_type=EXPORT_FORMATS[format]
+    )
+
+def _check_export_format(format: str) -> None:
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Format must be one of {list(EXPORT_FORMATS)}")
+
 # Backtest endpoints
 @app.post("/backtests/", response_model=BacktestResponse)
 def create_backtest(backtest: BacktestCreate, db: Session = Depends(get_db)):
@@ -146,9 +252,10 @@ def read_backtests(skip: int = 0, limit: int = 100, db: Session = Depends(get_db
     backtests = db.query(Backtest).offset(skip).limit(limit).all()
     return backtests
 
-# Function to fetch adjusted data from Tiingo
-def fetch_tiingo_adjusted_data(symbol: str, api_key: str, start_date: Optional[str] = None):
-    url = f"https://api.tiingo.com/tiingo/daily/{symbol}/prices"
+# Function to build a Tiingo daily prices request
+def _tiingo_request(symbol: str, api_key: str, start_date: Optional[str] = None):
+    base_url = os.getenv("TIINGO_BASE_URL", "https://api.tiingo.com")
+    url = f"{base_url}/tiingo/daily/{symbol}/prices"
     params = {
         "token": api_key
     }
@@ -160,9 +267,10 @@ def fetch_tiingo_adjusted_data(symbol: str, api_key: str, start_date: Optional[s
     headers = {
         "Content-Type": "application/json"
     }
-    
-    response = requests.get(url, params=params, headers=headers)
-    
+    return url, params, headers
+
+# Function to validate a Tiingo response (requests or httpx)
+def _tiingo_response_data(response):
     if response.status_code != 200:
         raise HTTPException(
             status_code=400, 
@@ -178,6 +286,47 @@ def fetch_tiingo_adjusted_data(symbol: str, api_key: str, start_date: Optional[s
     
     return data
 
+# Function to fetch adjusted data from Tiingo
+def fetch_tiingo_adjusted_data(symbol: str, api_key: str, start_date: Optional[str] = None):
+    url, params, headers = _tiingo_request(symbol, api_key, start_date)
+    response = requests.get(url, params=params, headers=headers)
+    return _tiingo_response_data(response)
+
+# Function to fetch adjusted data from Tiingo without blocking the event loop
+async def fetch_tiingo_adjusted_data_async(client: httpx.AsyncClient, symbol: str, api_key: str,
+                                           start_date: Optional[str] = None):
+    url, params, headers = _tiingo_request(symbol, api_key, start_date)
+    response = await client.get(url, params=params, headers=headers)
+    return _tiingo_response_data(response)
+
+# Function to fetch many symbols concurrently, handing each payload to on_data as it arrives
+async def fetch_tiingo_adjusted_batch(
+    symbols: List[str],
+    api_key: str,
+    start_date: Optional[str] = None,
+    max_concurrency: int = 10,
+    on_data: Optional[Callable[[str, list], Awaitable[dict]]] = None,
+    timeout: float = 60.0
+) -> List[dict]:
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def fetch_one(client: httpx.AsyncClient, symbol: str) -> dict:
+        try:
+            async with semaphore:
+                data = await fetch_tiingo_adjusted_data_async(client, symbol, api_key, start_date)
+            result = {"symbol": symbol, "total_fetched": len(data)}
+            if on_data is not None:
+                result.update(await on_data(symbol, data))
+            return result
+        except HTTPException as e:
+            return {"symbol": symbol, "error": e.detail}
+        except Exception as e:
+            return {"symbol": symbol, "error": f"Failed to fetch data: {str(e)}"}
+
+    limits = httpx.Limits(max_connections=max_concurrency)
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+        return await asyncio.gather(*(fetch_one(client, symbol) for symbol in symbols))
+
 # Function to fetch data from Alpha Vantage
 def fetch_alpha_vantage_data(symbol: str, api_key: str, outputsize: str = "compact"):
     url = f"https://www.alphavantage.co/query?function=TIME_SERIES_DAILY&symbol={symbol}&outputsize={outputsize}&apikey={api_key}"
@@ -209,34 +358,23 @@ def fetch_and_store_prices(symbol: str, outputsize: str = "compact", db: Session
         raise HTTPException(status_code=400, detail="Alpha Vantage API key not set. Please update docker-compose.yml")
     
     # Check if stock exists, if not create
-    stock = db.query(Stock).filter(Stock.symbol == symbol.upper()).first()
-    if not stock:
-        stock = Stock(symbol=symbol.upper())
-        db.add(stock)
-        db.commit()
-        db.refresh(stock)
+    stock = get_or_create_stock(db, symbol)
     
     # Fetch data
     prices_data = fetch_alpha_vantage_data(symbol, api_key, outputsize)
     
-    # Insert prices, skip if exists
-    inserted_count = 0
-    for p in prices_data:
-        existing = db.query(Price).filter(Price.stock_id == stock.id, Price.date == p["date"]).first()
-        if not existing:
-            price = Price(
-                stock_id=stock.id,
-                date=p["date"],
-                open_price=p["open"],
-                high=p["high"],
-                low=p["low"],
-                close=p["close"],
-                volume=p["volume"]
-            )
-            db.add(price)
-            inserted_count += 1
+    # Upsert prices in one statement against the UNIQUE(stock_id, date) constraint
+    rows = alpha_vantage_rows(stock.id, prices_data)
+    inserted_count, updated_count = upsert_prices(db, rows)
     db.commit()
-    return {"message": f"Fetched {len(prices_data)} prices, inserted {inserted_count} new records for {symbol}"}
+    price_cache.invalidate(symbol)
+    return {
+        "message": f"Fetched {len(prices_data)} prices, inserted {inserted_count} new records "
+                   f"and updated {updated_count} existing records for {symbol}",
+        "total_fetched": len(prices_data),
+        "total_inserted": inserted_count,
+        "total_updated": updated_count
+    }
 
 # Endpoint to run a backtest
 @app.post("/backtests/run")
@@ -246,7 +384,10 @@ def run_backtest(
     start_date: date,
     end_date: date,
     initial_cash: float = 10000,
-    db: Session = Depends(get_db)
+    use_price_cache: bool = True,
+    profile: bool = False,
+    db: Session = Depends(get_db),
+    read_db: Session = Depends(get_read_db)
 ):
     try:
         if strategy_name not in STRATEGIES:
@@ -255,8 +396,11 @@ def run_backtest(
         strategy_class = STRATEGIES[strategy_name]
         strategy = strategy_class()
         
-        engine = BacktestEngine(strategy, symbol, start_date, end_date, initial_cash)
-        result = engine.run(db)
+        engine = BacktestEngine(strategy, symbol, start_date, end_date, initial_cash, use_cache=use_price_cache,
+                                read_db=read_db)
+        with profile_request(profile) as profile_summary:
+            # The engine only reads prices
+            result = engine.run(db)
         
         if "error" in result:
             raise HTTPException(status_code=400, detail=result["error"])
@@ -275,6 +419,8 @@ def run_backtest(
         db.refresh(backtest)
         
         result["backtest_id"] = backtest.id
+        if profile:
+            result["profile"] = profile_summary
         return result
     except Exception as e:
         db.rollback()
@@ -287,7 +433,14 @@ def run_ema_backtests(
     initial_cash: float = 10000,
     short_periods: Optional[List[int]] = None,
     long_periods: Optional[List[int]] = None,
-    db: Session = Depends(get_db)
+    mode: str = "loop",
+    workers: Optional[int] = None,
+    use_price_cache: bool = True,
+    reuse_existing: bool = False,
+    use_stored_indicators: bool = False,
+    profile: bool = False,
+    db: Session = Depends(get_db),
+    read_db: Session = Depends(get_read_db)
 ):
     try:
         # Validate inputs
@@ -309,17 +462,26 @@ def run_ema_backtests(
                 detail="Both short_periods and long_periods must be non-empty lists"
             )
         
-        backtester = EMABacktester(symbol, start_date, end_date, initial_cash)
-        results = backtester.run_combinations(db, short_periods, long_periods)
+        backtester = EMABacktester(symbol, start_date, end_date, initial_cash, use_price_cache=use_price_cache,
+                                   use_stored_indicators=use_stored_indicators, read_db=read_db)
+        with profile_request(profile) as profile_summary:
+            results = backtester.run_combinations(db, short_periods, long_periods, mode=mode, workers=workers,
+                                                  reuse_existing=reuse_existing)
+        reused = sum(1 for result in results if result.get("reused"))
         
-        return {
-            "message": f"Successfully ran {len(results)} EMA backtests for {symbol}",
+        response = {
+            "message": f"Successfully ran {len(results) - reused} EMA backtests for {symbol} "
+                       f"and reused {reused} stored results",
             "symbol": symbol,
             "date_range": f"{start_date} to {end_date}",
             "initial_cash": initial_cash,
             "total_combinations": len(results),
+            "reused": reused,
             "results": results
         }
+        if profile:
+            response["profile"] = profile_summary
+        return response
         
     except ValueError as e:
         # Handle validation errors from EMABacktester
@@ -330,17 +492,18 @@ def run_ema_backtests(
 
 # Endpoint to get the best EMA combination
 @app.get("/ema-backtests/best")
-def get_best_ema_combination(
+async def get_best_ema_combination(
     symbol: str,
     start_date: date,
     end_date: date,
     initial_cash: float = 10000,
     metric: str = "total_return_percent",
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     try:
         backtester = EMABacktester(symbol, start_date, end_date, initial_cash)
-        best = backtester.get_best_combination(db, metric)
+        # The query helpers are sync; run_sync drives them on the async connection
+        best = await db.run_sync(backtester.get_best_combination, metric)
         if not best:
             raise HTTPException(status_code=404, detail="No backtest results found for the specified criteria")
         
@@ -361,31 +524,230 @@ def get_best_ema_combination(
 
 # Endpoint to get EMA combination summary
 @app.get("/ema-backtests/summary")
-def get_ema_combination_summary(
+async def get_ema_combination_summary(
     symbol: str,
     start_date: date,
     end_date: date,
     initial_cash: float = 10000,
-    db: Session = Depends(get_db)
+    heatmap_bucket: int = 5,
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     try:
         backtester = EMABacktester(symbol, start_date, end_date, initial_cash)
-        summary = backtester.get_combination_summary(db)
+        summary = await db.run_sync(backtester.get_combination_summary, heatmap_bucket=heatmap_bucket)
         return summary
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
+STREAM_FORMATS = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
+
+def _stream_event(format: str, event: str, data: dict) -> str:
+    payload = json.dumps(data, default=str)
+    if format == "sse":
+        return f"event: {event}\ndata: {payload}\n\n"
+    return payload + "\n"
+
+# Endpoint to stream EMA backtest results as each combination finishes
+@app.post("/ema-backtests/stream")
+def stream_ema_backtests(
+    symbol: str,
+    start_date: date,
+    end_date: date,
+    initial_cash: float = 10000,
+    short_periods: Optional[List[int]] = None,
+    long_periods: Optional[List[int]] = None,
+    mode: str = "loop",
+    workers: Optional[int] = None,
+    use_price_cache: bool = True,
+    format: str = "ndjson",
+    include_trades: bool = False,
+    batch_size: int = 50,
+    reuse_existing: bool = False,
+    use_stored_indicators: bool = False
+):
+    if format not in STREAM_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Format must be one of {list(STREAM_FORMATS)}")
+    if initial_cash <= 0:
+        raise HTTPException(status_code=400, detail="Initial cash must be positive")
+    if start_date >= end_date:
+        raise HTTPException(status_code=400, detail="Start date must be before end date")
+    if mode not in EMABacktester.MODES:
+        raise HTTPException(status_code=400, detail=f"Mode must be one of {EMABacktester.MODES}")
+    if batch_size <= 0:
+        raise HTTPException(status_code=400, detail="Batch size must be positive")
+    if workers is not None and workers < 1:
+        raise HTTPException(status_code=400, detail="Workers must be at least 1")
+    if use_stored_indicators and mode != "loop":
+        raise HTTPException(status_code=400, detail="Stored indicators are only supported in loop mode")
+
+    backtester = EMABacktester(symbol, start_date, end_date, initial_cash, use_price_cache=use_price_cache,
+                               use_stored_indicators=use_stored_indicators)
+    try:
+        total = len(backtester.generate_ema_combinations(short_periods, long_periods))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    def events() -> Iterator[str]:
+        # The session lives as long as the stream, independent of the request's dependencies
+        db = SessionLocal()
+        stored = 0
+        try:
+            with read_session(db) as read_db:
+                backtester.read_db = read_db
+                for result in backtester.iter_combinations(db, short_periods, long_periods, mode=mode, workers=workers,
+                                                           include_trades=include_trades, batch_size=batch_size,
+                                                           reuse_existing=reuse_existing):
+                    stored += 1
+                    yield _stream_event(format, "result", result)
+            yield _stream_event(format, "done", {
+                "message": f"Successfully ran {stored} EMA backtests for {symbol}",
+                "symbol": symbol,
+                "date_range": f"{start_date} to {end_date}",
+                "initial_cash": initial_cash,
+                "total_combinations": total,
+                "stored": stored
+            })
+        except Exception as e:
+            # Headers are already sent, so report the failure in the stream itself
+            yield _stream_event(format, "error", {"error": f"Internal server error: {str(e)}"})
+        finally:
+            db.close()
+
+    return StreamingResponse(events(), media_type=STREAM_FORMATS[format])
+
+# Endpoint to run the same EMA sweep over many symbols
+@app.post("/ema-backtests/portfolio")
+def run_portfolio_ema_backtests(request: PortfolioSweepRequest, profile: bool = False,
+                                db: Session = Depends(get_db), read_db: Session = Depends(get_read_db)):
+    """
+    Run the short x long EMA grid for every symbol in one request.
+    Prices for all symbols are loaded with one query and all results are
+    stored in one transaction; each symbol gets its own ranked table.
+    """
+    try:
+        backtester = PortfolioBacktester(request.symbols, request.start_date, request.end_date, request.initial_cash,
+                                         read_db=read_db)
+        with profile_request(profile) as profile_summary:
+            portfolio = backtester.run(
+                db, request.short_periods, request.long_periods, mode=request.mode, workers=request.workers,
+                metric=request.metric, top=request.top
+            )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+    response = {
+        "message": f"Successfully ran {portfolio['total_backtests']} EMA backtests for {len(portfolio['rankings'])} symbols",
+        "date_range": f"{request.start_date} to {request.end_date}",
+        "initial_cash": request.initial_cash,
+        "ranked_by": request.metric,
+        **portfolio
+    }
+    if profile:
+        response["profile"] = profile_summary
+    return response
+
+# Endpoint to queue an EMA sweep as a background job
+@app.post("/ema-backtests/jobs")
+def submit_ema_backtest_job(
+    symbol: str,
+    start_date: date,
+    end_date: date,
+    initial_cash: float = 10000,
+    short_periods: Optional[List[int]] = None,
+    long_periods: Optional[List[int]] = None,
+    mode: str = "loop",
+    workers: Optional[int] = None,
+    use_price_cache: bool = True,
+    reuse_existing: bool = False,
+    use_stored_indicators: bool = False,
+    db: Session = Depends(get_db)
+):
+    if initial_cash <= 0:
+        raise HTTPException(status_code=400, detail="Initial cash must be positive")
+    if start_date >= end_date:
+        raise HTTPException(status_code=400, detail="Start date must be before end date")
+    if mode not in EMABacktester.MODES:
+        raise HTTPException(status_code=400, detail=f"Mode must be one of {EMABacktester.MODES}")
+    if workers is not None and workers < 1:
+        raise HTTPException(status_code=400, detail="Workers must be at least 1")
+    if use_stored_indicators and mode != "loop":
+        raise HTTPException(status_code=400, detail="Stored indicators are only supported in loop mode")
+    try:
+        # Reject bad period lists now rather than failing inside the worker
+        EMABacktester(symbol, start_date, end_date, initial_cash).generate_ema_combinations(short_periods, long_periods)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        job = submit_ema_sweep_job(db, {
+            "symbol": symbol,
+            "start_date": start_date.isoformat(),
+            "end_date": end_date.isoformat(),
+            "initial_cash": initial_cash,
+            "short_periods": short_periods,
+            "long_periods": long_periods,
+            "mode": mode,
+            "workers": workers,
+            "use_price_cache": use_price_cache,
+            "reuse_existing": reuse_existing,
+            "use_stored_indicators": use_stored_indicators
+        })
+        return {
+            "message": f"Queued EMA backtest job for {symbol}",
+            "job_id": job.id,
+            "status": job.status,
+            "status_url": f"/jobs/{job.id}"
+        }
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+# Endpoint to poll a background job
+@app.get("/jobs/{job_id}")
+def get_job(job_id: int, include_results: bool = True, db: Session = Depends(get_db)):
+    job = db.get(BacktestJob, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_status(job, include_results)
+
+# Prometheus scrape endpoint for the backtest pipeline timers and counters
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+# Price cache statistics
+@app.get("/price-cache/stats")
+def get_price_cache_stats():
+    return price_cache.stats()
+
+@app.delete("/price-cache")
+def clear_price_cache():
+    price_cache.clear()
+    return {"message": "Price cache cleared", **price_cache.stats()}
+
 # Adjusted Prices Endpoints
 @app.post("/stocks/{symbol}/fetch-adjusted-prices")
 def fetch_and_store_adjusted_prices(
     symbol: str, 
     start_date: Optional[str] = None,
+    update_existing: bool = False,
+    incremental: bool = False,
     db: Session = Depends(get_db)
 ):
     """
     Fetch adjusted historical price data from Tiingo API and save to database.
     Example: /stocks/AAPL/fetch-adjusted-prices?start_date=2019-01-02
     If start_date is not provided, fetches all available data.
+    Existing dates are skipped unless update_existing is true, in which case
+    they are overwritten with the freshly adjusted values.
+    With incremental=true, only bars after the last stored date are requested.
+    If one of them carries a split or dividend, the stored history is re-fetched
+    and overwritten, since Tiingo re-adjusts every earlier bar.
     """
     api_key = os.getenv("TIINGO_API_KEY")
     if not api_key:
@@ -393,153 +755,210 @@ def fetch_and_store_adjusted_prices(
             status_code=400, 
             detail="TIINGO_API_KEY environment variable not set"
         )
+    if incremental and start_date:
+        raise HTTPException(status_code=400, detail="start_date cannot be combined with incremental")
     
     # Check if stock exists, if not create
-    stock = db.query(Stock).filter(Stock.symbol == symbol.upper()).first()
-    if not stock:
-        stock = Stock(symbol=symbol.upper())
-        db.add(stock)
-        db.commit()
-        db.refresh(stock)
+    stock = get_or_create_stock(db, symbol)
+    
+    # In incremental mode, resume after the newest stored bar
+    first_date, last_date = get_stored_date_range(db, stock.id) if incremental else (None, None)
+    fetch_start = (last_date + timedelta(days=1)).isoformat() if last_date else start_date
+    refetched_from = None
     
     # Fetch data from Tiingo
     try:
-        prices_data = fetch_tiingo_adjusted_data(symbol, api_key, start_date)
+        prices_data = fetch_tiingo_adjusted_data(symbol, api_key, fetch_start)
+        rows = tiingo_adjusted_rows(stock.id, prices_data)
+        
+        if last_date:
+            rows = [row for row in rows if row["date"] > last_date]
+            if has_corporate_action(rows):
+                # A new split/dividend changes every earlier adjusted bar; refresh the stored history
+                refetched_from = first_date
+                prices_data = fetch_tiingo_adjusted_data(symbol, api_key, first_date.isoformat())
+                rows = tiingo_adjusted_rows(stock.id, prices_data)
+                update_existing = True
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Failed to fetch data: {str(e)}")
     
-    # Insert adjusted prices, skip if exists
-    inserted_count = 0
-    for price_data in prices_data:
-        # Parse the date string to a date object
-        date_str = price_data["date"][:10]  # Extract YYYY-MM-DD part
-        price_date = datetime.strptime(date_str, "%Y-%m-%d").date()
-        
-        existing = db.query(AdjustedPrice).filter(
-            AdjustedPrice.stock_id == stock.id, 
-            AdjustedPrice.date == price_date
-        ).first()
-        
-        if not existing:
-            adjusted_price = AdjustedPrice(
-                stock_id=stock.id,
-                date=price_date,
-                close=price_data["close"],
-                high=price_data["high"],
-                low=price_data["low"],
-                open=price_data["open"],
-                volume=price_data["volume"],
-                adj_close=price_data["adjClose"],
-                adj_high=price_data["adjHigh"],
-                adj_low=price_data["adjLow"],
-                adj_open=price_data["adjOpen"],
-                adj_volume=price_data["adjVolume"],
-                div_cash=price_data["divCash"],
-                split_factor=price_data["splitFactor"]
-            )
-            db.add(adjusted_price)
-            inserted_count += 1
-    
+    # Upsert adjusted prices in one statement; duplicates are resolved by the database
+    changed_from = first_changed_close(db, stock.id, rows, update_existing=update_existing)
+    inserted_count, updated_count = upsert_adjusted_prices(db, rows, update_existing=update_existing)
+    if changed_from:
+        # Extend the stored EMAs from the first new or changed bar, in the same transaction
+        update_ema_indicators(db, stock.id, changed_from)
     db.commit()
+    refresh_price_store(db, symbol)
+    price_cache.invalidate(symbol)
+    
     response_data = {
         "message": f"Fetched {len(prices_data)} adjusted prices, inserted {inserted_count} new records for {symbol}",
         "symbol": symbol.upper(),
         "total_fetched": len(prices_data),
-        "total_inserted": inserted_count
+        "total_inserted": inserted_count,
+        "total_updated": updated_count
     }
     
     # Only include start_date in response if it was provided
     if start_date:
         response_data["start_date"] = start_date
+    if incremental:
+        response_data["incremental"] = True
+        response_data["last_stored_date"] = str(last_date) if last_date else None
+        response_data["refetched_from"] = str(refetched_from) if refetched_from else None
+    
+    return response_data
+
+@app.post("/stocks/fetch-adjusted-prices/batch")
+async def fetch_and_store_adjusted_prices_batch(request: BatchFetchAdjustedPricesRequest):
+    """
+    Fetch adjusted prices for many symbols concurrently from Tiingo and save them.
+    Up to max_concurrency requests are in flight at once; each response is
+    bulk-upserted as soon as it arrives. Failures are reported per symbol.
+    """
+    api_key = os.getenv("TIINGO_API_KEY")
+    if not api_key:
+        raise HTTPException(
+            status_code=400, 
+            detail="TIINGO_API_KEY environment variable not set"
+        )
+    if not request.symbols:
+        raise HTTPException(status_code=400, detail="symbols must be a non-empty list")
+    if request.max_concurrency <= 0:
+        raise HTTPException(status_code=400, detail="max_concurrency must be positive")
+    
+    # Deduplicate while keeping the requested order
+    symbols = list(dict.fromkeys(symbol.upper() for symbol in request.symbols))
+
+    def store(symbol: str, prices_data: list) -> dict:
+        db = SessionLocal()
+        try:
+            stock = get_or_create_stock(db, symbol)
+            rows = tiingo_adjusted_rows(stock.id, prices_data)
+            changed_from = first_changed_close(db, stock.id, rows, update_existing=request.update_existing)
+            inserted_count, updated_count = upsert_adjusted_prices(db, rows, update_existing=request.update_existing)
+            if changed_from:
+                update_ema_indicators(db, stock.id, changed_from)
+            db.commit()
+            refresh_price_store(db, symbol)
+            price_cache.invalidate(symbol)
+            return {"total_inserted": inserted_count, "total_updated": updated_count}
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    async def on_data(symbol: str, prices_data: list) -> dict:
+        # Database writes are blocking; keep them off the event loop
+        return await run_in_threadpool(store, symbol, prices_data)
+
+    results = await fetch_tiingo_adjusted_batch(
+        symbols, api_key, request.start_date, request.max_concurrency, on_data=on_data
+    )
+    failed = [r for r in results if "error" in r]
+    
+    response_data = {
+        "message": f"Fetched adjusted prices for {len(results) - len(failed)}/{len(results)} symbols",
+        "total_symbols": len(results),
+        "total_failed": len(failed),
+        "total_fetched": sum(r.get("total_fetched", 0) for r in results),
+        "total_inserted": sum(r.get("total_inserted", 0) for r in results),
+        "total_updated": sum(r.get("total_updated", 0) for r in results),
+        "results": results
+    }
+    if request.start_date:
+        response_data["start_date"] = request.start_date
     
     return response_data
 
 @app.get("/stocks/{symbol}/adjusted-prices", response_model=List[AdjustedPriceResponse])
-def get_adjusted_prices(
+async def get_adjusted_prices(
     symbol: str,
-    start_date: Optional[str] = None,
-    end_date: Optional[str] = None,
+    response: Response,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    cursor: Optional[date] = None,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
-    Get adjusted prices for a symbol with optional date filtering.
+    Get adjusted prices for a symbol with optional date filtering, newest first.
+    Pass the X-Next-Cursor header of a page as `cursor` to fetch the next one.
     """
+    _check_page(cursor, skip, limit)
     # Find the stock
-    stock = db.query(Stock).filter(Stock.symbol == symbol.upper()).first()
+    stock = (await db.execute(select(Stock).where(Stock.symbol == symbol.upper()))).scalars().first()
     if not stock:
         raise HTTPException(status_code=404, detail="Stock not found")
     
     # Build query
-    query = db.query(AdjustedPrice).filter(AdjustedPrice.stock_id == stock.id)
+    query = select(AdjustedPrice).where(AdjustedPrice.stock_id == stock.id)
     
     if start_date:
-        query = query.filter(AdjustedPrice.date >= start_date)
+        query = query.where(AdjustedPrice.date >= start_date)
     if end_date:
-        query = query.filter(AdjustedPrice.date <= end_date)
+        query = query.where(AdjustedPrice.date <= end_date)
+    if cursor:
+        query = query.where(AdjustedPrice.date < cursor)
     
     # Order by date descending and apply pagination
-    adjusted_prices = query.order_by(AdjustedPrice.date.desc()).offset(skip).limit(limit).all()
+    result = await db.execute(query.order_by(AdjustedPrice.date.desc()).offset(skip).limit(limit))
+    prices = result.scalars().all()
+    if len(prices) == limit:
+        response.headers["X-Next-Cursor"] = prices[-1].date.isoformat()
     
-    return adjusted_prices
-
-# Function to fetch data from Alpha Vantage
-def fetch_alpha_vantage_data(symbol: str, api_key: str, outputsize: str = "compact"):
-    url = f"https://www.alphavantage.co/query?function=TIME_SERIES_DAILY&symbol={symbol}&outputsize={outputsize}&apikey={api_key}"
-    response = requests.get(url)
-    data = response.json()
-    if "Time Series (Daily)" not in data:
-        raise HTTPException(status_code=400, detail=f"Error fetching data: {data.get('Error Message', 'Unknown error')}")
-    time_series = data["Time Series (Daily)"]
-    prices = []
-    for date_str, daily_data in time_series.items():
-        price = {
-            "date": date_str,
-            "open": float(daily_data["1. open"]),
-            "high": float(daily_data["2. high"]),
-            "low": float(daily_data["3. low"]),
-            "close": float(daily_data["4. close"]),
-            "volume": int(daily_data["5. volume"])
-        }
-        prices.append(price)
     return prices
 
-# Endpoint to fetch and store prices
-@app.post("/stocks/{symbol}/fetch-prices")
-def fetch_and_store_prices(symbol: str, outputsize: str = "compact", db: Session = Depends(get_db)):
-    if outputsize not in ["compact", "full"]:
-        raise HTTPException(status_code=400, detail="outputsize must be 'compact' or 'full'")
-    api_key = os.getenv("ALPHA_VANTAGE_API_KEY")
-    if not api_key or api_key == "YOUR_API_KEY_HERE":
-        raise HTTPException(status_code=400, detail="Alpha Vantage API key not set. Please update docker-compose.yml")
-    
-    # Check if stock exists, if not create
-    stock = db.query(Stock).filter(Stock.symbol == symbol.upper()).first()
+@app.get("/stocks/{symbol}/adjusted-prices/export")
+async def export_adjusted_prices(
+    symbol: str,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    format: str = "csv",
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    Stream a symbol's whole adjusted price range, oldest first, as CSV, NDJSON or Arrow IPC.
+    Rows are fetched and written in chunks, so the range is never held in memory.
+    """
+    _check_export_format(format)
+    stock = (await db.execute(select(Stock).where(Stock.symbol == symbol.upper()))).scalars().first()
     if not stock:
-        stock = Stock(symbol=symbol.upper())
-        db.add(stock)
-        db.commit()
-        db.refresh(stock)
+        raise HTTPException(status_code=404, detail="Stock not found")
     
-    # Fetch data
-    prices_data = fetch_alpha_vantage_data(symbol, api_key, outputsize)
+    columns = [column for column in AdjustedPrice.__table__.columns if column.name not in ("id", "stock_id")]
+    query = select(*columns).where(AdjustedPrice.stock_id == stock.id)
+    if start_date:
+        query = query.where(AdjustedPrice.date >= start_date)
+    if end_date:
+        query = query.where(AdjustedPrice.date <= end_date)
     
-    # Insert prices, skip if exists
-    inserted_count = 0
-    for p in prices_data:
-        existing = db.query(Price).filter(Price.stock_id == stock.id, Price.date == p["date"]).first()
-        if not existing:
-            price = Price(
-                stock_id=stock.id,
-                date=p["date"],
-                open_price=p["open"],
-                high=p["high"],
-                low=p["low"],
-                close=p["close"],
-                volume=p["volume"]
-            )
-            db.add(price)
-            inserted_count += 1
-    db.commit()
-    return {"message": f"Fetched {len(prices_data)} prices, inserted {inserted_count} new records for {symbol}"}
+    return StreamingResponse(
+        iter_export(async_read_session_factory(), query.order_by(AdjustedPrice.date), format),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{stock.symbol}-adjusted-prices.{format}"'}
+    )
+
+@app.get("/stocks/{symbol}/indicators")
+def get_indicators(
+    symbol: str,
+    period: int,
+    kind: str = EMA,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Get a stored indicator series for a symbol, oldest first.
+    EMAs are maintained on ingest for the periods in INDICATOR_EMA_PERIODS.
+    """
+    values = load_indicator(db, symbol, kind, period, start_date, end_date)
+    return {
+        "symbol": symbol.upper(),
+        "kind": kind,
+        "period": period,
+        "values": [{"date": str(value_date), "value": value} for value_date, value in values]
+    }
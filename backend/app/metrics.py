@@ -0,0 +1,134 @@
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional, Tuple
+import cProfile
+import io
+import pstats
+import threading
+import time
+
+# Backtest pipeline stages timed by Metrics.timer
+STAGES = ["load", "indicator", "simulate", "persist"]
+
+# Stage timings of the profiled request running in this context, if any
+_request_stages: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_stages", default=None)
+
+class Metrics:
+    """
+    Process-wide counters and per-stage timers for the backtest pipeline.
+
+    Rendered in the Prometheus text format by render(). Work done inside
+    "process" mode worker processes is not counted.
+    """
+
+    COUNTERS = {
+        "backtest_bars_processed_total": "Bars stepped through by the backtest engines",
+        "backtest_rows_written_total": "Rows written, by table",
+        "db_round_trips_total": "Statements sent to the database"
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+        self._stage_seconds: Dict[str, float] = {}
+        self._stage_counts: Dict[str, int] = {}
+
+    def inc(self, name: str, value: float = 1, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self._stage_seconds[stage] = self._stage_seconds.get(stage, 0.0) + seconds
+            self._stage_counts[stage] = self._stage_counts.get(stage, 0) + 1
+        request_stages = _request_stages.get()
+        if request_stages is not None:
+            request_stages[stage] = request_stages.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def timer(self, stage: str) -> Iterator[None]:
+        """Add the time spent in the block to `stage`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def value(self, name: str, **labels: str) -> float:
+        with self._lock:
+            return self._counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    def stage_seconds(self, stage: str) -> float:
+        with self._lock:
+            return self._stage_seconds.get(stage, 0.0)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            counters = dict(self._counters)
+            stage_seconds = dict(self._stage_seconds)
+            stage_counts = dict(self._stage_counts)
+
+        lines = [
+            "# HELP backtest_stage_seconds Time spent per backtest pipeline stage",
+            "# TYPE backtest_stage_seconds summary"
+        ]
+        for stage in STAGES + sorted(set(stage_seconds) - set(STAGES)):
+            lines.append(f'backtest_stage_seconds_sum{{stage="{stage}"}} {stage_seconds.get(stage, 0.0)}')
+            lines.append(f'backtest_stage_seconds_count{{stage="{stage}"}} {stage_counts.get(stage, 0)}')
+
+        for name, help_text in self.COUNTERS.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            samples = [(labels, value) for (counter, labels), value in sorted(counters.items()) if counter == name]
+            for labels, value in samples or [((), 0)]:
+                label_text = ",".join(f'{key}="{label}"' for key, label in labels)
+                lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._stage_seconds.clear()
+            self._stage_counts.clear()
+
+# Shared by every request in this process
+metrics = Metrics()
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_round_trip(conn, cursor, statement, parameters, context, executemany):
+    metrics.inc("db_round_trips_total")
+
+@contextmanager
+def profile_request(enabled: bool, top: int = 30) -> Iterator[Dict[str, Any]]:
+    """
+    Profile the block with cProfile when enabled.
+
+    Yields a dict that is filled on exit with the wall time, the pipeline stage
+    timings of this request and the `top` functions by cumulative time.
+    """
+    summary: Dict[str, Any] = {}
+    if not enabled:
+        yield summary
+        return
+
+    stages: Dict[str, float] = {}
+    token = _request_stages.set(stages)
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    profiler.enable()
+    try:
+        yield summary
+    finally:
+        profiler.disable()
+        _request_stages.reset(token)
+        output = io.StringIO()
+        pstats.Stats(profiler, stream=output).sort_stats("cumulative").print_stats(top)
+        summary.update({
+            "wall_seconds": round(time.perf_counter() - start, 6),
+            "stages": {stage: round(seconds, 6) for stage, seconds in stages.items()},
+            "cprofile": output.getvalue()
+        })
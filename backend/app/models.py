@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, DECIMAL, BIGINT, TIMESTAMP, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, Date, DECIMAL, BIGINT, Float, TIMESTAMP, Text, ForeignKey, UniqueConstraint, Index, JSON
 from sqlalchemy.orm import relationship
 from sqlalchemy import text
 from .database import Base
@@ -15,6 +15,9 @@ class Stock(Base):
 
 class Price(Base):
     __tablename__ = "prices"
+    __table_args__ = (
+        UniqueConstraint("stock_id", "date", name="prices_stock_id_date_key"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     stock_id = Column(Integer, ForeignKey("stocks.id"), nullable=False)
@@ -29,6 +32,11 @@ class Price(Base):
 
 class EMABacktest(Base):
     __tablename__ = "ema_backtests"
+    __table_args__ = (
+        UniqueConstraint("symbol", "short_period", "long_period", "start_date", "end_date", "initial_cash",
+                         name="uq_ema_backtests_combination"),
+        Index("ix_ema_backtests_symbol_range", "symbol", "start_date", "end_date", "initial_cash"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     symbol = Column(String(10), nullable=False)
@@ -46,6 +54,9 @@ class EMABacktest(Base):
 
 class AdjustedPrice(Base):
     __tablename__ = "adjusted_prices"
+    __table_args__ = (
+        UniqueConstraint("stock_id", "date", name="uq_adjusted_prices_stock_date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     stock_id = Column(Integer, ForeignKey("stocks.id"), nullable=False)
@@ -65,6 +76,20 @@ class AdjustedPrice(Base):
 
     stock = relationship("Stock", back_populates="adjusted_prices")
 
+class Indicator(Base):
+    __tablename__ = "indicators"
+    __table_args__ = (
+        UniqueConstraint("stock_id", "kind", "period", "date", name="uq_indicators_stock_kind_period_date"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    stock_id = Column(Integer, ForeignKey("stocks.id"), nullable=False)
+    date = Column(Date, nullable=False)
+    kind = Column(String(20), nullable=False)
+    period = Column(Integer, nullable=False)
+    # Double precision, so an EMA extended from its stored value matches a full recomputation
+    value = Column(Float, nullable=False)
+
 class Backtest(Base):
     __tablename__ = "backtests"
 
@@ -76,3 +101,22 @@ class Backtest(Base):
     initial_capital = Column(DECIMAL(15, 2))
     final_capital = Column(DECIMAL(15, 2))
     created_at = Column(TIMESTAMP, default=text('CURRENT_TIMESTAMP'))
+
+class BacktestJob(Base):
+    __tablename__ = "backtest_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String(50), nullable=False)
+    status = Column(String(20), nullable=False, default="queued", index=True)
+    params = Column(JSON, nullable=False)
+    total = Column(Integer, nullable=False, default=0)
+    completed = Column(Integer, nullable=False, default=0)
+    results = Column(JSON)
+    error = Column(Text)
+    created_at = Column(TIMESTAMP, default=text('CURRENT_TIMESTAMP'))
+    started_at = Column(TIMESTAMP)
+    updated_at = Column(TIMESTAMP)
+    finished_at = Column(TIMESTAMP)
+    # Worker holding the job and when its lease runs out unless renewed
+    worker_id = Column(String(100))
+    lease_expires_at = Column(TIMESTAMP, index=True)
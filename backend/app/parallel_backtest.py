@@ -0,0 +1,78 @@
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from typing import Callable, Iterator, List, Optional, Tuple
+from .backtest import PriceBar
+import os
+
+# Per-process state set once by _init_worker
+_worker_backtester = None
+
+def default_workers() -> int:
+    """Worker count from EMA_BACKTEST_WORKERS, falling back to the CPU count."""
+    return int(os.getenv("EMA_BACKTEST_WORKERS", os.cpu_count() or 1))
+
+def _init_worker(symbol: str, start_date: date, end_date: date, initial_cash: float,
+                 dates: List[date], adj_open: List[float], adj_close: List[float]) -> None:
+    """Receive the price series once per worker process instead of once per task."""
+    global _worker_backtester
+    from .ema_backtester import EMABacktester
+
+    prices = [PriceBar(*bar) for bar in zip(dates, adj_open, adj_close)]
+    _worker_backtester = EMABacktester(symbol, start_date, end_date, initial_cash, prices=prices)
+
+def _run_chunk(combinations: List[Tuple[int, int]]) -> List[Optional[dict]]:
+    """Run a chunk of combinations in a worker; the worker's indicator cache is reused across chunks."""
+    return [_worker_backtester._run_combination(None, short, long) for short, long in combinations]
+
+def iter_combinations_parallel(symbol: str, start_date: date, end_date: date, initial_cash: float,
+                               prices, combinations: List[Tuple[int, int]],
+                               workers: Optional[int] = None) -> Iterator[List[Optional[dict]]]:
+    """
+    Run EMA combinations across a process pool, yielding each chunk's results as it finishes.
+
+    The price series is sent to each worker once through the pool initializer.
+    Chunks are yielded in input order with one result (or None on failure) per combination.
+    """
+    if workers is None:
+        workers = default_workers()
+    if workers < 1:
+        raise ValueError("Workers must be at least 1")
+    if not combinations:
+        return
+
+    dates = [p.date for p in prices]
+    adj_open = [float(p.adj_open) for p in prices]
+    adj_close = [float(p.adj_close) for p in prices]
+
+    # A few chunks per worker keeps the pool balanced without per-task overhead
+    chunk_size = max(1, len(combinations) // (workers * 4))
+    chunks = [combinations[i:i + chunk_size] for i in range(0, len(combinations), chunk_size)]
+
+    completed = 0
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(chunks)),
+        initializer=_init_worker,
+        initargs=(symbol, start_date, end_date, initial_cash, dates, adj_open, adj_close)
+    ) as executor:
+        for chunk_results in executor.map(_run_chunk, chunks):
+            completed += len(chunk_results)
+            print(f"Processed {completed}/{len(combinations)} combinations")
+            yield chunk_results
+
+def run_combinations_parallel(symbol: str, start_date: date, end_date: date, initial_cash: float,
+                              prices, combinations: List[Tuple[int, int]],
+                              workers: Optional[int] = None,
+                              progress: Optional[Callable[[int, int, List[dict]], None]] = None) -> List[Optional[dict]]:
+    """
+    Run EMA combinations across a process pool.
+
+    Returns one result (or None on failure) per combination, in input order.
+    progress(completed, total, new_results) is called as each chunk finishes.
+    """
+    results: List[Optional[dict]] = []
+    for chunk_results in iter_combinations_parallel(symbol, start_date, end_date, initial_cash,
+                                                    prices, combinations, workers):
+        results.extend(chunk_results)
+        if progress:
+            progress(len(results), len(combinations), [result for result in chunk_results if result])
+    return results
@@ -0,0 +1,109 @@
+from sqlalchemy.orm import Session
+from .backtest import load_prices_for_symbols
+from .ema_backtester import EMABacktester
+from .price_store import get_price_store
+from .metrics import metrics
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+class PortfolioBacktester:
+    """
+    Run the same EMA period grid over several symbols in one pass.
+
+    All price series are loaded with one query and handed to a backtester per
+    symbol, and every symbol's results are stored in one transaction.
+    """
+
+    METRICS = ["total_return_percent", "total_return", "final_cash", "cagr"]
+
+    def __init__(self, symbols: List[str], start_date: date, end_date: date, initial_cash: float = 10000,
+                 read_db: Optional[Session] = None):
+        """read_db, if given, is used for the price load (e.g. a read replica session)."""
+        self.symbols = list(dict.fromkeys(symbol.upper() for symbol in symbols))
+        if not self.symbols:
+            raise ValueError("At least one symbol is required")
+        self.start_date = start_date
+        self.end_date = end_date
+        self.initial_cash = initial_cash
+        self.read_db = read_db
+
+    def run(self, db: Session,
+            short_periods: Optional[List[int]] = None,
+            long_periods: Optional[List[int]] = None,
+            mode: str = "vectorized",
+            workers: Optional[int] = None,
+            metric: str = "total_return_percent",
+            top: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Run every symbol x (short, long) combination and store the results.
+
+        Args:
+            db: Database session
+            short_periods, long_periods: Period grids, as for EMABacktester.run_combinations
+            mode: "vectorized" (default), "loop" or "process"; trade lists are not returned
+            workers: Process pool size for "process" mode
+            metric: Result field each symbol's table is ranked by, best first
+            top: Only return the best `top` rows per symbol (all rows are stored)
+
+        Returns:
+            {"rankings": {symbol: [results...]}, "missing_symbols": [...], "total_backtests": n}
+        """
+        if mode not in EMABacktester.MODES:
+            raise ValueError(f"Mode must be one of {EMABacktester.MODES}")
+        if metric not in self.METRICS:
+            raise ValueError(f"Metric must be one of {self.METRICS}")
+        if top is not None and top <= 0:
+            raise ValueError("Top must be positive")
+
+        combinations = EMABacktester(self.symbols[0], self.start_date, self.end_date,
+                                     self.initial_cash).generate_ema_combinations(short_periods, long_periods)
+
+        # Symbols in the columnar store are read from disk; the rest share one query
+        prices = {}
+        store = get_price_store()
+        if store is not None:
+            for symbol in self.symbols:
+                series = store.read(symbol, self.start_date, self.end_date)
+                if series is not None:
+                    prices[symbol] = series
+        unstored = [symbol for symbol in self.symbols if symbol not in prices]
+        if unstored:
+            prices.update(load_prices_for_symbols(self.read_db or db, unstored, self.start_date, self.end_date))
+        prices = {symbol: prices[symbol] for symbol in self.symbols if prices.get(symbol)}
+        missing = [symbol for symbol in self.symbols if symbol not in prices]
+
+        print(f"Running {len(combinations)} EMA combinations for {len(prices)} symbols "
+              f"from {self.start_date} to {self.end_date} ({mode} mode)")
+
+        rankings: Dict[str, List[dict]] = {}
+        total = 0
+        try:
+            for symbol, series in prices.items():
+                backtester = EMABacktester(symbol, self.start_date, self.end_date, self.initial_cash, prices=series)
+
+                results = []
+                for _, batch in backtester.iter_batches(db, combinations, mode, workers, max(1, len(combinations))):
+                    for result in batch:
+                        result.pop("trades", None)
+                    backtester.insert_results(db, batch)
+                    results.extend(batch)
+                total += len(results)
+
+                results.sort(key=lambda r: (r[metric] is not None, r[metric] or 0), reverse=True)
+                for rank, result in enumerate(results, 1):
+                    result["rank"] = rank
+                rankings[symbol] = results[:top] if top else results
+
+            # One commit for the whole portfolio
+            with metrics.timer("persist"):
+                db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+        print(f"Completed {total} backtests across {len(prices)} symbols")
+        return {
+            "rankings": rankings,
+            "missing_symbols": missing,
+            "total_backtests": total
+        }
@@ -0,0 +1,144 @@
+from .price_series import PriceSeries
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Callable, Dict, Optional, Tuple
+import os
+import sys
+import threading
+import time
+
+class PriceSeriesCache:
+    """
+    Bounded in-process LRU cache of adjusted price series shared by backtest engines.
+
+    Entries are keyed by (symbol, start_date, end_date) and limited both by
+    count and by the bytes their columns hold; the least recently used entries
+    are evicted first. Ingest endpoints call invalidate() for the symbols they
+    write, so a cached series is never older than the last ingest in this process.
+    Each invalidate() bumps the symbol's generation, and a load that started
+    under an older generation is returned but not cached. For replica_lag_seconds
+    after a symbol is invalidated, misses load through primary_loader when one is
+    given, so a lagging read replica cannot cache a series that predates the
+    ingest; after that, misses read the replica again.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, max_bytes: Optional[int] = None,
+                 replica_lag_seconds: Optional[float] = None):
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv("PRICE_CACHE_MAX_ENTRIES", "256"))
+        self.max_bytes = max_bytes if max_bytes is not None else int(os.getenv("PRICE_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+        self.replica_lag_seconds = (replica_lag_seconds if replica_lag_seconds is not None
+                                    else float(os.getenv("PRICE_CACHE_REPLICA_LAG_SECONDS", "60")))
+        self._entries: "OrderedDict[Tuple[str, date, date], Tuple[PriceSeries, int]]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        # When each recently invalidated symbol was last invalidated (time.monotonic())
+        self._invalidated_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, symbol: str, start_date: date, end_date: date,
+            loader: Callable[[], PriceSeries],
+            primary_loader: Optional[Callable[[], PriceSeries]] = None) -> PriceSeries:
+        """
+        Return the cached series, calling `loader` to fetch it on a miss.
+
+        When `loader` reads a replica, pass `primary_loader` reading the primary;
+        it is used instead for misses on a symbol invalidated in this process
+        within the last replica_lag_seconds.
+        """
+        key = (symbol.upper(), start_date, end_date)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return _share(entry[0])
+            self.misses += 1
+            generation = self._generations.get(key[0], 0)
+            recently_invalidated = self._recently_invalidated(key[0])
+
+        if recently_invalidated and primary_loader is not None:
+            # The replica may not have caught up with the ingest behind the invalidation yet
+            loader = primary_loader
+        prices = loader()
+        if prices:
+            self._put(key, prices, generation)
+        return _share(prices)
+
+    def _put(self, key: Tuple[str, date, date], prices: PriceSeries, generation: int) -> None:
+        size = _size(prices)
+        if size > self.max_bytes or self.max_entries <= 0:
+            return
+        with self._lock:
+            if self._generations.get(key[0], 0) != generation:
+                # invalidate() ran while this series was loading, so it may predate the ingest
+                return
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= previous[1]
+            self._entries[key] = (prices, size)
+            self.bytes += size
+            while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.bytes -= evicted_size
+                self.evictions += 1
+
+    def _recently_invalidated(self, symbol: str) -> bool:
+        # Called with the lock held; forgets invalidations older than the replica lag
+        invalidated_at = self._invalidated_at.get(symbol)
+        if invalidated_at is None:
+            return False
+        if time.monotonic() - invalidated_at < self.replica_lag_seconds:
+            return True
+        del self._invalidated_at[symbol]
+        return False
+
+    def invalidate(self, symbol: str) -> int:
+        """Drop every cached range for a symbol; returns the number of entries removed."""
+        symbol = symbol.upper()
+        with self._lock:
+            self._generations[symbol] = self._generations.get(symbol, 0) + 1
+            self._invalidated_at[symbol] = time.monotonic()
+            keys = [key for key in self._entries if key[0] == symbol]
+            for key in keys:
+                self.bytes -= self._entries.pop(key)[1]
+            self.invalidations += len(keys)
+        return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else None,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+def _share(prices):
+    # Hand out a view so per-run state (e.g. materialized bars) never accumulates on the cached entry
+    return prices[:] if isinstance(prices, PriceSeries) else prices
+
+def _size(prices) -> int:
+    if isinstance(prices, PriceSeries):
+        return prices.nbytes
+    return sys.getsizeof(prices) + sum(sys.getsizeof(p) for p in prices)
+
+# Shared by every engine in this process
+price_cache = PriceSeriesCache()
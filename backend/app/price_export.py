@@ -0,0 +1,99 @@
+from sqlalchemy import Select, types
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.sql import ColumnElement
+from datetime import date
+from decimal import Decimal
+from typing import AsyncIterator, List
+import csv
+import io
+import json
+import pyarrow as pa
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "arrow": "application/vnd.apache.arrow.stream"
+}
+
+# Rows fetched from the server-side cursor, and written out, per chunk
+EXPORT_CHUNK_ROWS = 5000
+
+async def iter_export(session_factory: async_sessionmaker, query: Select, format: str) -> AsyncIterator[bytes]:
+    """
+    Stream the rows of `query` as CSV, NDJSON or an Arrow IPC stream.
+
+    Rows are read through a server-side cursor EXPORT_CHUNK_ROWS at a time and
+    each chunk is encoded and yielded before the next is fetched, so memory use
+    does not grow with the size of the range. The session is opened here so it
+    lives as long as the stream.
+    """
+    encode_chunk = _ENCODERS[format](list(query.selected_columns))
+    async with session_factory() as db:
+        result = await db.stream(query.execution_options(yield_per=EXPORT_CHUNK_ROWS))
+        async for rows in result.partitions():
+            yield encode_chunk(rows)
+    yield encode_chunk(None)
+
+def _csv_encoder(columns: List[ColumnElement]):
+    header = [True]
+
+    def encode(rows) -> bytes:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if header[0]:
+            writer.writerow([column.name for column in columns])
+            header[0] = False
+        for row in rows or []:
+            writer.writerow(["" if value is None else value for value in row])
+        return buffer.getvalue().encode()
+    return encode
+
+def _ndjson_encoder(columns: List[ColumnElement]):
+    names = [column.name for column in columns]
+
+    def encode(rows) -> bytes:
+        return "".join(
+            json.dumps(dict(zip(names, (_json_value(value) for value in row)))) + "\n" for row in rows or []
+        ).encode()
+    return encode
+
+def _arrow_encoder(columns: List[ColumnElement]):
+    # Fixed up front so a chunk of all-null values still matches the stream's schema
+    schema = pa.schema([(column.name, _arrow_type(column.type)) for column in columns])
+    sink = io.BytesIO()
+    writer = pa.ipc.new_stream(sink, schema)
+
+    def encode(rows) -> bytes:
+        if rows is None:
+            writer.close()
+        elif rows:
+            writer.write_batch(pa.RecordBatch.from_arrays(
+                [pa.array([_arrow_value(row[i]) for row in rows], type=field.type) for i, field in enumerate(schema)],
+                schema=schema
+            ))
+        chunk = sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+        return chunk
+    return encode
+
+_ENCODERS = {"csv": _csv_encoder, "ndjson": _ndjson_encoder, "arrow": _arrow_encoder}
+
+def _json_value(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+def _arrow_type(column_type):
+    if isinstance(column_type, types.Date):
+        return pa.date32()
+    if isinstance(column_type, types.Integer):
+        return pa.int64()
+    if isinstance(column_type, (types.Numeric, types.Float)):
+        return pa.float64()
+    return pa.string()
+
+def _arrow_value(value):
+    return float(value) if isinstance(value, Decimal) else value
@@ -0,0 +1,89 @@
+from datetime import date
+from typing import Iterator, List, NamedTuple, Optional, Sequence, Union
+import numpy as np
+
+class PriceBar(NamedTuple):
+    """Lightweight bar with the fields the engine and strategies read."""
+    date: date
+    adj_open: float
+    adj_close: float
+
+class PriceSeries:
+    """
+    Date-ordered adjusted prices held as parallel NumPy columns.
+
+    dates is datetime64[D]; adj_open and adj_close are float64. The columns may
+    be views into a memory-mapped file. Indexing and iteration yield PriceBar
+    tuples, so the series can stand in for a list of AdjustedPrice rows.
+    """
+
+    def __init__(self, dates: np.ndarray, adj_open: np.ndarray, adj_close: np.ndarray):
+        if not len(dates) == len(adj_open) == len(adj_close):
+            raise ValueError("Price columns must have the same length")
+        self.dates = dates
+        self.adj_open = adj_open
+        self.adj_close = adj_close
+        self._bars: Optional[List[PriceBar]] = None
+
+    @classmethod
+    def from_columns(cls, dates: Sequence[date], adj_open: Sequence, adj_close: Sequence) -> "PriceSeries":
+        """Build a series from plain sequences of dates and prices (floats or Decimals; None becomes NaN)."""
+        return cls(
+            np.array(dates, dtype="datetime64[D]"),
+            np.array(adj_open, dtype=np.float64),
+            np.array(adj_close, dtype=np.float64)
+        )
+
+    @classmethod
+    def empty(cls) -> "PriceSeries":
+        return cls.from_columns([], [], [])
+
+    @classmethod
+    def from_rows(cls, rows: Sequence) -> "PriceSeries":
+        """Build a series from AdjustedPrice-like rows with date, adj_open and adj_close."""
+        count = len(rows)
+        return cls(
+            np.array([row.date for row in rows], dtype="datetime64[D]"),
+            np.fromiter((float(row.adj_open) for row in rows), dtype=np.float64, count=count),
+            np.fromiter((float(row.adj_close) for row in rows), dtype=np.float64, count=count)
+        )
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def __getitem__(self, index: Union[int, slice]):
+        if isinstance(index, slice):
+            return PriceSeries(self.dates[index], self.adj_open[index], self.adj_close[index])
+        return self.bars()[index]
+
+    def __iter__(self) -> Iterator[PriceBar]:
+        return iter(self.bars())
+
+    def bars(self) -> List[PriceBar]:
+        """The series as PriceBar tuples of Python dates and floats, built once and reused."""
+        if self._bars is None:
+            self._bars = [
+                PriceBar(*bar) for bar in zip(self.dates.tolist(), self.adj_open.tolist(), self.adj_close.tolist())
+            ]
+        return self._bars
+
+    def between(self, start_date: date, end_date: date) -> "PriceSeries":
+        """Slice to bars dated start_date..end_date inclusive, without copying the columns."""
+        start = np.searchsorted(self.dates, np.datetime64(start_date, "D"), side="left")
+        end = np.searchsorted(self.dates, np.datetime64(end_date, "D"), side="right")
+        return self[start:end]
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the columns (for memory-mapped columns, bytes mapped)."""
+        return self.dates.nbytes + self.adj_open.nbytes + self.adj_close.nbytes
+
+    def values(self, price_field: str) -> List[float]:
+        """A price column as a list of Python floats."""
+        return getattr(self, price_field).tolist()
+
+def price_values(prices, price_field: str = "adj_close") -> List[float]:
+    """A price field as floats, from a PriceSeries or a list of AdjustedPrice-like rows."""
+    if isinstance(prices, PriceSeries):
+        return prices.values(price_field)
+    return [float(getattr(p, price_field)) for p in prices]
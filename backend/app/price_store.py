@@ -0,0 +1,127 @@
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from .models import Stock, AdjustedPrice
+from .price_series import PriceSeries
+from datetime import date
+from typing import Optional
+import numpy as np
+import os
+import tempfile
+
+# One record per bar; NULL prices are stored as NaN and NULL volume as 0
+STORE_DTYPE = np.dtype([
+    ("date", "datetime64[D]"),
+    ("adj_open", np.float64),
+    ("adj_high", np.float64),
+    ("adj_low", np.float64),
+    ("adj_close", np.float64),
+    ("adj_volume", np.int64)
+])
+
+class ColumnarPriceStore:
+    """
+    Local on-disk copy of each symbol's adjusted price history as a NumPy .npy file.
+
+    Files are memory-mapped on read, so backtests slice the columns without
+    copying them and never touch the database or Decimal values. Files are
+    rewritten from adjusted_prices by refresh() after each ingest.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, symbol: str) -> str:
+        symbol = symbol.upper()
+        if not symbol or os.sep in symbol or symbol.startswith("."):
+            raise ValueError(f"Invalid symbol '{symbol}'")
+        return os.path.join(self.root, f"{symbol}.npy")
+
+    def read(self, symbol: str, start_date: Optional[date] = None,
+             end_date: Optional[date] = None) -> Optional[PriceSeries]:
+        """Memory-map a symbol's series, sliced to the date range; None if the symbol is not stored."""
+        try:
+            records = np.load(self.path(symbol), mmap_mode="r")
+        except FileNotFoundError:
+            return None
+        series = PriceSeries(records["date"], records["adj_open"], records["adj_close"])
+        if start_date is not None or end_date is not None:
+            series = series.between(start_date or date.min, end_date or date.max)
+        return series
+
+    def write(self, symbol: str, records: np.ndarray) -> None:
+        """Atomically replace a symbol's file; readers see either the old or the new series."""
+        path = self.path(symbol)
+        if len(records) == 0:
+            self.remove(symbol)
+            return
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, records.astype(STORE_DTYPE, copy=False))
+            os.replace(tmp_path, path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+    def remove(self, symbol: str) -> None:
+        try:
+            os.unlink(self.path(symbol))
+        except FileNotFoundError:
+            pass
+
+    def refresh(self, db: Session, symbol: str) -> int:
+        """Rewrite a symbol's file from adjusted_prices and return the number of bars stored."""
+        rows = db.execute(
+            select(
+                AdjustedPrice.date, AdjustedPrice.adj_open, AdjustedPrice.adj_high,
+                AdjustedPrice.adj_low, AdjustedPrice.adj_close, AdjustedPrice.adj_volume
+            )
+            .join(Stock, Stock.id == AdjustedPrice.stock_id)
+            .where(Stock.symbol == symbol.upper())
+            .order_by(AdjustedPrice.date)
+        ).all()
+
+        nan = float("nan")
+        records = np.array([
+            (
+                row.date,
+                float(row.adj_open) if row.adj_open is not None else nan,
+                float(row.adj_high) if row.adj_high is not None else nan,
+                float(row.adj_low) if row.adj_low is not None else nan,
+                float(row.adj_close) if row.adj_close is not None else nan,
+                row.adj_volume or 0
+            )
+            for row in rows
+        ], dtype=STORE_DTYPE)
+        self.write(symbol, records)
+        return len(records)
+
+_stores = {}
+
+def get_price_store() -> Optional[ColumnarPriceStore]:
+    """The store under PRICE_STORE_DIR, or None when the columnar store is disabled."""
+    root = os.getenv("PRICE_STORE_DIR")
+    if not root:
+        return None
+    store = _stores.get(root)
+    if store is None:
+        store = _stores[root] = ColumnarPriceStore(root)
+    return store
+
+def refresh_price_store(db: Session, symbol: str) -> Optional[int]:
+    """
+    Refresh a symbol after ingest; does nothing when the store is disabled.
+
+    If the refresh fails the symbol's file is dropped, so backtests fall back
+    to the database instead of reading a stale series.
+    """
+    store = get_price_store()
+    if store is None:
+        return None
+    try:
+        return store.refresh(db, symbol)
+    except Exception as e:
+        print(f"Warning: Could not refresh price store for {symbol}: {e}")
+        store.remove(symbol)
+        return None
@@ -1,15 +1,44 @@
 from ..models import AdjustedPrice
-from typing import List
+from ..price_series import PriceBar, PriceSeries
+from typing import List, Union
+
+# Strategies receive either an array-backed PriceSeries or a list of rows/bars
+Prices = Union[PriceSeries, List[AdjustedPrice], List[PriceBar]]
 
 class Strategy:
-    def should_buy(self, prices: List[AdjustedPrice], current_position: int, current_cash: float) -> bool:
+    def should_buy(self, prices: Prices, current_position: int, current_cash: float) -> bool:
         """Decide whether to buy based on current data and state."""
         return False
 
-    def should_sell(self, prices: List[AdjustedPrice], current_position: int, current_cash: float) -> bool:
+    def should_sell(self, prices: Prices, current_position: int, current_cash: float) -> bool:
         """Decide whether to sell based on current data and state."""
         return False
 
+class StreamingStrategy(Strategy):
+    """
+    Strategy that consumes one bar at a time and keeps its own state.
+
+    The engine calls reset() before a run, on_bar() once per bar in date order,
+    and then buy_signal()/sell_signal() to ask about the bar just seen. This keeps
+    a full backtest O(n) instead of re-evaluating the whole price prefix each bar.
+    """
+
+    def reset(self) -> None:
+        """Clear any state left over from a previous run."""
+        pass
+
+    def on_bar(self, bar: Union[PriceBar, AdjustedPrice]) -> None:
+        """Update internal state with the next bar."""
+        pass
+
+    def buy_signal(self, current_position: int, current_cash: float) -> bool:
+        """Decide whether to buy based on the bars seen so far."""
+        return False
+
+    def sell_signal(self, current_position: int, current_cash: float) -> bool:
+        """Decide whether to sell based on the bars seen so far."""
+        return False
+
 from .buy_and_hold import BuyAndHoldStrategy
 from .ema_crossover import EMACrossoverStrategy
 
@@ -1,12 +1,30 @@
-from . import Strategy
+from . import Prices, StreamingStrategy
 from ..models import AdjustedPrice
-from typing import List
+from ..price_series import PriceBar
+from typing import Union
 
-class BuyAndHoldStrategy(Strategy):
-    def should_buy(self, prices: List[AdjustedPrice], current_position: int, current_cash: float) -> bool:
+class BuyAndHoldStrategy(StreamingStrategy):
+    def __init__(self):
+        self.bars_seen = 0
+
+    def should_buy(self, prices: Prices, current_position: int, current_cash: float) -> bool:
         # Buy on the first day if no position
         return len(prices) == 1 and current_position == 0
 
-    def should_sell(self, prices: List[AdjustedPrice], current_position: int, current_cash: float) -> bool:
+    def should_sell(self, prices: Prices, current_position: int, current_cash: float) -> bool:
+        # Never sell during the period
+        return False
+
+    def reset(self) -> None:
+        self.bars_seen = 0
+
+    def on_bar(self, bar: Union[PriceBar, AdjustedPrice]) -> None:
+        self.bars_seen += 1
+
+    def buy_signal(self, current_position: int, current_cash: float) -> bool:
+        # Buy on the first day if no position
+        return self.bars_seen == 1 and current_position == 0
+
+    def sell_signal(self, current_position: int, current_cash: float) -> bool:
         # Never sell during the period
         return False
@@ -1,13 +1,72 @@
-from . import Strategy
+from . import Prices, StreamingStrategy
 from ..models import AdjustedPrice
-from typing import List, Optional
+from ..price_series import PriceBar, price_values
+from typing import List, Optional, Sequence, Union
 
-class EMACrossoverStrategy(Strategy):
-    def __init__(self, short_period: int = 5, long_period: int = 10):
+class _RunningEMA:
+    """EMA updated one value at a time, seeded with the SMA of the first `period` values."""
+
+    def __init__(self, period: int):
+        self.period = period
+        self.multiplier = 2 / (period + 1)
+        self.reset()
+
+    def reset(self) -> None:
+        self.count = 0
+        self.total = 0
+        self.value: Optional[float] = None
+        self.previous: Optional[float] = None
+
+    def update(self, price: float) -> None:
+        self.count += 1
+        if self.count < self.period:
+            self.total += price
+            return
+        self.previous = self.value
+        if self.count == self.period:
+            # First EMA is SMA
+            self.total += price
+            self.value = self.total / self.period
+        else:
+            self.value = (price * self.multiplier) + (self.value * (1 - self.multiplier))
+
+class _PrecomputedEMA:
+    """Steps through an EMA series computed ahead of time, aligned to the bars."""
+
+    def __init__(self, series: Sequence[Optional[float]]):
+        self.series = series
+        self.reset()
+
+    def reset(self) -> None:
+        self.count = 0
+        self.value: Optional[float] = None
+        self.previous: Optional[float] = None
+
+    def update(self, price: float) -> None:
+        if self.count >= len(self.series):
+            raise ValueError("Precomputed EMA series is shorter than the price series")
+        self.previous = self.value
+        self.value = self.series[self.count]
+        self.count += 1
+
+class EMACrossoverStrategy(StreamingStrategy):
+    def __init__(self, short_period: int = 5, long_period: int = 10,
+                 ema_short: Optional[Sequence[Optional[float]]] = None,
+                 ema_long: Optional[Sequence[Optional[float]]] = None):
+        """
+        Args:
+            short_period: Short EMA period
+            long_period: Long EMA period
+            ema_short: Optional precomputed short EMA aligned to the backtest bars
+            ema_long: Optional precomputed long EMA aligned to the backtest bars
+        """
         self.short_period = short_period
         self.long_period = long_period
+        self._ema_short = _PrecomputedEMA(ema_short) if ema_short is not None else _RunningEMA(short_period)
+        self._ema_long = _PrecomputedEMA(ema_long) if ema_long is not None else _RunningEMA(long_period)
+        self.bars_seen = 0
 
-    def should_buy(self, prices: List[AdjustedPrice], current_position: int, current_cash: float) -> bool:
+    def should_buy(self, prices: Prices, current_position: int, current_cash: float) -> bool:
         if current_position > 0 or len(prices) < self.long_period + 1:
             return False
 
@@ -22,7 +81,7 @@ class EMACrossoverStrategy(Strategy):
             return True
         return False
 
-    def should_sell(self, prices: List[AdjustedPrice], current_position: int, current_cash: float) -> bool:
+    def should_sell(self, prices: Prices, current_position: int, current_cash: float) -> bool:
         if current_position == 0 or len(prices) < self.long_period + 1:
             return False
 
@@ -37,12 +96,44 @@ class EMACrossoverStrategy(Strategy):
             return True
         return False
 
-    def _calculate_ema(self, prices: List[AdjustedPrice], period: int) -> Optional[List[float]]:
+    def reset(self) -> None:
+        self._ema_short.reset()
+        self._ema_long.reset()
+        self.bars_seen = 0
+
+    def on_bar(self, bar: Union[PriceBar, AdjustedPrice]) -> None:
+        # Use adjusted close prices for EMA calculation
+        close_price = float(bar.adj_close)
+        self._ema_short.update(close_price)
+        self._ema_long.update(close_price)
+        self.bars_seen += 1
+
+    def buy_signal(self, current_position: int, current_cash: float) -> bool:
+        if current_position > 0 or self.bars_seen < self.long_period + 1:
+            return False
+
+        # Check for upward crossover
+        short, long = self._ema_short, self._ema_long
+        if short.previous is None or long.previous is None:
+            return False
+        return short.previous <= long.previous and short.value > long.value
+
+    def sell_signal(self, current_position: int, current_cash: float) -> bool:
+        if current_position == 0 or self.bars_seen < self.long_period + 1:
+            return False
+
+        # Check for downward crossover
+        short, long = self._ema_short, self._ema_long
+        if short.previous is None or long.previous is None:
+            return False
+        return short.previous >= long.previous and short.value < long.value
+
+    def _calculate_ema(self, prices: Prices, period: int) -> Optional[List[float]]:
         if len(prices) < period:
             return None
 
         # Use adjusted close prices for EMA calculation
-        close_prices = [float(p.adj_close) for p in prices]
+        close_prices = price_values(prices, "adj_close")
         ema = []
         multiplier = 2 / (period + 1)
 
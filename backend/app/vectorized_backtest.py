@@ -0,0 +1,143 @@
+import numpy as np
+import time
+from typing import List, Tuple, Sequence, Dict, Any
+from .price_series import PriceSeries
+from .metrics import metrics
+
+class VectorizedEMAEngine:
+    """
+    Vectorized EMA crossover backtest that runs many (short, long) pairs at once.
+
+    Mirrors BacktestEngine + EMACrossoverStrategy exactly: EMAs are seeded with the
+    SMA of the first `period` adjusted closes, signals come from the current bar's
+    crossover and fill at the next bar's adjusted open, and any open position is
+    closed at the last adjusted close. Each distinct period is computed once.
+    """
+
+    def __init__(self, adj_open: Sequence[float], adj_close: Sequence[float], initial_cash: float = 10000):
+        self.adj_open = np.ascontiguousarray(adj_open, dtype=np.float64)
+        self.adj_close = np.ascontiguousarray(adj_close, dtype=np.float64)
+        self.initial_cash = float(initial_cash)
+        if self.adj_open.shape != self.adj_close.shape:
+            raise ValueError("adj_open and adj_close must have the same length")
+
+    @classmethod
+    def from_prices(cls, prices, initial_cash: float = 10000) -> "VectorizedEMAEngine":
+        """Build an engine from a PriceSeries or a list of AdjustedPrice-like rows."""
+        if isinstance(prices, PriceSeries):
+            return cls(np.asarray(prices.adj_open, dtype=np.float64),
+                       np.asarray(prices.adj_close, dtype=np.float64), initial_cash)
+        adj_open = np.fromiter((float(p.adj_open) for p in prices), dtype=np.float64, count=len(prices))
+        adj_close = np.fromiter((float(p.adj_close) for p in prices), dtype=np.float64, count=len(prices))
+        return cls(adj_open, adj_close, initial_cash)
+
+    def ema_matrix(self, periods: np.ndarray) -> np.ndarray:
+        """
+        Compute EMAs for sorted, distinct periods.
+
+        Returns an array of shape (bars, len(periods)); entries before each EMA's
+        seed bar are NaN. The arithmetic matches EMACrossoverStrategy step for step.
+        """
+        closes = self.adj_close
+        n = len(closes)
+        ema = np.full((n, len(periods)), np.nan)
+        if n == 0:
+            return ema
+
+        # First EMA is SMA; cumsum adds sequentially, like sum() over the prefix
+        prefix_sums = np.cumsum(closes)
+        multipliers = 2 / (periods + 1)
+        decays = 1 - multipliers
+        for k, period in enumerate(periods):
+            if period <= n:
+                ema[period - 1, k] = prefix_sums[period - 1] / period
+
+        for t in range(1, n):
+            # Periods are sorted, so the EMAs already seeded before bar t form a prefix
+            active = np.searchsorted(periods, t, side="right")
+            if active:
+                ema[t, :active] = (closes[t] * multipliers[:active]) + (ema[t - 1, :active] * decays[:active])
+        return ema
+
+    def signals(self, combinations: List[Tuple[int, int]]) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (buy, sell) crossover masks of shape (bars, pairs)."""
+        shorts = np.array([s for s, _ in combinations], dtype=np.int64)
+        longs = np.array([l for _, l in combinations], dtype=np.int64)
+        periods = np.unique(np.concatenate([shorts, longs]))
+        with metrics.timer("indicator"):
+            ema = self.ema_matrix(periods)
+
+        ema_short = ema[:, np.searchsorted(periods, shorts)]
+        ema_long = ema[:, np.searchsorted(periods, longs)]
+
+        n = len(self.adj_close)
+        buy = np.zeros(ema_short.shape, dtype=bool)
+        sell = np.zeros(ema_short.shape, dtype=bool)
+        if n < 2:
+            return buy, sell
+
+        # Signals need at least long_period + 1 bars of history
+        warm = np.arange(n)[:, None] >= longs[None, :]
+        buy[1:] = (ema_short[:-1] <= ema_long[:-1]) & (ema_short[1:] > ema_long[1:])
+        sell[1:] = (ema_short[:-1] >= ema_long[:-1]) & (ema_short[1:] < ema_long[1:])
+        buy &= warm
+        sell &= warm
+        return buy, sell
+
+    def run(self, combinations: List[Tuple[int, int]]) -> List[Dict[str, Any]]:
+        """
+        Simulate every combination and return one result per pair, in input order.
+
+        Results carry final_cash, total_return, total_return_percent and num_trades;
+        per-trade detail is not collected in vectorized mode.
+        """
+        pairs = len(combinations)
+        n = len(self.adj_close)
+        cash = np.full(pairs, self.initial_cash)
+        position = np.zeros(pairs, dtype=np.int64)
+        num_trades = np.zeros(pairs, dtype=np.int64)
+
+        if pairs and n:
+            buy, sell = self.signals(combinations)
+            simulate_start = time.perf_counter()
+            # Only bars before the last can trigger a next-day fill
+            active_bars = np.flatnonzero((buy[:-1] | sell[:-1]).any(axis=1))
+
+            for t in active_bars:
+                price = self.adj_open[t + 1]
+
+                buying = np.flatnonzero(buy[t] & (position == 0) & (cash > 0))
+                if len(buying):
+                    shares = np.floor_divide(cash[buying], price).astype(np.int64)
+                    filled = shares > 0
+                    buying, shares = buying[filled], shares[filled]
+                    cash[buying] -= shares * price
+                    position[buying] += shares
+                    num_trades[buying] += 1
+
+                selling = np.flatnonzero(sell[t] & (position > 0))
+                if len(selling):
+                    cash[selling] += position[selling] * price
+                    position[selling] = 0
+                    num_trades[selling] += 1
+
+            # Sell any remaining position at the end (last day close)
+            holding = np.flatnonzero(position > 0)
+            cash[holding] += position[holding] * self.adj_close[-1]
+            num_trades[holding] += 1
+            metrics.observe("simulate", time.perf_counter() - simulate_start)
+            metrics.inc("backtest_bars_processed_total", n * pairs)
+
+        results = []
+        for k, (short, long) in enumerate(combinations):
+            final_cash = float(cash[k])
+            total_return = (final_cash - self.initial_cash) / self.initial_cash if self.initial_cash > 0 else 0
+            results.append({
+                'short_period': short,
+                'long_period': long,
+                'final_cash': final_cash,
+                'total_return': total_return,
+                'total_return_percent': total_return * 100,
+                'num_trades': int(num_trades[k])
+            })
+        return results
@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+Timing benchmark for the backtest pipeline on synthetic adjusted prices.
+
+Generates random-walk price series, loads them into a scratch SQLite database
+and times:
+  - load_prices:       one symbol's range from adjusted_prices
+  - strategy_on_bar:   EMACrossoverStrategy fed bar by bar
+  - engine_run:        BacktestEngine.run with a preloaded PriceSeries
+  - sweep:             EMABacktester.run_combinations over the default grid, per mode
+  - portfolio_sweep:   PortfolioBacktester over many symbols (vectorized)
+  - ingest_single:     POST /stocks/{symbol}/fetch-adjusted-prices
+  - ingest_batch:      POST /stocks/fetch-adjusted-prices/batch
+The ingest endpoints fetch from a local stub Tiingo server. No PostgreSQL or
+network access is needed.
+
+Results are written as JSON. With --baseline, each case's median is compared
+with the stored one. A case slower by more than --tolerance is flagged, and
+the script exits with status 1. --update-baseline stores the current run as
+the baseline.
+
+Usage (from the backend directory):
+    python benchmarks/backtest_benchmark.py --json backtest_benchmark.json
+    python benchmarks/backtest_benchmark.py --quick --baseline benchmarks/backtest_baseline.json
+    python benchmarks/backtest_benchmark.py --baseline benchmarks/backtest_baseline.json --update-baseline
+"""
+
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import warnings
+import zlib
+
+import numpy as np
+
+# Keep the app off the configured database: everything runs against a scratch SQLite file
+WORK_DIR = tempfile.mkdtemp(prefix="backtest_benchmark_")
+DATABASE_URL = f"sqlite:///{os.path.join(WORK_DIR, 'benchmark.db')}"
+os.environ["DATABASE_URL"] = DATABASE_URL
+os.environ.pop("PRICE_STORE_DIR", None)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from fastapi.testclient import TestClient
+
+from app import main
+from app.backtest import BacktestEngine, load_prices
+from app.database import Base, get_db
+from app.ema_backtester import EMABacktester
+from app.models import AdjustedPrice, Stock
+from app.portfolio_backtest import PortfolioBacktester
+from app.price_series import PriceSeries
+from app.strategies.ema_crossover import EMACrossoverStrategy
+
+warnings.filterwarnings("ignore", message=".*Decimal objects natively.*")
+
+DAY0 = date(2000, 1, 3)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bars", default="1000,10000,100000",
+                        help="series lengths for load_prices, strategy_on_bar and engine_run")
+    parser.add_argument("--sweep-bars", type=int, default=2520, help="series length for the sweeps")
+    parser.add_argument("--modes", default="loop,vectorized,process", help="EMABacktester modes to sweep")
+    parser.add_argument("--symbols", default="1,50,500", help="symbol counts for portfolio_sweep and ingest_batch")
+    parser.add_argument("--symbol-bars", type=int, default=250, help="bars per symbol for the multi-symbol cases")
+    parser.add_argument("--ingest-bars", default="1000,10000", help="series lengths for ingest_single")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per case")
+    parser.add_argument("--quick", action="store_true", help="small sizes for a fast smoke run")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--baseline", help="baseline results to compare against")
+    parser.add_argument("--update-baseline", action="store_true", help="write this run to --baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="flag cases whose median is more than this fraction slower than the baseline")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    if args.quick:
+        args.bars, args.sweep_bars, args.symbols, args.symbol_bars = "1000,5000", 500, "1,20", 100
+        args.ingest_bars, args.modes, args.repeat = "1000", "loop,vectorized", min(args.repeat, 2)
+    if args.update_baseline and not args.baseline:
+        parser.error("--update-baseline needs --baseline")
+    return args
+
+def sizes(value: str) -> list:
+    return [int(size) for size in value.split(",") if size.strip()]
+
+def synthetic_bars(count: int, seed: int) -> dict:
+    """Random-walk adjusted prices on consecutive days, rounded like DECIMAL(10, 4)."""
+    rng = np.random.default_rng(seed)
+    closes = np.round(100 * np.exp(np.cumsum(rng.normal(0.0003, 0.015, count))), 4)
+    opens = np.round(closes * (1 + rng.normal(0, 0.005, count)), 4)
+    return {
+        "dates": [DAY0 + timedelta(days=i) for i in range(count)],
+        "adj_open": opens.tolist(),
+        "adj_close": closes.tolist()
+    }
+
+def symbol_seed(symbol: str, seed: int) -> int:
+    return zlib.crc32(symbol.encode()) + seed
+
+class Database:
+    """Scratch SQLite database shared by the cases; synthetic symbols are inserted on demand."""
+
+    def __init__(self, seed: int):
+        self.seed = seed
+        self.engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+        Base.metadata.create_all(self.engine)
+        self.session_factory = sessionmaker(bind=self.engine)
+        self.loaded = set()
+
+    def symbol(self, symbol: str, bars: int) -> dict:
+        data = synthetic_bars(bars, symbol_seed(symbol, self.seed))
+        if symbol not in self.loaded:
+            with self.session_factory() as db:
+                stock = Stock(symbol=symbol, name=symbol)
+                db.add(stock)
+                db.flush()
+                db.execute(insert(AdjustedPrice), [
+                    {"stock_id": stock.id, "date": day, "adj_open": adj_open, "adj_close": adj_close}
+                    for day, adj_open, adj_close in zip(data["dates"], data["adj_open"], data["adj_close"])
+                ])
+                db.commit()
+            self.loaded.add(symbol)
+        return data
+
+class StubTiingoHandler(BaseHTTPRequestHandler):
+    """Serves `bars` synthetic Tiingo records for any symbol."""
+    bars = 0
+    seed = 0
+
+    def do_GET(self):
+        symbol = self.path.split("/")[3]
+        data = synthetic_bars(type(self).bars, symbol_seed(symbol, type(self).seed))
+        body = [
+            {
+                "date": f"{day.isoformat()}T00:00:00.000Z",
+                "close": adj_close, "high": adj_close, "low": adj_close, "open": adj_open, "volume": 1000,
+                "adjClose": adj_close, "adjHigh": adj_close, "adjLow": adj_close, "adjOpen": adj_open,
+                "adjVolume": 1000, "divCash": 0.0, "splitFactor": 1.0
+            }
+            for day, adj_open, adj_close in zip(data["dates"], data["adj_open"], data["adj_close"])
+        ]
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(json.dumps(body).encode())
+
+    def log_message(self, *args):
+        pass
+
+def measure(name: str, params: dict, repeat: int, run, units: int, unit: str, setup=None) -> dict:
+    """Time run() `repeat` times (after an untimed setup(i) if given) and summarise."""
+    timings = []
+    for i in range(repeat):
+        argument = setup(i) if setup else None
+        start = time.perf_counter()
+        run(argument) if setup else run()
+        timings.append(time.perf_counter() - start)
+    median = statistics.median(timings)
+    result = {
+        "case": name,
+        "params": params,
+        "repeat": repeat,
+        "median_seconds": round(median, 6),
+        "min_seconds": round(min(timings), 6),
+        f"{unit}_per_second": round(units / median, 1) if median > 0 else None
+    }
+    print(f"  {case_key(result):<52}{median * 1000:>12.2f}ms{result[f'{unit}_per_second'] or 0:>16,.0f} {unit}/s")
+    return result
+
+def case_key(result: dict) -> str:
+    params = ",".join(f"{key}={value}" for key, value in result["params"].items())
+    return f"{result['case']}[{params}]"
+
+def bench_series(database: Database, args) -> list:
+    results = []
+    for bars in sizes(args.bars):
+        symbol = f"B{bars}"
+        data = database.symbol(symbol, bars)
+        series = PriceSeries.from_columns(data["dates"], data["adj_open"], data["adj_close"])
+        params = {"bars": bars}
+
+        def run_load():
+            with database.session_factory() as db:
+                load_prices(db, symbol, data["dates"][0], data["dates"][-1])
+        results.append(measure("load_prices", params, args.repeat, run_load, bars, "bars"))
+
+        def run_strategy():
+            strategy = EMACrossoverStrategy(12, 26)
+            strategy.reset()
+            for bar in series.bars():
+                strategy.on_bar(bar)
+                strategy.buy_signal(0, 10000)
+                strategy.sell_signal(1, 0)
+        results.append(measure("strategy_on_bar", params, args.repeat, run_strategy, bars, "bars"))
+
+        def run_engine():
+            engine = BacktestEngine(EMACrossoverStrategy(12, 26), symbol, data["dates"][0], data["dates"][-1],
+                                    10000, prices=series)
+            engine.run(None)
+        results.append(measure("engine_run", params, args.repeat, run_engine, bars, "bars"))
+    return results
+
+def bench_sweeps(database: Database, args) -> list:
+    results = []
+    symbol = "SWEEP"
+    data = database.symbol(symbol, args.sweep_bars)
+    for mode in [mode for mode in args.modes.split(",") if mode]:
+        backtester = EMABacktester(symbol, data["dates"][0], data["dates"][-1], 10000)
+        combinations = len(backtester.generate_ema_combinations())
+
+        def run_sweep():
+            # A fresh backtester per run, so no prices or EMAs carry over
+            with database.session_factory() as db:
+                EMABacktester(symbol, data["dates"][0], data["dates"][-1], 10000).run_combinations(db, mode=mode)
+        results.append(measure("sweep", {"mode": mode, "bars": args.sweep_bars, "combinations": combinations},
+                               args.repeat, run_sweep, combinations, "combinations"))
+
+    for count in sizes(args.symbols):
+        symbols = [f"P{i:04d}" for i in range(count)]
+        for symbol in symbols:
+            data = database.symbol(symbol, args.symbol_bars)
+
+        def run_portfolio():
+            with database.session_factory() as db:
+                PortfolioBacktester(symbols, data["dates"][0], data["dates"][-1]).run(db, mode="vectorized", top=1)
+        results.append(measure("portfolio_sweep", {"symbols": count, "bars": args.symbol_bars},
+                               args.repeat, run_portfolio, count, "symbols"))
+    return results
+
+def bench_ingest(database: Database, args) -> list:
+    StubTiingoHandler.seed = args.seed
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubTiingoHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    def override_get_db():
+        db = database.session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    original_session = main.SessionLocal
+    original_env = dict(os.environ)
+    main.SessionLocal = database.session_factory
+    main.app.dependency_overrides[get_db] = override_get_db
+    os.environ["TIINGO_BASE_URL"] = f"http://127.0.0.1:{server.server_address[1]}"
+    os.environ["TIINGO_API_KEY"] = "benchmark"
+    client = TestClient(main.app)
+    results = []
+    try:
+        for bars in sizes(args.ingest_bars):
+            StubTiingoHandler.bars = bars
+
+            def run_single(symbol):
+                response = client.post(f"/stocks/{symbol}/fetch-adjusted-prices")
+                assert response.status_code == 200, response.text
+            # Each run writes a new symbol, so every bar is an insert
+            results.append(measure("ingest_single", {"bars": bars}, args.repeat, run_single, bars, "bars",
+                                   setup=lambda i, bars=bars: f"I{bars}R{i}"))
+
+        StubTiingoHandler.bars = args.symbol_bars
+        for count in sizes(args.symbols):
+            def run_batch(symbols):
+                response = client.post("/stocks/fetch-adjusted-prices/batch", json={"symbols": symbols})
+                assert response.status_code == 200 and response.json()["total_failed"] == 0, response.text
+            results.append(measure("ingest_batch", {"symbols": count, "bars": args.symbol_bars}, args.repeat,
+                                   run_batch, count * args.symbol_bars, "bars",
+                                   setup=lambda i, count=count: [f"N{count}R{i}S{j}" for j in range(count)]))
+    finally:
+        server.shutdown()
+        main.SessionLocal = original_session
+        main.app.dependency_overrides.pop(get_db, None)
+        os.environ.clear()
+        os.environ.update(original_env)
+    return results
+
+def compare(results: list, baseline: dict, tolerance: float) -> list:
+    """Return the cases whose median is more than `tolerance` slower than the baseline's."""
+    stored = {case_key(result): result for result in baseline.get("results", [])}
+    regressions = []
+    print(f"\n{'case':<52}{'baseline':>12}{'current':>12}{'ratio':>8}")
+    for result in results:
+        key = case_key(result)
+        if key not in stored:
+            print(f"{key:<52}{'-':>12}{result['median_seconds'] * 1000:>10.2f}ms{'new':>8}")
+            continue
+        ratio = result["median_seconds"] / stored[key]["median_seconds"] if stored[key]["median_seconds"] else 1.0
+        result["baseline_ratio"] = round(ratio, 3)
+        flag = ratio > 1 + tolerance
+        if flag:
+            regressions.append(key)
+        print(f"{key:<52}{stored[key]['median_seconds'] * 1000:>10.2f}ms{result['median_seconds'] * 1000:>10.2f}ms"
+              f"{ratio:>7.2f}x{'  REGRESSION' if flag else ''}")
+    return regressions
+
+def main_benchmark():
+    args = parse_args()
+    database = Database(args.seed)
+    print(f"Scratch database: {DATABASE_URL}")
+
+    results = []
+    print("\nSeries (load, strategy, engine):")
+    results += bench_series(database, args)
+    print("\nSweeps:")
+    results += bench_sweeps(database, args)
+    print("\nIngest endpoints:")
+    results += bench_ingest(database, args)
+
+    report = {
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count()
+        },
+        "repeat": args.repeat,
+        "results": results
+    }
+
+    regressions = []
+    if args.baseline and os.path.exists(args.baseline) and not args.update_baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        report["tolerance"] = args.tolerance
+        report["regressions"] = regressions
+        print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}" if regressions
+              else f"\nNo regressions beyond {args.tolerance:.0%}")
+
+    for path in [args.json, args.baseline if args.update_baseline else None]:
+        if path:
+            with open(path, "w") as f:
+                json.dump(report, f, indent=2)
+            print(f"Wrote {path}")
+
+    sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main_benchmark()
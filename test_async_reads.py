@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Test script for the async read endpoints: /stocks/, /prices/, adjusted prices,
+/ema-backtests/best and /summary served through an async SQLAlchemy session
+"""
+
+import asyncio
+import sys
+import warnings
+from unittest import mock
+
+# Add the backend app to the path
+sys.path.append('/workspaces/backend')
+
+import httpx
+from backend.app import database, main
+from backend.app.database import async_database_url
+from backend.app.ema_backtester import EMABacktester
+from test_backtest_jobs import make_session_factory
+from test_streaming_strategies import make_bars
+
+warnings.filterwarnings("ignore", message=".*Decimal objects natively.*")
+
+
+def test_async_database_url():
+    assert async_database_url("postgresql://user:pw@db:5432/mydb") == "postgresql+asyncpg://user:pw@db:5432/mydb"
+    assert async_database_url("postgresql+psycopg2://u:p@h/d") == "postgresql+asyncpg://u:p@h/d"
+    assert async_database_url("sqlite:////tmp/app.db") == "sqlite+aiosqlite:////tmp/app.db"
+    print("✅ Sync URLs map to the asyncpg / aiosqlite drivers")
+
+
+def test_async_read_endpoints():
+    print("=== Testing async read endpoints ===\n")
+    bars = make_bars(300)
+    session_factory = make_session_factory(bars)
+    with session_factory() as db:
+        EMABacktester("TEST", bars[0].date, bars[-1].date, 10000).run_combinations(db, [3, 5], [10, 20],
+                                                                                  mode="vectorized")
+    url = str(session_factory.kw["bind"].url)
+    range_params = {"symbol": "TEST", "start_date": str(bars[0].date), "end_date": str(bars[-1].date)}
+
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            stocks = (await client.get("/stocks/")).json()
+            assert [stock["symbol"] for stock in stocks] == ["TEST"]
+
+            prices = (await client.get("/stocks/test/adjusted-prices",
+                                       params={"start_date": str(bars[100].date), "limit": 500})).json()
+            assert len(prices) == 200 and prices[0]["date"] == str(bars[-1].date)
+            assert (await client.get("/stocks/NONE/adjusted-prices")).status_code == 404
+            assert (await client.get("/prices/")).json() == []
+
+            best = (await client.get("/ema-backtests/best", params=range_params)).json()
+            summary = (await client.get("/ema-backtests/summary", params=range_params)).json()
+            assert summary["total_combinations"] == 4
+            assert best["total_return_percent"] == summary["best_return_percent"]
+            print("✅ Stocks, prices, adjusted prices, best and summary are served by async handlers")
+
+            # Many overlapping reads share one event loop
+            responses = await asyncio.gather(*(
+                client.get("/stocks/test/adjusted-prices", params={"limit": 10}) for _ in range(200)
+            ))
+            assert all(response.status_code == 200 for response in responses)
+            print("✅ 200 concurrent reads complete on a single event loop")
+        await database.async_read_session_factory().kw["bind"].dispose()
+
+    with mock.patch.object(database, "DATABASE_URL", url), mock.patch.object(database, "DATABASE_READ_URL", None):
+        asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_async_database_url()
+    test_async_read_endpoints()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Test script for background EMA backtest jobs: submission, progress polling and
+resuming jobs left behind by a restart, run against a temporary SQLite database
+"""
+
+import os
+import sys
+import tempfile
+import time
+import warnings
+from datetime import datetime, timedelta
+
+# Add the backend app to the path
+sys.path.append('/workspaces/backend')
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from backend.app.database import Base
+from backend.app.models import Stock, AdjustedPrice, EMABacktest, BacktestJob
+from backend.app.jobs import JobRunner, job_status, submit_ema_sweep_job
+from test_streaming_strategies import make_bars
+
+warnings.filterwarnings("ignore", message=".*Decimal objects natively.*")
+
+
+def make_session_factory(bars, series=None):
+    """File-backed SQLite database holding `bars` for TEST, or a {symbol: bars} mapping."""
+    db_path = os.path.join(tempfile.mkdtemp(), "jobs.db")
+    engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+    # WAL lets job progress writes and status reads run alongside a sweep's transaction
+    event.listen(engine, "connect", lambda connection, _: connection.execute("PRAGMA journal_mode=WAL"))
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine)
+
+    db = session_factory()
+    for symbol, symbol_bars in (series or {"TEST": bars}).items():
+        stock = Stock(symbol=symbol, name=symbol)
+        db.add(stock)
+        db.flush()
+        db.add_all([
+            AdjustedPrice(stock_id=stock.id, date=bar.date, adj_open=bar.adj_open, adj_close=bar.adj_close)
+            for bar in symbol_bars
+        ])
+    db.commit()
+    db.close()
+    return session_factory
+
+
+def make_params(bars, mode):
+    return {
+        "symbol": "TEST",
+        "start_date": bars[0].date.isoformat(),
+        "end_date": bars[-1].date.isoformat(),
+        "initial_cash": 10000,
+        "short_periods": [3, 5, 8],
+        "long_periods": [10, 20, 30],
+        "mode": mode,
+        "workers": None,
+        "use_price_cache": False
+    }
+
+
+class RecordingRunner(JobRunner):
+    """JobRunner that keeps every progress write, and the job status a poll sees after it, by job id."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.progress_writes = {}
+        self.polled = {}
+
+    def _record_progress(self, job_id, completed, new_results):
+        self.progress_writes.setdefault(job_id, []).append(completed)
+        super()._record_progress(job_id, completed, new_results)
+        with self.session_factory() as db:
+            self.polled.setdefault(job_id, []).append(job_status(db.get(BacktestJob, job_id)))
+
+
+def test_job_runs_to_completion():
+    print("=== Testing background backtest jobs ===\n")
+    bars = make_bars(300)
+    session_factory = make_session_factory(bars)
+    runner = RecordingRunner(session_factory, max_workers=2, progress_interval=0)
+
+    db = session_factory()
+    job = submit_ema_sweep_job(db, make_params(bars, "loop"), runner)
+    assert job.status == "queued"
+    # The full default grid runs alongside it, in batches of 50
+    grid = submit_ema_sweep_job(db, dict(make_params(bars, "vectorized"), short_periods=None, long_periods=None,
+                                         initial_cash=20000), runner)
+    runner.shutdown(wait=True)
+
+    db.expire_all()
+    status = job_status(db.get(BacktestJob, job.id))
+    assert status["status"] == "completed", status["error"]
+    assert (status["total"], status["completed"], status["percent_complete"]) == (9, 9, 100.0)
+    assert status["eta_seconds"] == 0.0
+    assert [(r["short_period"], r["long_period"]) for r in status["results"]][:2] == [(3, 10), (3, 20)]
+    assert all(r["backtest_id"] for r in status["results"])
+    assert db.query(EMABacktest).filter(EMABacktest.initial_cash == 10000).count() == 9
+    print(f"✅ Job {job.id} completed {status['completed']}/{status['total']} combinations and saved them")
+
+    grid_status = job_status(db.get(BacktestJob, grid.id))
+    assert grid_status["status"] == "completed", grid_status["error"]
+    writes = runner.progress_writes[grid.id]
+    assert writes == sorted(writes) and len(writes) > 1 and writes[-1] < grid_status["total"]
+    assert db.query(EMABacktest).filter(EMABacktest.initial_cash == 20000).count() == grid_status["total"]
+    print(f"✅ A concurrent {grid_status['total']}-combination job reported {len(writes)} partial progress updates")
+
+    # Polling a running job returns the results finished so far, in order
+    for polled in runner.polled[grid.id]:
+        assert polled["status"] == "running"
+        assert len(polled["results"]) == polled["completed"]
+    partial = runner.polled[grid.id][-1]["results"]
+    assert 0 < len(partial) < grid_status["total"]
+    assert [(r["short_period"], r["long_period"]) for r in partial] == \
+        [(r["short_period"], r["long_period"]) for r in grid_status["results"][:len(partial)]]
+    print(f"✅ Polling the running job returned up to {len(partial)} partial results")
+
+    failing = submit_ema_sweep_job(db, make_params(bars, "bogus"), runner)
+    runner.shutdown(wait=True)
+    db.expire_all()
+    status = job_status(db.get(BacktestJob, failing.id), include_results=False)
+    assert status["status"] == "failed" and "Mode must be one of" in status["error"]
+    assert "results" not in status
+    print("✅ A failing job records its error")
+
+
+def test_resume_pending_jobs():
+    bars = make_bars(200)
+    session_factory = make_session_factory(bars)
+
+    # Simulate a restart: one job never started, one was running when the process died
+    now = datetime.utcnow()
+    db = session_factory()
+    queued = BacktestJob(kind="ema_sweep", status="queued", params=make_params(bars, "vectorized"))
+    expired = BacktestJob(kind="ema_sweep", status="running", params=make_params(bars, "loop"), total=9,
+                          completed=4, worker_id="old", lease_expires_at=now - timedelta(seconds=1), updated_at=now)
+    # A job from before leases were recorded, last heard from an hour ago
+    stale = BacktestJob(kind="ema_sweep", status="running", params=make_params(bars, "loop"),
+                        total=9, completed=4, updated_at=now - timedelta(hours=1))
+    live = BacktestJob(kind="ema_sweep", status="running", params=make_params(bars, "loop"), total=9,
+                       completed=4, worker_id="other", lease_expires_at=now + timedelta(hours=1), updated_at=now)
+    db.add_all([queued, expired, stale, live])
+    db.commit()
+
+    runner = JobRunner(session_factory, max_workers=2, lease_seconds=300)
+    resumed = runner.resume_pending()
+    runner.shutdown(wait=True)
+    assert sorted(resumed) == sorted([queued.id, expired.id, stale.id])
+
+    db.expire_all()
+    for job in (queued, expired, stale):
+        assert db.get(BacktestJob, job.id).status == "completed"
+        assert db.get(BacktestJob, job.id).worker_id == runner.worker_id
+    assert db.get(BacktestJob, live.id).status == "running"
+    print("✅ Queued and expired running jobs are resumed; a job with a live lease is left alone")
+
+
+def test_rescan_reclaims_recently_interrupted_job():
+    # The process died a moment ago, so the job's lease is still valid when the new runner starts
+    bars = make_bars(200)
+    session_factory = make_session_factory(bars)
+    db = session_factory()
+    now = datetime.utcnow()
+    interrupted = BacktestJob(kind="ema_sweep", status="running", params=make_params(bars, "loop"), total=9,
+                              completed=4, worker_id="old", lease_expires_at=now + timedelta(seconds=1),
+                              updated_at=now)
+    db.add(interrupted)
+    db.commit()
+
+    runner = JobRunner(session_factory, max_workers=1, lease_seconds=0.3)
+    try:
+        assert runner.start() == []
+        deadline = time.monotonic() + 15
+        while time.monotonic() < deadline:
+            db.expire_all()
+            if db.get(BacktestJob, interrupted.id).status == "completed":
+                break
+            time.sleep(0.1)
+    finally:
+        runner.shutdown(wait=True)
+
+    job = db.get(BacktestJob, interrupted.id)
+    assert job.status == "completed" and job.worker_id == runner.worker_id and job.lease_expires_at is None
+    assert len(job.results) == 9
+    print("✅ The periodic rescan reclaims a job once its old worker's lease runs out")
+
+
+if __name__ == "__main__":
+    test_job_runs_to_completion()
+    test_resume_pending_jobs()
+    test_rescan_reclaims_recently_interrupted_job()
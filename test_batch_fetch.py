@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Test script for the concurrent multi-symbol Tiingo fetch endpoint, run against
+a local stub HTTP server and an in-memory SQLite database
+"""
+
+import os
+import sys
+import json
+import tempfile
+import time
+import threading
+import warnings
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add the backend app to the path
+sys.path.append('/workspaces/backend')
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from fastapi.testclient import TestClient
+from backend.app import main
+from backend.app.database import Base
+from backend.app.models import Stock, AdjustedPrice
+
+warnings.filterwarnings("ignore", message=".*Decimal objects natively.*")
+
+DELAY = 0.2
+
+
+class StubTiingoHandler(BaseHTTPRequestHandler):
+    """Serves /tiingo/daily/<symbol>/prices; symbols starting with BAD return 404."""
+    lock = threading.Lock()
+    in_flight = 0
+    max_in_flight = 0
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.in_flight += 1
+            cls.max_in_flight = max(cls.max_in_flight, cls.in_flight)
+        try:
+            time.sleep(DELAY)
+            symbol = self.path.split("/")[3]
+            if symbol.startswith("BAD"):
+                self.send_response(404)
+                self.end_headers()
+                self.wfile.write(b'{"detail": "Ticker not found"}')
+                return
+            body = json.dumps([
+                {
+                    "date": f"{(date(2024, 1, 1) + timedelta(days=i)).isoformat()}T00:00:00.000Z",
+                    "close": 10.0 + i, "high": 11.0 + i, "low": 9.0 + i, "open": 10.0 + i, "volume": 100,
+                    "adjClose": 10.0 + i, "adjHigh": 11.0 + i, "adjLow": 9.0 + i, "adjOpen": 10.0 + i,
+                    "adjVolume": 100, "divCash": 0.0, "splitFactor": 1.0
+                }
+                for i in range(30)
+            ]).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with cls.lock:
+                cls.in_flight -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+def test_batch_fetch_against_stub_server():
+    print("=== Testing concurrent batch fetch ===\n")
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubTiingoHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    # File-backed so each threadpool writer gets its own connection
+    db_path = os.path.join(tempfile.mkdtemp(), "batch_fetch.db")
+    engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine)
+
+    original_session = main.SessionLocal
+    original_env = dict(os.environ)
+    main.SessionLocal = session_factory
+    os.environ["TIINGO_BASE_URL"] = f"http://127.0.0.1:{server.server_address[1]}"
+    os.environ["TIINGO_API_KEY"] = "test-key"
+    try:
+        symbols = [f"SYM{i}" for i in range(12)] + ["BAD1"]
+        start = time.perf_counter()
+        response = TestClient(main.app).post(
+            "/stocks/fetch-adjusted-prices/batch",
+            json={"symbols": symbols, "max_concurrency": 4}
+        )
+        elapsed = time.perf_counter() - start
+    finally:
+        main.SessionLocal = original_session
+        os.environ.clear()
+        os.environ.update(original_env)
+        server.shutdown()
+
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert data["total_symbols"] == 13
+    assert data["total_failed"] == 1
+    assert data["total_inserted"] == 12 * 30
+    assert [r["symbol"] for r in data["results"]] == symbols
+    assert "404" in data["results"][-1]["error"]
+    print(f"✅ {data['message']} in {elapsed:.2f}s")
+
+    # 13 requests at 0.2s each with at most 4 in flight: ~4 rounds, not 13
+    assert StubTiingoHandler.max_in_flight <= 4
+    assert elapsed < 13 * DELAY * 0.6
+    print(f"✅ At most {StubTiingoHandler.max_in_flight} requests were in flight at once")
+
+    db = session_factory()
+    assert db.query(Stock).count() == 12
+    assert db.query(AdjustedPrice).count() == 12 * 30
+    print("✅ Every successful payload was bulk-upserted")
+
+
+if __name__ == "__main__":
+    test_batch_fetch_against_stub_server()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the set-based upsert used by the price ingest endpoints,
+run against an in-memory SQLite database
+"""
+
+import sys
+import warnings
+from datetime import date, timedelta
+
+# Add the backend app to the path
+sys.path.append('/workspaces/backend')
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from backend.app.database import Base
+from backend.app.models import Stock, Price, AdjustedPrice
+from backend.app.ingest import alpha_vantage_rows, tiingo_adjusted_rows, upsert_adjusted_prices, upsert_prices
+
+warnings.filterwarnings("ignore", message=".*Decimal objects natively.*")
+
+
+def make_session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    db = sessionmaker(bind=engine)()
+    return db, statements
+
+
+def tiingo_payload(start, days, adj_close=100.0):
+    records = []
+    for i in range(days):
+        day = start + timedelta(days=i)
+        records.append({
+            "date": f"{day.isoformat()}T00:00:00.000Z",
+            "close": 100.0 + i, "high": 101.0 + i, "low": 99.0 + i, "open": 100.0 + i,
+            "volume": 1000 + i,
+            "adjClose": adj_close + i, "adjHigh": adj_close + 1 + i, "adjLow": adj_close - 1 + i,
+            "adjOpen": adj_close + i, "adjVolume": 1000 + i,
+            "divCash": 0.0, "splitFactor": 1.0
+        })
+    return records
+
+
+def test_adjusted_price_upsert():
+    print("=== Testing adjusted price bulk upsert ===\n")
+    db, statements = make_session()
+    stock = Stock(symbol="TEST")
+    db.add(stock)
+    db.commit()
+
+    rows = tiingo_adjusted_rows(stock.id, tiingo_payload(date(2020, 1, 1), 500))
+    statements.clear()
+    inserted, updated = upsert_adjusted_prices(db, rows)
+    db.commit()
+    assert (inserted, updated) == (500, 0)
+    assert len([s for s in statements if s.startswith("INSERT")]) <= 2
+    print(f"✅ Inserted {inserted} rows with {len(statements)} statement(s)")
+
+    # Overlapping fetch: 100 known dates plus 50 new ones
+    rows = tiingo_adjusted_rows(stock.id, tiingo_payload(date(2020, 1, 1) + timedelta(days=400), 150, adj_close=50.0))
+    inserted, updated = upsert_adjusted_prices(db, rows)
+    db.commit()
+    assert (inserted, updated) == (50, 0)
+    assert db.query(AdjustedPrice).count() == 550
+    print("✅ Existing dates are skipped by default")
+
+    inserted, updated = upsert_adjusted_prices(db, rows, update_existing=True)
+    db.commit()
+    assert (inserted, updated) == (0, 150)
+    refreshed = db.query(AdjustedPrice).filter(AdjustedPrice.date == date(2020, 1, 1) + timedelta(days=400)).one()
+    assert float(refreshed.adj_close) == 50.0
+    print("✅ update_existing refreshes stored rows")
+
+
+def test_price_upsert_counts():
+    print("\n=== Testing daily price bulk upsert ===\n")
+    db, statements = make_session()
+    stock = Stock(symbol="TEST")
+    db.add(stock)
+    db.commit()
+
+    def payload(start, days, close):
+        return [
+            {"date": (start + timedelta(days=i)).isoformat(), "open": close, "high": close + 1,
+             "low": close - 1, "close": close, "volume": 1000}
+            for i in range(days)
+        ]
+
+    inserted, updated = upsert_prices(db, alpha_vantage_rows(stock.id, payload(date(2021, 1, 1), 100, 10.0)))
+    db.commit()
+    assert (inserted, updated) == (100, 0)
+
+    inserted, updated = upsert_prices(db, alpha_vantage_rows(stock.id, payload(date(2021, 3, 1), 100, 20.0)))
+    db.commit()
+    overlap = (date(2021, 1, 1) + timedelta(days=99) - date(2021, 3, 1)).days + 1
+    assert (inserted, updated) == (100 - overlap, overlap)
+    assert db.query(Price).count() == 200 - overlap
+    assert float(db.query(Price).filter(Price.date == date(2021, 3, 1)).one().close) == 20.0
+    print(f"✅ Reported {inserted} inserted and {updated} updated rows")
+
+
+if __name__ == "__main__":
+    test_adjusted_price_upsert()
+    test_price_upsert_counts()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Test script for incremental ("since last stored date") adjusted price refreshes,
+run against a local stub Tiingo server and a temporary SQLite database
+"""
+
+import os
+import sys
+import json
+import tempfile
+import threading
+import warnings
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# Add the backend app to the path
+sys.path.append('/workspaces/backend')
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from fastapi.testclient import TestClient
+from backend.app import main
+from backend.app.database import Base, get_db
+from backend.app.models import AdjustedPrice
+
+warnings.filterwarnings("ignore", message=".*Decimal objects natively.*")
+
+
+class StubTiingoHandler(BaseHTTPRequestHandler):
+    """Serves a configurable bar history, honouring the startDate parameter."""
+    bars = []
+    requests = []
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        start = query.get("startDate", [None])[0]
+        type(self).requests.append(start)
+        body = [bar for bar in self.bars if start is None or bar["date"][:10] >= start]
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(json.dumps(body).encode())
+
+    def log_message(self, *args):
+        pass
+
+
+def make_bar(day, adj_close, div_cash=0.0):
+    return {
+        "date": f"{day.isoformat()}T00:00:00.000Z",
+        "close": 100.0, "high": 101.0, "low": 99.0, "open": 100.0, "volume": 100,
+        "adjClose": adj_close, "adjHigh": adj_close, "adjLow": adj_close, "adjOpen": adj_close,
+        "adjVolume": 100, "divCash": div_cash, "splitFactor": 1.0
+    }
+
+
+def test_incremental_refresh():
+    print("=== Testing incremental adjusted price refresh ===\n")
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubTiingoHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    db_path = os.path.join(tempfile.mkdtemp(), "incremental.db")
+    engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine)
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    original_env = dict(os.environ)
+    os.environ["TIINGO_BASE_URL"] = f"http://127.0.0.1:{server.server_address[1]}"
+    os.environ["TIINGO_API_KEY"] = "test-key"
+    main.app.dependency_overrides[get_db] = override_get_db
+    client = TestClient(main.app)
+    url = "/stocks/TEST/fetch-adjusted-prices"
+    first = date(2024, 1, 1)
+    try:
+        StubTiingoHandler.bars = [make_bar(first + timedelta(days=i), 10.0) for i in range(100)]
+        data = client.post(url, params={"incremental": True}).json()
+        assert data["total_inserted"] == 100 and data["last_stored_date"] is None
+        print("✅ First incremental run loads the full history")
+
+        StubTiingoHandler.bars += [make_bar(first + timedelta(days=100 + i), 10.0) for i in range(3)]
+        data = client.post(url, params={"incremental": True}).json()
+        assert StubTiingoHandler.requests[-1] == (first + timedelta(days=100)).isoformat()
+        assert (data["total_fetched"], data["total_inserted"], data["total_updated"]) == (3, 3, 0)
+        assert data["refetched_from"] is None
+        print("✅ Nightly refresh only requests bars after the last stored date")
+
+        # A dividend on the new bar re-adjusts all earlier history
+        StubTiingoHandler.bars = [make_bar(first + timedelta(days=i), 9.5) for i in range(103)]
+        StubTiingoHandler.bars.append(make_bar(first + timedelta(days=103), 9.5, div_cash=0.5))
+        data = client.post(url, params={"incremental": True}).json()
+        assert StubTiingoHandler.requests[-1] == first.isoformat()
+        assert data["refetched_from"] == first.isoformat()
+        assert (data["total_inserted"], data["total_updated"]) == (1, 103)
+
+        db = session_factory()
+        assert db.query(AdjustedPrice).count() == 104
+        assert {float(p.adj_close) for p in db.query(AdjustedPrice)} == {9.5}
+        print("✅ A new dividend re-fetches and overwrites the stored history")
+    finally:
+        main.app.dependency_overrides.clear()
+        os.environ.clear()
+        os.environ.update(original_env)
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    test_incremental_refresh()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Test script for the precomputed indicators table: EMAs extended from their last
+stored value match a full recomputation, and backtests can read them back
+"""
+
+import sys
+import warnings
+
+# Add the backend app to the path
+sys.path.append('/workspaces/backend')
+
+from fastapi.testclient import TestClient
+from backend.app import main
+from backend.app.database import get_db
+from backend.app.ema_backtester import EMABacktester
+from backend.app.indicator_store import EMA, load_indicator, update_ema_indicators
+from backend.app.indicators import calculate_ema
+from backend.app.ingest import first_changed_close, upsert_adjusted_prices
+from backend.app.models import AdjustedPrice, Indicator
+from test_backtest_jobs import make_session_factory
+from test_streaming_strategies import make_bars
+
+warnings.filterwarnings("ignore", message=".*Decimal objects natively.*")
+
+PERIODS = [3, 5, 10, 20]
+
+
+def test_incremental_ema_matches_full_recompute():
+    print("=== Testing the precomputed EMA indicator store ===\n")
+    bars = make_bars(300)
+    db = make_session_factory(bars[:200])()
+    closes = [float(bar.adj_close) for bar in bars]
+
+    written = update_ema_indicators(db, 1, bars[0].date, PERIODS)
+    assert written == sum(200 - period + 1 for period in PERIODS)
+    db.commit()
+
+    # Append 100 bars; only the new dates are computed, resuming from the stored values
+    db.add_all([
+        AdjustedPrice(stock_id=1, date=bar.date, adj_open=bar.adj_open, adj_close=bar.adj_close)
+        for bar in bars[200:]
+    ])
+    assert update_ema_indicators(db, 1, bars[200].date, PERIODS) == 100 * len(PERIODS)
+    db.commit()
+    for period in PERIODS:
+        expected = [value for value in calculate_ema(closes, period) if value is not None]
+        assert [value for _, value in load_indicator(db, "TEST", EMA, period)] == expected
+    print("✅ Extending each EMA from its stored state matches a full recomputation exactly")
+
+    # Rewriting history (e.g. after a split) recomputes from the changed date
+    db.query(AdjustedPrice).filter(AdjustedPrice.date >= bars[250].date).update({"adj_close": 50})
+    update_ema_indicators(db, 1, bars[250].date, PERIODS)
+    db.commit()
+    changed = closes[:250] + [50.0] * 50
+    stored = load_indicator(db, "TEST", EMA, 10)
+    assert [value for _, value in stored] == [v for v in calculate_ema(changed, 10) if v is not None]
+    assert db.query(Indicator).count() == sum(300 - period + 1 for period in PERIODS)
+    print("✅ Overwritten bars are recomputed in place without duplicate rows")
+
+
+def test_refetch_recomputes_from_first_changed_bar():
+    bars = make_bars(300)
+    db = make_session_factory(bars[:299])()
+    update_ema_indicators(db, 1, bars[0].date, PERIODS)
+    db.commit()
+
+    def rows(closes):
+        return [{"stock_id": 1, "date": bar.date, "adj_open": bar.adj_open, "adj_close": close}
+                for bar, close in zip(bars, closes)]
+    closes = [float(bar.adj_close) for bar in bars]
+
+    # Re-fetching the full history plus one new bar only changes the new bar,
+    # even when existing rows are refreshed with the same (unrounded) values
+    refetched = rows([close + 1e-7 for close in closes])
+    assert first_changed_close(db, 1, refetched) == bars[299].date
+    assert first_changed_close(db, 1, refetched, update_existing=True) == bars[299].date
+    changed_from = first_changed_close(db, 1, refetched, update_existing=True)
+    upsert_adjusted_prices(db, refetched, update_existing=True)
+    assert update_ema_indicators(db, 1, changed_from, PERIODS) == len(PERIODS)
+    db.commit()
+    assert first_changed_close(db, 1, refetched, update_existing=True) is None
+    print("✅ An overlapping re-fetch only recomputes the EMAs of the new bar")
+
+    # A re-adjusted earlier bar moves the recompute back to that bar
+    closes[120] = round(closes[120] * 0.5, 4)
+    adjusted = rows(closes)
+    assert first_changed_close(db, 1, adjusted) is None
+    changed_from = first_changed_close(db, 1, adjusted, update_existing=True)
+    assert changed_from == bars[120].date
+    upsert_adjusted_prices(db, adjusted, update_existing=True)
+    update_ema_indicators(db, 1, changed_from, PERIODS)
+    db.commit()
+    stored = load_indicator(db, "TEST", EMA, 10)
+    assert [value for _, value in stored] == [v for v in calculate_ema(closes, 10) if v is not None]
+    print("✅ A changed earlier bar recomputes from that bar")
+
+
+def test_backtest_reads_stored_indicators():
+    bars = make_bars(300)
+    session_factory = make_session_factory(bars)
+    db = session_factory()
+    update_ema_indicators(db, 1, bars[0].date, PERIODS)
+    db.commit()
+
+    computed = EMABacktester("TEST", bars[0].date, bars[-1].date, 10000).run_vectorized(db, [(3, 10), (5, 20)])
+    backtester = EMABacktester("TEST", bars[0].date, bars[-1].date, 10000, use_stored_indicators=True)
+    stored = [backtester._run_combination(db, short, long) for short, long in [(3, 10), (5, 20)]]
+    assert [r["final_cash"] for r in stored] == [r["final_cash"] for r in computed]
+    assert backtester.indicator_cache.misses == 0
+    print("✅ Loop-mode backtests read the stored EMAs instead of recomputing them")
+
+    try:
+        backtester.run_combinations(db, [3], [10], mode="vectorized")
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    main.app.dependency_overrides[get_db] = override_get_db
+    try:
+        response = TestClient(main.app).get("/stocks/test/indicators",
+                                            params={"period": 5, "start_date": str(bars[10].date)})
+    finally:
+        main.app.dependency_overrides.clear()
+    assert response.status_code == 200
+    body = response.json()
+    assert body["symbol"] == "TEST" and len(body["values"]) == 290
+    print("✅ GET /stocks/{symbol}/indicators serves the stored series")
+
+
+if __name__ == "__main__":
+    test_incremental_ema_matches_full_recompute()
+    test_refetch_recomputes_from_first_changed_bar()
+    test_backtest_reads_stored_indicators()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Test script for the multi-symbol EMA portfolio sweep, run against a temporary
+SQLite database
+"""
+
+import sys
+import warnings
+
+# Add the backend app to the path
+sys.path.append('/workspaces/backend')
+
+from sqlalchemy import event
+from backend.app.ema_backtester import EMABacktester
+from backend.app.models import EMABacktest
+from backend.app.portfolio_backtest import PortfolioBacktester
+from test_backtest_jobs import make_session_factory
+from test_streaming_strategies import make_bars
+
+warnings.filterwarnings("ignore", message=".*Decimal objects natively.*")
+
+
+def test_portfolio_sweep():
+    print("=== Testing portfolio EMA sweep ===\n")
+    series = {"AAA": make_bars(400, seed=1), "BBB": make_bars(400, seed=2), "CCC": make_bars(400, seed=3)}
+    bars = series["AAA"]
+    session_factory = make_session_factory(None, series)
+    db = session_factory()
+
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    commits = []
+    event.listen(db, "after_commit", lambda session: commits.append(session))
+
+    portfolio = PortfolioBacktester(["aaa", "BBB", "CCC", "MISSING"], bars[0].date, bars[-1].date, 10000)
+    data = portfolio.run(db, [3, 5, 8], [10, 20, 30], top=5)
+
+    price_queries = [s for s in statements if s.lstrip().upper().startswith("SELECT") and "adjusted_prices" in s]
+    assert len(price_queries) == 1, price_queries
+    assert len(commits) == 1
+    print("✅ All series loaded with one query and stored with one commit")
+
+    assert data["missing_symbols"] == ["MISSING"]
+    assert data["total_backtests"] == 27
+    assert db.query(EMABacktest).count() == 27
+    for symbol, table in data["rankings"].items():
+        assert [r["rank"] for r in table] == [1, 2, 3, 4, 5]
+        returns = [r["total_return_percent"] for r in table]
+        assert returns == sorted(returns, reverse=True)
+        assert all(r["symbol"] == symbol and r["backtest_id"] for r in table)
+    print("✅ Each symbol gets its own ranked table; missing symbols are reported")
+
+    single = EMABacktester("BBB", bars[0].date, bars[-1].date, 10000)
+    single._prices = series["BBB"]
+    expected = {(r["short_period"], r["long_period"]): r["final_cash"]
+                for r in single.run_vectorized(None, single.generate_ema_combinations([3, 5, 8], [10, 20, 30]))}
+    assert all(expected[(r["short_period"], r["long_period"])] == r["final_cash"] for r in data["rankings"]["BBB"])
+    print("✅ Portfolio results match a single-symbol sweep")
+
+
+if __name__ == "__main__":
+    test_portfolio_sweep()
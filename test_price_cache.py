@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Test script for the bounded LRU price cache: entry and byte limits, eviction
+order, counters and invalidation when prices are ingested
+"""
+
+import sys
+from datetime import date
+
+# Add the backend app to the path
+sys.path.append('/workspaces/backend')
+
+from fastapi.testclient import TestClient
+from backend.app import main
+from backend.app.price_cache import PriceSeriesCache
+from backend.app.price_series import PriceSeries
+from test_streaming_strategies import make_bars
+
+
+def make_series(count):
+    return PriceSeries.from_rows(make_bars(count))
+
+
+def test_lru_limits_and_counters():
+    print("=== Testing LRU price cache ===\n")
+    cache = PriceSeriesCache(max_entries=2, max_bytes=10 * make_series(100).nbytes)
+    loads = []
+
+    def get(symbol, count=100):
+        def loader():
+            loads.append(symbol)
+            return make_series(count)
+        return cache.get(symbol, date(2020, 1, 1), date(2021, 1, 1), loader)
+
+    get("AAA"), get("BBB"), get("aaa"), get("CCC")
+    assert loads == ["AAA", "BBB", "CCC"]
+    get("AAA")
+    get("BBB")
+    assert loads == ["AAA", "BBB", "CCC", "BBB"]
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"], stats["entries"]) == (2, 4, 2, 2)
+    print("✅ Least recently used entries are evicted past the entry limit")
+
+    get("BIG", count=2000)
+    assert "BIG" not in {key[0] for key in cache._entries}
+    get("DDD", count=400), get("EEE", count=400)
+    assert cache.bytes <= cache.max_bytes
+    print(f"✅ Byte limit holds: {cache.bytes} of {cache.max_bytes} bytes cached")
+
+    series = get("EEE")
+    series.bars()
+    assert cache._entries[("EEE", date(2020, 1, 1), date(2021, 1, 1))][0]._bars is None
+    assert cache.invalidate("eee") == 1 and cache.invalidate("EEE") == 0
+    assert cache.stats()["invalidations"] == 1
+    print("✅ Callers get views of cached series; invalidate() drops a symbol's ranges")
+
+
+def test_load_racing_invalidate_is_not_cached():
+    cache = PriceSeriesCache(max_entries=4, max_bytes=10 * make_series(100).nbytes)
+
+    def stale_loader():
+        # An ingest lands while this series is being read
+        cache.invalidate("AAA")
+        return make_series(100)
+
+    assert len(cache.get("AAA", date(2020, 1, 1), date(2021, 1, 1), stale_loader)) == 100
+    assert len(cache) == 0
+    cache.get("AAA", date(2020, 1, 1), date(2021, 1, 1), lambda: make_series(100))
+    assert len(cache) == 1
+    print("✅ A series loaded across an invalidate() is returned but not cached")
+
+
+def test_stats_endpoint():
+    client = TestClient(main.app)
+    main.price_cache.clear()
+    stats = client.get("/price-cache/stats").json()
+    assert {"hits", "misses", "evictions", "entries", "bytes", "max_bytes"} <= set(stats)
+    assert client.delete("/price-cache").json()["entries"] == 0
+    print("✅ Cache counters are exposed at /price-cache/stats")
+
+
+if __name__ == "__main__":
+    test_lru_limits_and_counters()
+    test_load_racing_invalidate_is_not_cached()
+    test_stats_endpoint()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Test script for keyset pagination on /prices/ and adjusted prices, and for the
+streaming CSV / NDJSON / Arrow IPC exports of a price range
+"""
+
+import asyncio
+import csv
+import io
+import json
+import sys
+import warnings
+from unittest import mock
+
+# Add the backend app to the path
+sys.path.append('/workspaces/backend')
+
+import httpx
+import pyarrow as pa
+from backend.app import database, main, price_export
+from backend.app.models import Price
+from test_backtest_jobs import make_session_factory
+from test_streaming_strategies import make_bars
+
+warnings.filterwarnings("ignore", message=".*Decimal objects natively.*")
+
+
+def test_keyset_pagination_and_export():
+    print("=== Testing keyset pagination and price exports ===\n")
+    bars = make_bars(250)
+    session_factory = make_session_factory(bars)
+    with session_factory() as db:
+        for stock_id in (1, 2):
+            db.add_all(Price(stock_id=stock_id, date=bar.date, close=bar.adj_close) for bar in bars[:30])
+        db.commit()
+    url = str(session_factory.kw["bind"].url)
+
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            # Adjusted prices: newest first, following X-Next-Cursor to the end
+            dates, cursor = [], None
+            while True:
+                params = {"limit": 40, **({"cursor": cursor} if cursor else {})}
+                response = await client.get("/stocks/TEST/adjusted-prices", params=params)
+                dates += [price["date"] for price in response.json()]
+                cursor = response.headers.get("X-Next-Cursor")
+                if not cursor:
+                    break
+            assert dates == [str(bar.date) for bar in reversed(bars)]
+            print("✅ Adjusted price pages chain through X-Next-Cursor without gaps or repeats")
+
+            # Prices: (stock_id, date) keyset across stocks
+            keys, cursor = [], None
+            while True:
+                params = {"limit": 25, **({"cursor": cursor} if cursor else {})}
+                response = await client.get("/prices/", params=params)
+                keys += [(price["stock_id"], price["date"]) for price in response.json()]
+                cursor = response.headers.get("X-Next-Cursor")
+                if not cursor:
+                    break
+            assert keys == [(stock_id, str(bar.date)) for stock_id in (1, 2) for bar in bars[:30]]
+            assert (await client.get("/prices/", params={"cursor": "bad"})).status_code == 400
+            print("✅ Price pages seek on (stock_id, date)")
+
+            # An empty page size, or an offset on top of a cursor, is rejected instead of failing or skipping rows
+            for path, cursor in (("/prices/", "1:2015-01-05"), ("/stocks/TEST/adjusted-prices", str(bars[100].date))):
+                assert (await client.get(path, params={"limit": 0})).status_code == 400
+                response = await client.get(path, params={"cursor": cursor, "skip": 5})
+                assert response.status_code == 400 and "cursor" in response.json()["detail"]
+                assert len((await client.get(path, params={"skip": 5, "limit": 3})).json()) == 3
+            print("✅ limit=0 and skip with a cursor are rejected")
+
+            # Exports stream the whole range, oldest first, in chunks
+            range_params = {"start_date": str(bars[50].date), "end_date": str(bars[199].date)}
+            with mock.patch.object(price_export, "EXPORT_CHUNK_ROWS", 32):
+                response = await client.get("/stocks/test/adjusted-prices/export",
+                                            params={**range_params, "format": "csv"})
+                rows = list(csv.DictReader(io.StringIO(response.text)))
+                assert response.headers["content-type"].startswith("text/csv")
+                assert [row["date"] for row in rows] == [str(bar.date) for bar in bars[50:200]]
+                assert abs(float(rows[0]["adj_close"]) - float(bars[50].adj_close)) < 1e-4
+
+                response = await client.get("/stocks/test/adjusted-prices/export",
+                                            params={**range_params, "format": "ndjson"})
+                lines = [json.loads(line) for line in response.text.splitlines()]
+                assert len(lines) == 150 and lines[-1]["date"] == str(bars[199].date)
+
+                response = await client.get("/prices/export", params={"stock_id": 2, "format": "ndjson"})
+                assert [line["stock_id"] for line in map(json.loads, response.text.splitlines())] == [2] * 30
+                print("✅ CSV and NDJSON exports cover the requested range")
+
+                response = await client.get("/stocks/test/adjusted-prices/export",
+                                            params={**range_params, "format": "arrow"})
+                table = pa.ipc.open_stream(response.content).read_all()
+                assert table.num_rows == 150 and table.schema.field("date").type == pa.date32()
+                print("✅ Arrow IPC export reads back as one table")
+
+            assert (await client.get("/stocks/test/adjusted-prices/export",
+                                     params={"format": "xml"})).status_code == 400
+            assert (await client.get("/stocks/NONE/adjusted-prices/export")).status_code == 404
+        await database.async_read_session_factory().kw["bind"].dispose()
+
+    with mock.patch.object(database, "DATABASE_URL", url), mock.patch.object(database, "DATABASE_READ_URL", None):
+        asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_keyset_pagination_and_export()
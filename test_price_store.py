@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Test script for the memory-mapped columnar price store: refresh from the
+database, zero-copy reads and backtests that match the database path
+"""
+
+import os
+import sys
+import tempfile
+import warnings
+
+# Add the backend app to the path
+sys.path.append('/workspaces/backend')
+
+import numpy as np
+from sqlalchemy import event
+from backend.app.backtest import BacktestEngine, load_prices
+from backend.app.ema_backtester import EMABacktester
+from backend.app.price_series import PriceSeries
+from backend.app.price_store import ColumnarPriceStore
+from backend.app.strategies.ema_crossover import EMACrossoverStrategy
+from test_backtest_jobs import make_session_factory
+from test_streaming_strategies import PrefixOnly, make_bars
+
+warnings.filterwarnings("ignore", message=".*Decimal objects natively.*")
+
+
+def test_price_store_round_trip():
+    print("=== Testing columnar price store ===\n")
+    bars = make_bars(500)
+    db = make_session_factory(bars)()
+    store = ColumnarPriceStore(tempfile.mkdtemp())
+
+    assert store.read("TEST") is None
+    assert store.refresh(db, "test") == 500
+
+    start, end = bars[100].date, bars[399].date
+    series = store.read("TEST", start, end)
+    assert isinstance(series, PriceSeries) and len(series) == 300
+    assert isinstance(series.adj_close.base, np.memmap) or isinstance(series.adj_close, np.memmap)
+    assert (series[0].date, series[-1].date) == (start, end)
+    assert series.adj_close.tolist() == [float(bar.adj_close) for bar in bars[100:400]]
+    print("✅ Refreshed series is memory-mapped and sliced by date without copying")
+
+    rows = load_prices(db, "TEST", start, end)
+    strategy = EMACrossoverStrategy(5, 20)
+    from_store = BacktestEngine(strategy, "TEST", start, end, 10000, prices=series).run(None)
+    from_db = BacktestEngine(strategy, "TEST", start, end, 10000, prices=rows).run(None)
+    assert from_store == from_db
+    print("✅ Backtests over the store match backtests over database rows")
+
+    store.write("TEST", np.array([], dtype=series.dates.dtype))
+    assert store.read("TEST") is None
+    print("✅ An empty refresh removes the symbol's file")
+
+
+def test_backtester_reads_store():
+    bars = make_bars(300, seed=5)
+    session_factory = make_session_factory(bars)
+    root = tempfile.mkdtemp()
+    ColumnarPriceStore(root).refresh(session_factory(), "TEST")
+
+    original_env = dict(os.environ)
+    os.environ["PRICE_STORE_DIR"] = root
+    try:
+        backtester = EMABacktester("TEST", bars[0].date, bars[-1].date, 10000)
+        # No session: every read must come from the store
+        results = backtester.run_vectorized(None, [(3, 10), (5, 20)])
+        assert isinstance(backtester._prices, PriceSeries)
+    finally:
+        os.environ.clear()
+        os.environ.update(original_env)
+
+    expected = EMABacktester("TEST", bars[0].date, bars[-1].date, 10000).run_vectorized(
+        session_factory(), [(3, 10), (5, 20)])
+    assert [r["final_cash"] for r in results] == [r["final_cash"] for r in expected]
+    print("✅ EMABacktester reads PRICE_STORE_DIR without touching the database")
+
+
+def test_load_prices_narrow_select():
+    bars = make_bars(400, seed=11)
+    db = make_session_factory(bars)()
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+
+    series = load_prices(db, "test", bars[50].date, bars[349].date)
+    assert len(statements) == 1 and "adj_high" not in statements[0]
+    assert isinstance(series, PriceSeries) and series.dates.dtype == np.dtype("datetime64[D]")
+    assert series.adj_open.tolist() == [float(bar.adj_open) for bar in bars[50:350]]
+    assert len(load_prices(db, "MISSING", bars[0].date, bars[-1].date)) == 0
+    print("✅ load_prices reads three columns with one query into a PriceSeries")
+
+    streaming = BacktestEngine(EMACrossoverStrategy(5, 20), "TEST", bars[50].date, bars[349].date, 10000, prices=series).run(None)
+    prefix = BacktestEngine(PrefixOnly(EMACrossoverStrategy(5, 20)), "TEST", bars[50].date, bars[349].date, 10000, prices=series).run(None)
+    assert streaming["trades"] == prefix["trades"] and streaming["trades"]
+    print("✅ Streaming and prefix strategies both accept a PriceSeries")
+
+
+if __name__ == "__main__":
+    test_price_store_round_trip()
+    test_backtester_reads_store()
+    test_load_prices_narrow_select()
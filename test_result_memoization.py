@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Test script for EMA sweep result memoization: stored combinations are reused,
+only missing pairs run, and re-runs upsert instead of adding duplicates
+"""
+
+import sys
+import warnings
+
+# Add the backend app to the path
+sys.path.append('/workspaces/backend')
+
+from sqlalchemy import MetaData, Table
+from backend.app.ema_backtester import EMABacktester, has_result_key
+from backend.app.models import EMABacktest
+from test_backtest_jobs import make_session_factory
+from test_streaming_strategies import make_bars
+
+warnings.filterwarnings("ignore", message=".*Decimal objects natively.*")
+
+
+def test_reuse_existing_results():
+    print("=== Testing EMA result memoization ===\n")
+    bars = make_bars(400)
+    db = make_session_factory(bars)()
+
+    def sweep(short_periods, long_periods, **kwargs):
+        backtester = EMABacktester("TEST", bars[0].date, bars[-1].date, 10000)
+        ran = []
+        original = backtester._run_combination
+        backtester._run_combination = lambda db, s, l: ran.append((s, l)) or original(db, s, l)
+        return backtester.run_combinations(db, short_periods, long_periods, **kwargs), ran
+
+    first, ran = sweep([3, 5], [10, 20])
+    assert len(ran) == 4 and db.query(EMABacktest).count() == 4
+
+    again, ran = sweep([3, 5], [10, 20], reuse_existing=True)
+    assert ran == [] and all(r["reused"] for r in again)
+    # Stored values carry the column's precision (final_cash is DECIMAL(15, 2))
+    assert [(r["backtest_id"], r["final_cash"]) for r in again] == [(r["backtest_id"], round(r["final_cash"], 2)) for r in first]
+    print("✅ A repeated sweep reads every result back without running the engine")
+
+    wider, ran = sweep([3, 5, 8], [10, 20], reuse_existing=True)
+    assert ran == [(8, 10), (8, 20)]
+    assert [(r["short_period"], r["long_period"]) for r in wider] == [(3, 10), (3, 20), (5, 10), (5, 20), (8, 10), (8, 20)]
+    assert db.query(EMABacktest).count() == 6
+    print("✅ Only missing pairs run when the grid grows; results stay in combination order")
+
+    rerun, ran = sweep([3, 5, 8], [10, 20])
+    assert len(ran) == 6 and db.query(EMABacktest).count() == 6
+    assert [r["backtest_id"] for r in rerun] == [r["backtest_id"] for r in wider]
+    print("✅ A full re-run upserts on the unique key instead of adding duplicates")
+
+
+def test_database_without_result_key():
+    # ema_backtests as created before migration 0002: same columns, no unique key
+    bars = make_bars(200)
+    session_factory = make_session_factory(bars)
+    engine = session_factory.kw["bind"]
+    EMABacktest.__table__.drop(engine)
+    Table(EMABacktest.__tablename__, MetaData(), *(column._copy() for column in EMABacktest.__table__.columns)).create(engine)
+
+    db = session_factory()
+    assert not has_result_key(db)
+    backtester = EMABacktester("TEST", bars[0].date, bars[-1].date, 10000)
+    results = backtester.run_combinations(db, [3, 5], [10, 20], mode="vectorized")
+    assert all(r["backtest_id"] for r in results) and db.query(EMABacktest).count() == 4
+    print("✅ Without the unique key, results are inserted instead of failing the sweep")
+
+
+if __name__ == "__main__":
+    test_reuse_existing_results()
+    test_database_without_result_key()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Test script for streaming EMA sweep results as NDJSON and server-sent events,
+run against a temporary SQLite database
+"""
+
+import sys
+import json
+import warnings
+
+# Add the backend app to the path
+sys.path.append('/workspaces/backend')
+
+from fastapi.testclient import TestClient
+from backend.app import main
+from backend.app.ema_backtester import EMABacktester
+from backend.app.models import EMABacktest
+from backend.app.price_cache import price_cache
+from test_backtest_jobs import make_session_factory
+from test_streaming_strategies import make_bars
+
+warnings.filterwarnings("ignore", message=".*Decimal objects natively.*")
+
+
+def stream(session_factory, bars, **params):
+    # Series are cached by symbol and dates, so start each run from this test's database
+    price_cache.clear()
+    original_session = main.SessionLocal
+    main.SessionLocal = session_factory
+    try:
+        query = dict({"symbol": "TEST", "start_date": bars[0].date.isoformat(),
+                      "end_date": bars[-1].date.isoformat()}, **params)
+        body = {"short_periods": [3, 5, 8], "long_periods": [10, 20, 30]}
+        with TestClient(main.app).stream("POST", "/ema-backtests/stream", params=query, json=body) as response:
+            assert response.status_code == 200, response.read()
+            return response.headers["content-type"], list(response.iter_lines())
+    finally:
+        main.SessionLocal = original_session
+
+
+def test_stream_ndjson():
+    print("=== Testing streamed EMA sweep ===\n")
+    bars = make_bars(300)
+    session_factory = make_session_factory(bars)
+
+    content_type, lines = stream(session_factory, bars, batch_size=4)
+    assert content_type.startswith("application/x-ndjson")
+    events = [json.loads(line) for line in lines if line]
+    results, done = events[:-1], events[-1]
+    assert len(results) == 9 and done["stored"] == 9
+    assert all("trades" not in r and r["backtest_id"] for r in results)
+    assert session_factory().query(EMABacktest).count() == 9
+    print("✅ NDJSON stream emits one stored result per line, without trades by default")
+
+    _, lines = stream(session_factory, bars, mode="vectorized", include_trades=True, format="sse")
+    data = [json.loads(line[len("data: "):]) for line in lines if line.startswith("data: ")]
+    assert [line for line in lines if line.startswith("event: ")][-1] == "event: done"
+    assert len(data) == 10
+    print("✅ Server-sent events stream ends with a done event")
+
+    _, lines = stream(session_factory, bars, include_trades=True)
+    assert all(json.loads(line)["trades"] for line in lines[:-1] if line)
+    print("✅ Trade lists are included on request")
+
+
+def test_abandoned_stream_keeps_sent_batches():
+    bars = make_bars(300)
+    session_factory = make_session_factory(bars)
+    db = session_factory()
+    backtester = EMABacktester("TEST", bars[0].date, bars[-1].date, 10000)
+    results = backtester.iter_combinations(db, [3, 5, 8], [10, 20, 30], batch_size=2)
+    first = next(results)
+    results.close()
+    # Every id handed to the consumer is committed, and nothing past the first batch is
+    stored = session_factory().query(EMABacktest).all()
+    assert [row.id for row in stored if row.id == first["backtest_id"]] == [first["backtest_id"]]
+    assert len(stored) == 2
+    print("✅ Stopping a stream early keeps the batches it already sent")
+
+
+def test_failed_sweep_stores_nothing():
+    bars = make_bars(300)
+    session_factory = make_session_factory(bars)
+    backtester = EMABacktester("TEST", bars[0].date, bars[-1].date, 10000)
+
+    def progress(completed, total, new_results):
+        if completed > 100:
+            raise RuntimeError("sweep failed")
+
+    try:
+        backtester.run_combinations(session_factory(), mode="vectorized", progress=progress)
+        assert False, "expected RuntimeError"
+    except RuntimeError:
+        pass
+    # Unlike a stream, run_combinations stores a sweep in one transaction
+    assert session_factory().query(EMABacktest).count() == 0
+    print("✅ A sweep that fails partway through leaves no partial results")
+
+
+if __name__ == "__main__":
+    test_stream_ndjson()
+    test_abandoned_stream_keeps_sent_batches()
+    test_failed_sweep_stores_nothing()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Test script to verify that the streaming strategy API (on_bar) produces the same
+trades as the original prefix-based should_buy/should_sell evaluation
+"""
+
+import sys
+import math
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+
+# Add the backend app to the path
+sys.path.append('/workspaces/backend')
+
+from backend.app.backtest import BacktestEngine
+from backend.app.strategies import Strategy
+from backend.app.strategies.ema_crossover import EMACrossoverStrategy
+from backend.app.strategies.buy_and_hold import BuyAndHoldStrategy
+from backend.app.indicators import IndicatorCache
+
+
+def make_bars(count, seed=7):
+    """Generate a synthetic random-walk adjusted price series."""
+    rng = random.Random(seed)
+    bars = []
+    price = 100.0
+    day = date(2015, 1, 1)
+    for _ in range(count):
+        open_price = price * (1 + rng.gauss(0, 0.005))
+        price = max(1.0, price * math.exp(rng.gauss(0.0003, 0.015)))
+        bars.append(SimpleNamespace(
+            date=day,
+            adj_open=Decimal(f"{open_price:.4f}"),
+            adj_close=Decimal(f"{price:.4f}")
+        ))
+        day += timedelta(days=1)
+    return bars
+
+
+class PrefixOnly(Strategy):
+    """Wraps a strategy so the engine falls back to the prefix-based API."""
+
+    def __init__(self, inner):
+        self.inner = inner
+
+    def should_buy(self, prices, current_position, current_cash):
+        return self.inner.should_buy(prices, current_position, current_cash)
+
+    def should_sell(self, prices, current_position, current_cash):
+        return self.inner.should_sell(prices, current_position, current_cash)
+
+
+def run_engine(strategy, bars):
+    engine = BacktestEngine(strategy, "TEST", bars[0].date, bars[-1].date, 10000)
+    engine._get_prices = lambda db: bars
+    return engine.run(None)
+
+
+def test_streaming_matches_prefix_evaluation():
+    print("=== Testing streaming strategy API ===\n")
+    bars = make_bars(600)
+
+    for short, long in [(3, 10), (5, 20), (12, 26), (20, 60)]:
+        streamed = run_engine(EMACrossoverStrategy(short, long), bars)
+        prefixed = run_engine(PrefixOnly(EMACrossoverStrategy(short, long)), bars)
+        assert streamed["trades"] == prefixed["trades"], f"EMA {short}/{long} trades differ"
+        assert streamed["final_cash"] == prefixed["final_cash"]
+        print(f"✅ EMA {short}/{long}: {streamed['num_trades']} trades, final cash {streamed['final_cash']:.2f}")
+
+    streamed = run_engine(BuyAndHoldStrategy(), bars)
+    prefixed = run_engine(PrefixOnly(BuyAndHoldStrategy()), bars)
+    assert streamed["trades"] == prefixed["trades"]
+    print(f"✅ Buy and hold: {streamed['num_trades']} trades, final cash {streamed['final_cash']:.2f}")
+
+
+def test_strategy_reuse_resets_state():
+    bars = make_bars(300, seed=11)
+    strategy = EMACrossoverStrategy(5, 20)
+    first = run_engine(strategy, bars)
+    second = run_engine(strategy, bars)
+    assert first["trades"] == second["trades"]
+    print("✅ Reusing a strategy instance gives identical results")
+
+
+def test_short_period_longer_than_long_period():
+    # The short EMA is not ready yet when the long one first is; no crossover can be read there
+    bars = make_bars(200, seed=3)
+    streamed = run_engine(EMACrossoverStrategy(20, 5), bars)
+    prefixed = run_engine(PrefixOnly(EMACrossoverStrategy(20, 5)), bars)
+    assert streamed["trades"] == prefixed["trades"]
+    print("✅ EMA 20/5 waits for both EMAs instead of comparing against a missing value")
+
+
+def test_precomputed_ema_series_from_cache():
+    bars = make_bars(500, seed=5)
+    closes = [float(b.adj_close) for b in bars]
+    cache = IndicatorCache()
+    start, end = bars[0].date, bars[-1].date
+
+    for short, long in [(3, 10), (5, 10), (8, 21), (10, 21)]:
+        strategy = EMACrossoverStrategy(
+            short, long,
+            ema_short=cache.ema("TEST", start, end, short, closes),
+            ema_long=cache.ema("TEST", start, end, long, closes)
+        )
+        cached = run_engine(strategy, bars)
+        expected = run_engine(EMACrossoverStrategy(short, long), bars)
+        assert cached["trades"] == expected["trades"], f"EMA {short}/{long} trades differ"
+
+    assert len(cache) == 5
+    assert cache.hits == 3 and cache.misses == 5
+    print(f"✅ Precomputed EMA series match; {cache.misses} series computed, {cache.hits} reused")
+
+
+if __name__ == "__main__":
+    test_streaming_matches_prefix_evaluation()
+    test_strategy_reuse_resets_state()
+    test_short_period_longer_than_long_period()
+    test_precomputed_ema_series_from_cache()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Test script for the SQL-side /ema-backtests/summary aggregation: overall stats,
+percentiles, per-period breakdowns and heatmap buckets match a Python reference
+"""
+
+import statistics
+import sys
+import warnings
+from datetime import date
+
+# Add the backend app to the path
+sys.path.append('/workspaces/backend')
+
+from sqlalchemy.dialects import postgresql
+
+from backend.app.ema_backtester import EMABacktester
+from backend.app.models import EMABacktest
+from test_backtest_jobs import make_session_factory
+from test_streaming_strategies import make_bars
+
+warnings.filterwarnings("ignore", message=".*Decimal objects natively.*")
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    position = fraction * (len(values) - 1)
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def test_summary_matches_python_reference():
+    print("=== Testing SQL-side EMA summary ===\n")
+    bars = make_bars(400)
+    db = make_session_factory(bars)()
+    backtester = EMABacktester("TEST", bars[0].date, bars[-1].date, 10000)
+    assert backtester.get_combination_summary(db) == {"message": "No backtest results found"}
+
+    backtester.run_combinations(db, [3, 5, 8, 12], [10, 20, 30], mode="vectorized")
+    rows = db.query(EMABacktest).all()
+    returns = [float(r.total_return_percent) for r in rows]
+
+    summary = backtester.get_combination_summary(db, heatmap_bucket=10)
+    assert summary["total_combinations"] == len(rows) == 11
+    assert summary["best_return_percent"] == max(returns)
+    assert summary["worst_return_percent"] == min(returns)
+    assert abs(summary["average_return_percent"] - statistics.mean(returns)) < 1e-4
+    assert abs(summary["stddev_return_percent"] - statistics.stdev(returns)) < 1e-4
+    assert summary["profitable_combinations"] == sum(1 for r in returns if r > 0)
+    for name, fraction in [("p10", 0.1), ("p25", 0.25), ("median", 0.5), ("p75", 0.75), ("p90", 0.9)]:
+        assert abs(summary["percentiles"][name] - percentile(returns, fraction)) < 1e-4
+    assert summary["median_return_percent"] == summary["percentiles"]["median"]
+    print("✅ Overall stats, stddev and percentiles match the row-by-row reference")
+
+    by_short = {group["period"]: group for group in summary["by_short_period"]}
+    assert list(by_short) == [3, 5, 8, 12]
+    for period, group in by_short.items():
+        period_returns = [float(r.total_return_percent) for r in rows if r.short_period == period]
+        assert group["combinations"] == len(period_returns)
+        assert abs(group["average_return_percent"] - statistics.mean(period_returns)) < 1e-4
+    assert [group["period"] for group in summary["by_long_period"]] == [10, 20, 30]
+    print("✅ Per-short and per-long period breakdowns are grouped in SQL")
+
+    cells = {(tuple(c["short_period_range"]), tuple(c["long_period_range"])): c for c in summary["heatmap"]}
+    assert cells[((0, 9), (10, 19))]["combinations"] == 3
+    assert cells[((10, 19), (20, 29))]["combinations"] == 1
+    assert sum(c["combinations"] for c in summary["heatmap"]) == 11
+    print("✅ Heatmap cells bucket short/long periods by heatmap_bucket")
+
+
+def test_stddev_of_tightly_clustered_returns():
+    bars = make_bars(50)
+    db = make_session_factory(bars)()
+    backtester = EMABacktester("TEST", bars[0].date, bars[-1].date, 10000)
+    # Large, nearly equal values: sum(x^2) - n*mean^2 cancels to noise here
+    returns = [99999.0 + (i % 97) * 0.0001 for i in range(1000)]
+    db.add_all(
+        EMABacktest(symbol="TEST", short_period=3 + i % 18, long_period=10 + i // 18, start_date=bars[0].date,
+                    end_date=bars[-1].date, initial_cash=10000, final_cash=10000, total_return=0,
+                    total_return_percent=value, num_trades=1)
+        for i, value in enumerate(returns)
+    )
+    db.commit()
+
+    stddev = backtester.get_combination_summary(db)["stddev_return_percent"]
+    assert abs(stddev - statistics.stdev(returns)) < 1e-8, (stddev, statistics.stdev(returns))
+    print(f"✅ Stddev of clustered returns is exact to 1e-8 ({stddev:.8f})")
+
+
+def test_postgres_summary_query_uses_percentile_cont():
+    backtester = EMABacktester("TEST", date(2020, 1, 1), date(2021, 1, 1), 10000)
+    stmt = backtester._overall_summary_query(backtester._result_filter(), postgres=True)
+    sql = str(stmt.compile(dialect=postgresql.dialect()))
+    assert "FILTER (WHERE" in sql and "WITHIN GROUP (ORDER BY" in sql and "stddev_samp(" in sql
+    print("✅ PostgreSQL renders COUNT FILTER, stddev_samp and percentile_cont WITHIN GROUP")
+
+
+if __name__ == "__main__":
+    test_summary_matches_python_reference()
+    test_stddev_of_tightly_clustered_returns()
+    test_postgres_summary_query_uses_percentile_cont()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Test script for the statements an EMA sweep sends: prices are loaded with one
+query and results are stored with one bulk insert and one commit per sweep
+"""
+
+import sys
+import warnings
+from unittest import mock
+
+# Add the backend app to the path
+sys.path.append('/workspaces/backend')
+
+from sqlalchemy import event
+from backend.app.ema_backtester import EMABacktester
+from backend.app.models import EMABacktest
+from test_backtest_jobs import make_session_factory
+from test_streaming_strategies import make_bars
+
+warnings.filterwarnings("ignore", message=".*Decimal objects natively.*")
+
+SHORT_PERIODS = [3, 5, 8]
+LONG_PERIODS = [10, 20, 30]
+
+
+def run_sweep(mode):
+    """Run a 9-combination sweep on a fresh database; return (statements sent, commits, results)."""
+    bars = make_bars(300)
+    session_factory = make_session_factory(bars)
+    statements = []
+    event.listen(session_factory.kw["bind"], "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+
+    db = session_factory()
+    backtester = EMABacktester("TEST", bars[0].date, bars[-1].date, 10000)
+    with mock.patch.object(db, "commit", wraps=db.commit) as commit:
+        results = backtester.run_combinations(db, SHORT_PERIODS, LONG_PERIODS, mode=mode)
+    assert db.query(EMABacktest).count() == len(results) == 9
+    return statements, commit.call_count, results
+
+
+def test_sweep_loads_prices_once():
+    for mode in ("loop", "vectorized", "process"):
+        statements, _, _ = run_sweep(mode)
+        price_loads = [statement for statement in statements if "FROM adjusted_prices" in statement]
+        assert len(price_loads) == 1, price_loads
+        print(f"✅ A {mode} sweep of 9 combinations loads the price series with one query")
+
+
+def test_sweep_stores_results_in_one_insert_and_commit():
+    print("=== Testing sweep round trips ===\n")
+    for mode in ("loop", "vectorized"):
+        statements, commits, results = run_sweep(mode)
+        inserts = [statement for statement in statements if statement.startswith("INSERT INTO ema_backtests")]
+        assert len(inserts) == 1, inserts
+        assert commits == 1
+        assert len({result["backtest_id"] for result in results}) == 9
+        print(f"✅ A {mode} sweep stores its 9 results with one INSERT and one commit")
+
+    # Rows with a null cagr stay in the same multi-row INSERT, and re-runs keep their ids
+    bars = make_bars(300)
+    session_factory = make_session_factory(bars)
+    statements = []
+    event.listen(session_factory.kw["bind"], "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    db = session_factory()
+    backtester = EMABacktester("TEST", bars[0].date, bars[-1].date, 10000)
+    for attempt in range(2):
+        results = [
+            {"short_period": short, "long_period": long, "final_cash": 10000 + attempt, "total_return": 0,
+             "total_return_percent": 0, "num_trades": 0, "cagr": None if long == 20 else 0.1}
+            for short in SHORT_PERIODS for long in LONG_PERIODS
+        ]
+        backtester.insert_results(db, results)
+        db.commit()
+        assert [result["backtest_id"] for result in results] == list(range(1, 10))
+    assert sum(statement.startswith("INSERT INTO ema_backtests") for statement in statements) == 2
+    print("✅ Null values do not split the bulk insert")
+
+
+if __name__ == "__main__":
+    test_sweep_loads_prices_once()
+    test_sweep_stores_results_in_one_insert_and_commit()
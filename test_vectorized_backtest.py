@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Test script to verify that the vectorized EMA engine matches the per-combination
+BacktestEngine loop for every (short, long) pair of the default sweep
+"""
+
+import sys
+import time
+
+# Add the backend app to the path
+sys.path.append('/workspaces/backend')
+
+from backend.app.backtest import BacktestEngine
+from backend.app.ema_backtester import EMABacktester
+from backend.app.strategies.ema_crossover import EMACrossoverStrategy
+from backend.app.vectorized_backtest import VectorizedEMAEngine
+from backend.app.parallel_backtest import run_combinations_parallel
+from test_streaming_strategies import make_bars
+
+
+def test_vectorized_matches_loop_engine():
+    print("=== Testing vectorized EMA engine ===\n")
+    bars = make_bars(1500, seed=3)
+    backtester = EMABacktester("TEST", bars[0].date, bars[-1].date, 10000)
+    combinations = backtester.generate_ema_combinations()
+
+    start = time.perf_counter()
+    vectorized = VectorizedEMAEngine.from_prices(bars, 10000).run(combinations)
+    elapsed = time.perf_counter() - start
+    print(f"✅ Vectorized sweep of {len(combinations)} combinations took {elapsed:.3f}s")
+
+    for (short, long), result in zip(combinations, vectorized):
+        engine = BacktestEngine(EMACrossoverStrategy(short, long), "TEST", bars[0].date, bars[-1].date, 10000)
+        engine._get_prices = lambda db: bars
+        expected = engine.run(None)
+        assert (result["short_period"], result["long_period"]) == (short, long)
+        assert result["final_cash"] == expected["final_cash"], f"EMA {short}/{long} final cash differs"
+        assert result["total_return"] == expected["total_return"]
+        assert result["num_trades"] == expected["num_trades"], f"EMA {short}/{long} trade count differs"
+    print(f"✅ All {len(combinations)} combinations match the loop engine")
+
+
+def test_vectorized_short_series():
+    bars = make_bars(12)
+    results = VectorizedEMAEngine.from_prices(bars, 10000).run([(3, 10), (5, 20)])
+    assert [r["num_trades"] for r in results][1] == 0
+    assert results[1]["final_cash"] == 10000
+    print("✅ Series shorter than the long period produce no trades")
+
+
+def test_process_pool_matches_vectorized():
+    bars = make_bars(800, seed=9)
+    combinations = [(short, long) for short in (3, 5, 8, 13) for long in (10, 21, 34, 55) if short < long]
+    expected = VectorizedEMAEngine.from_prices(bars, 10000).run(combinations)
+    results = run_combinations_parallel("TEST", bars[0].date, bars[-1].date, 10000, bars, combinations, workers=2)
+    assert [(r["short_period"], r["long_period"]) for r in results] == combinations
+    for result, vectorized in zip(results, expected):
+        assert result["final_cash"] == vectorized["final_cash"]
+        assert result["num_trades"] == vectorized["num_trades"]
+    print(f"✅ Process pool results for {len(combinations)} combinations match, in order")
+
+    try:
+        run_combinations_parallel("TEST", bars[0].date, bars[-1].date, 10000, bars, combinations, workers=0)
+    except ValueError as e:
+        assert "at least 1" in str(e)
+    else:
+        raise AssertionError("workers=0 should be rejected")
+    print("✅ workers=0 is rejected instead of falling back to the default")
+
+
+if __name__ == "__main__":
+    test_vectorized_matches_loop_engine()
+    test_vectorized_short_series()
+    test_process_pool_matches_vectorized()